@@ -8,25 +8,113 @@ class Settings(BaseSettings):
     llm_model: str = "anthropic/claude-sonnet-4"
     llm_system_prompt: str = "You are a helpful assistant. Use the search_documents tool to find relevant information from uploaded documents when the user asks about their documents."
 
+    # Chat
+    chat_tool_concurrency: int = 4  # Tool calls run at once within one model turn
+    chat_tool_timeout_seconds: float = 20  # Per tool call; a timeout is reported back to the model
+    chat_history_max_turns: int = 10  # Recent user/assistant turns sent verbatim
+    chat_history_token_budget: int = 6000  # Estimated tokens for summary + recent turns
+    chat_summary_model: str = ""  # Model for rolling summaries; empty = llm_model
+    chat_summary_max_tokens: int = 500
+    chat_summary_fold_limit: int = 50  # Max messages folded into the summary per update
+
     # Embedding
     embedding_api_key: str = ""
     embedding_base_url: str = "https://api.openai.com/v1"
     embedding_model: str = "text-embedding-3-small"
     embedding_dimensions: int = 1536
+    embedding_storage: str = "vector"  # "vector" (float32) or "halfvec" (float16, half the bytes; see 018_compact_embeddings.sql)
+    embedding_batch_size: int = 100
+    embedding_cache_size: int = 10000  # In-process LRU entries (~6 KB each at 1536 dims)
+    embedding_cache_persistent: bool = True  # Also read/write the embedding_cache table
+    query_embedding_cache_size: int = 10000
+    query_embedding_cache_ttl_seconds: float = 3600
+    embedding_batch_window_ms: float = 5  # Merge concurrent callers' texts into one request
+    embedding_max_batch_size: int = 256  # Texts per provider request
+    embedding_max_batch_tokens: int = 100000  # Estimated tokens per provider request
+    embedding_max_concurrent_requests: int = 4
+    embedding_tokens_per_minute: int = 0  # Provider TPM budget; 0 = unlimited
+    embedding_max_retries: int = 5  # On 429 / 5xx / connection errors
 
     # Ingestion
-    chunk_size: int = 1000
+    chunker: str = "recursive"  # "recursive" (heading/paragraph/sentence-aware), "token" or "character"
+    chunk_max_tokens: int = 256  # Token budget per chunk (recursive and token chunkers)
+    chunk_overlap_tokens: int = 32
+    chunk_tokenizer: str = "approx"  # "approx" (~4 chars/token) or "tiktoken" (needs tiktoken)
+    chunk_tiktoken_encoding: str = "cl100k_base"
+    chunk_size: int = 1000  # Characters per chunk (character chunker)
     chunk_overlap: int = 200
+    ingestion_concurrency: int = 4  # Max in-flight embed/insert batches per document
+    storage_stream_chunk_size: int = 1024 * 1024  # Bytes per read when streaming files to/from Storage
+    upload_batch_max_files: int = 1000  # Files (or zip entries) per POST /api/documents/batch
+    upload_concurrency: int = 16  # Parallel Storage uploads per batch
+    metadata_extraction: bool = True  # One LLM call per document for title, type, date and tags
+    metadata_extraction_model: str = ""  # Empty = llm_model
+    metadata_extraction_chars: int = 4000  # Opening characters of the document sent to the model
+    metadata_extraction_max_tokens: int = 300
+
+    # Ingestion worker (job queue on the documents table)
+    ingestion_worker_in_api: bool = True  # Run a worker pool inside the API process
+    ingestion_worker_concurrency: int = 4  # Documents processed at once per worker
+    ingestion_lease_seconds: int = 300
+    ingestion_heartbeat_seconds: float = 30
+    ingestion_max_attempts: int = 3
+    ingestion_retry_backoff_seconds: float = 10  # Doubles on each retry
+    ingestion_poll_interval: float = 2.0
+
+    # Parsing (PDF/DOCX/HTML text extraction in a process pool)
+    parser_workers: int = 2  # Processes; extraction never runs on the event loop
+    parser_timeout_seconds: float = 120  # Per file; the worker process is killed on timeout
+    parser_memory_limit_mb: int = 1024  # Address-space limit per parser process (0 = none)
+
+    # Document events (SSE status/progress stream)
+    document_events_queue_size: int = 100  # Per open stream; oldest events dropped beyond this
+    document_events_channel: str = ""  # Realtime broadcast channel shared by replicas/workers; empty = local only
 
     # Retrieval
     retrieval_top_k: int = 5
     retrieval_score_threshold: float = 0.3
+    retrieval_mode: str = "hybrid"  # "hybrid" (keyword + vector, RRF) or "vector"
+    retrieval_full_text_weight: float = 1.0
+    retrieval_semantic_weight: float = 1.0
+    retrieval_rrf_k: int = 60
+    retrieval_candidate_count: int = 50  # Per-side candidate pool before fusion
+    retrieval_recall_target: float = 0.95  # ANN recall@k to aim for; picks ivfflat.probes / hnsw.ef_search
+    retrieval_exact_search_max_rows: int = 10000  # Users with at most this many chunks skip the ANN index
+    retrieval_rescore_factor: int = 0  # >0: binary-quantized coarse pass fetches k * this, rescored exactly
+    vector_index_refresh_seconds: float = 300  # How often the index method and calibration are re-read
+    retrieval_rerank: bool = False  # Over-fetch candidates and rerank them before cutting to top_k
+    retrieval_rerank_candidates: int = 50
+    reranker: str = "lexical"  # "lexical" (BM25) or "cross-encoder" (needs sentence-transformers)
+    reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    reranker_batch_window_ms: float = 5  # Collect concurrent rerank requests into one batch
+    reranker_cache_size: int = 50000
+    context_packing: bool = True  # Merge adjacent chunks, drop near-duplicates and cite compactly in tool results
+    context_token_budget: int = 3000  # Estimated tokens of search results per tool call
+    context_duplicate_threshold: float = 0.8  # Share of a passage's word 3-grams already sent that makes it a duplicate
+
+    # Local vector store (in-process exact search, needs numpy)
+    vector_store: str = "supabase"  # "supabase", "auto" (in-process for small users) or "local" (offline only)
+    local_vector_store_max_rows: int = 5000  # "auto": users with more chunks search the database
+    local_vector_store_max_users: int = 1000  # Users kept loaded (least recently searched evicted)
+    local_vector_store_dtype: str = "float32"  # "float32" or "int8" (4x smaller, approximate scores)
+    local_vector_store_dir: str = ""  # Save matrices here and memory-map them; empty = heap only
+    local_vector_store_ttl_seconds: float = 60  # Re-check a user's documents at most this often
+
+    # Auth
+    auth_token_cache_size: int = 10000  # Verified JWTs kept in memory (until their exp)
+    auth_jwks_refresh_seconds: float = 600
+
+    # Per-user cache (LLM settings, thread ownership)
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: float = 60
+    cache_invalidation_channel: str = ""  # Realtime broadcast channel shared by replicas; empty = local only
 
     # Supabase
     supabase_url: str
     supabase_service_role_key: str
     supabase_anon_key: str = ""
     supabase_jwt_secret: str = ""
+    database_url: str = ""  # Direct Postgres connection for manage_index DDL (not the API path)
 
     # Observability
     langsmith_api_key: str
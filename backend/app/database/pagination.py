@@ -0,0 +1,53 @@
+import base64
+import uuid
+from datetime import datetime
+from fastapi import HTTPException, Response
+
+# Listing routes return a plain JSON array; the cursor for the next page (if
+# any) goes in this header so existing clients keep working unchanged
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: str, row_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{sort_value}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Parse and validate a cursor into (timestamp, id); 400 if malformed."""
+    try:
+        sort_value, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        # Re-serialize so only a well-formed timestamp and uuid reach the filter
+        return datetime.fromisoformat(sort_value).isoformat(), str(uuid.UUID(row_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, column: str, cursor: str | None, limit: int, desc: bool = True):
+    """Order a query by (column, id) and start just after `cursor`.
+
+    Fetches limit + 1 rows so next_page can tell whether another page exists.
+    Needs an index on (<filter column>, column, id) to stay O(limit) at any depth.
+
+    Args:
+        query: A postgrest select builder, already filtered.
+        column: Timestamp column to sort on (e.g. "updated_at").
+        cursor: Cursor from the previous page's X-Next-Cursor header, or None.
+        limit: Page size.
+        desc: Newest first.
+    """
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        op = "lt" if desc else "gt"
+        query = query.or_(
+            f'{column}.{op}."{value}",and({column}.eq."{value}",id.{op}.{row_id})'
+        )
+    return query.order(column, desc=desc).order("id", desc=desc).limit(limit + 1)
+
+
+def next_page(rows: list[dict], column: str, limit: int, response: Response) -> list[dict]:
+    """Trim the look-ahead row and set the X-Next-Cursor header if there is more."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last[column], last["id"])
+    return rows
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any
+import psycopg2
+from app.config import settings
+
+# Maintenance functions that rewrite the chunks table or its index. They are
+# revoked from the API roles (025_maintenance_functions.sql): a PostgREST call
+# runs under the role's statement timeout and the gateway's request timeout,
+# both of which kill a rebuild on a real-size table.
+MAINTENANCE_FUNCTIONS = {"rebuild_chunk_index", "convert_chunk_embeddings", "partition_chunks_by_user"}
+
+
+def _call(name: str, params: dict) -> Any:
+    if not settings.database_url:
+        raise RuntimeError(
+            f"{name} needs DATABASE_URL: a direct Postgres connection string "
+            "(Supabase: Project Settings > Database > Connection string, port 5432)"
+        )
+    conn = psycopg2.connect(settings.database_url)
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute("set statement_timeout = 0")
+            args = ", ".join(f"{key} => %({key})s" for key in params)
+            cur.execute(f"select public.{name}({args})", params)
+            return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def call_maintenance_function(name: str, **params) -> Any:
+    """Run one of MAINTENANCE_FUNCTIONS over DATABASE_URL, without a statement timeout.
+
+    Each call is its own connection and transaction; the (blocking) driver
+    runs in a worker thread. json/jsonb results come back as Python objects.
+    """
+    if name not in MAINTENANCE_FUNCTIONS:
+        raise ValueError(f"Not a maintenance function: {name}")
+    return await asyncio.to_thread(_call, name, params)
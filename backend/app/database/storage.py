@@ -0,0 +1,69 @@
+import codecs
+from collections.abc import AsyncIterable, AsyncIterator
+from storage3.exceptions import StorageApiError
+from storage3.utils import StorageException
+from app.database.supabase_client import supabase
+
+# storage3's upload/download take and return whole `bytes`; these helpers talk
+# to the same Storage endpoints through its httpx session, but stream the body
+# so neither side ever holds a complete file in memory.
+
+
+def _object_url(bucket, path: str) -> str:
+    return str(bucket._base_url.joinpath("object", bucket.id, *path.split("/")))
+
+
+async def upload_stream(
+    bucket_id: str,
+    path: str,
+    chunks: AsyncIterable[bytes],
+    content_type: str,
+    upsert: bool = False,
+) -> None:
+    """Upload an object from an async stream of byte chunks (chunked transfer encoding).
+
+    If the chunk iterator raises, the request is aborted and nothing is stored.
+
+    Args:
+        bucket_id: Storage bucket, e.g. "documents".
+        path: Object path within the bucket.
+        chunks: Async iterable of file bytes, read lazily as the upload proceeds.
+        content_type: MIME type stored with the object.
+        upsert: Overwrite an existing object at `path`.
+    """
+    bucket = supabase.storage.from_(bucket_id)
+    headers = {"content-type": content_type, "x-upsert": "true" if upsert else "false"}
+    await bucket._request("POST", ["object", bucket.id, *path.split("/")], headers=headers, content=chunks)
+
+
+async def download_stream(bucket_id: str, path: str, chunk_size: int) -> AsyncIterator[bytes]:
+    """Yield a stored object's bytes in chunks of up to `chunk_size` as they arrive."""
+    bucket = supabase.storage.from_(bucket_id)
+    async with bucket._client.stream(
+        "GET", _object_url(bucket, path), headers=dict(bucket._headers)
+    ) as response:
+        if response.is_error:
+            await response.aread()
+            try:
+                error = response.json()
+                raise StorageApiError(error["message"], error["error"], error["statusCode"])
+            except (ValueError, KeyError):
+                raise StorageException(f"Download of {path} failed: HTTP {response.status_code}")
+        async for chunk in response.aiter_bytes(chunk_size):
+            yield chunk
+
+
+async def download_text_stream(bucket_id: str, path: str, chunk_size: int) -> AsyncIterator[str]:
+    """Yield a stored UTF-8 object as decoded text pieces.
+
+    Multi-byte characters split across chunk boundaries are carried over by an
+    incremental decoder; invalid UTF-8 raises UnicodeDecodeError as `.decode()` would.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in download_stream(bucket_id, path, chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
@@ -1,4 +1,8 @@
-from supabase import create_client, Client
+from supabase import AsyncClient
 from app.config import settings
 
-supabase: Client = create_client(settings.supabase_url, settings.supabase_service_role_key)
+# Async client — every query is awaited so PostgREST/Storage round trips never
+# block the event loop (and the SSE streams running on it).
+supabase: AsyncClient = AsyncClient(
+    settings.supabase_url, settings.supabase_service_role_key
+)
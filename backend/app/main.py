@@ -6,14 +6,45 @@ os.environ["LANGSMITH_TRACING"] = "true"
 os.environ["LANGSMITH_API_KEY"] = settings.langsmith_api_key
 os.environ["LANGSMITH_PROJECT"] = settings.langsmith_project
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from openai import OpenAIError
-from app.routers import chat, threads, documents
+from app.database.pagination import NEXT_CURSOR_HEADER
+from app.routers import chat, threads, documents, metrics
 import app.routers.settings as settings_router
+from app.services.job_queue import create_worker_pool
+from app.services.user_cache import user_cache
+from app.services.document_events import document_events
+from app.services.parser_pool import parser_pool
+from app.middleware.auth import start_jwks_refresh, stop_jwks_refresh
 
-app = FastAPI(title="RAG Masterclass API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Embedded ingestion worker for single-process deployments; run
+    # `python -m app.worker` separately and disable this to scale them apart
+    pool = create_worker_pool() if settings.ingestion_worker_in_api else None
+    if pool:
+        await pool.start()
+    # Signing keys are fetched off the request path
+    await start_jwks_refresh()
+    # Keep per-user caches coherent across replicas
+    if settings.cache_invalidation_channel:
+        await user_cache.connect(settings.cache_invalidation_channel)
+    if settings.document_events_channel:
+        await document_events.connect(settings.document_events_channel)
+    yield
+    await stop_jwks_refresh()
+    await user_cache.disconnect()
+    await document_events.disconnect()
+    if pool:
+        await pool.stop()
+    parser_pool.shutdown()
+
+
+app = FastAPI(title="RAG Masterclass API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,12 +52,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(chat.router)
 app.include_router(threads.router)
 app.include_router(documents.router)
 app.include_router(settings_router.router)
+app.include_router(metrics.router)
 
 
 @app.get("/api/health")
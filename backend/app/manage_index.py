@@ -0,0 +1,93 @@
+"""Manage the chunk embedding index.
+
+    python -m app.manage_index status
+    python -m app.manage_index rebuild --method hnsw [--m 16 --ef-construction 64]
+    python -m app.manage_index rebuild --method ivfflat [--lists N]
+    python -m app.manage_index rebuild --method binary [--column embedding_half]
+    python -m app.manage_index calibrate --user-id <uuid> [--user-id <uuid> ...]
+    python -m app.manage_index partition --partitions 16
+    python -m app.manage_index compact --to halfvec [--method hnsw]
+    python -m app.manage_index storage [--document-id <uuid>]
+
+`rebuild` sizes IVFFlat lists from the row count unless --lists is given and
+clears the recall calibration; run `calibrate` afterwards so retrieval can
+pick probes / ef_search for RETRIEVAL_RECALL_TARGET from measured recall.
+`partition` is a one-off migration of chunks to hash partitions on user_id.
+`compact` moves stored embeddings to halfvec (half the bytes) or back to
+vector and rebuilds the index on the new column; set EMBEDDING_STORAGE to
+match so new chunks land in the same column. `--method binary` indexes
+binary-quantized vectors for a Hamming coarse pass that is rescored exactly
+(set RETRIEVAL_RESCORE_FACTOR). Rebuilding, compacting and partitioning lock
+the chunks table while they run; they connect to Postgres directly through
+DATABASE_URL (no API statement or gateway timeouts), and the underlying
+functions can't be called through the API (025_maintenance_functions.sql).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from app.services.vector_index import (
+    calibrate,
+    convert_embeddings,
+    index_status,
+    partition_by_user,
+    rebuild_index,
+    storage_stats,
+)
+
+COLUMNS = {"halfvec": "embedding_half", "vector": "embedding"}
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.command == "status":
+        print(json.dumps(await index_status(), indent=2))
+    elif args.command == "rebuild":
+        status = await rebuild_index(
+            args.method, args.lists, args.m, args.ef_construction, args.maintenance_work_mem, args.column
+        )
+        print(json.dumps(status, indent=2))
+    elif args.command == "calibrate":
+        curve = await calibrate(args.user_id, args.queries, args.k)
+        print(f"{'depth':>6} {'recall@' + str(args.k):>9} {'p50':>9}")
+        for point in curve:
+            print(f"{point['search_depth']:>6} {point['recall']:>9.3f} {point['p50_ms']:>7.1f}ms")
+    elif args.command == "partition":
+        print(json.dumps(await partition_by_user(args.partitions), indent=2))
+    elif args.command == "compact":
+        method = args.method or (await index_status()).get("method") or "hnsw"
+        moved = await convert_embeddings(args.to, args.batch, lambda n: print(f"{n} rows converted"))
+        print(f"{moved} rows now stored as {args.to}; rebuilding {method} index")
+        status = await rebuild_index(method, column=COLUMNS[args.to])
+        print(json.dumps(status, indent=2))
+    elif args.command == "storage":
+        print(json.dumps(await storage_stats(args.document_id), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunk embedding index management")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Index method, parameters and size")
+    rebuild = commands.add_parser("rebuild", help="Drop and rebuild the embedding index")
+    rebuild.add_argument("--method", choices=("ivfflat", "hnsw", "binary"), required=True)
+    rebuild.add_argument("--lists", type=int, default=None, help="IVFFlat lists (default: from row count)")
+    rebuild.add_argument("--m", type=int, default=16, help="HNSW links per node")
+    rebuild.add_argument("--ef-construction", type=int, default=64)
+    rebuild.add_argument("--maintenance-work-mem", default=None, help="e.g. 1GB, for faster HNSW builds")
+    rebuild.add_argument("--column", choices=tuple(COLUMNS.values()), default=None,
+                         help="Embedding column (default: the one holding embeddings)")
+    calib = commands.add_parser("calibrate", help="Measure recall per search depth")
+    calib.add_argument("--user-id", action="append", required=True)
+    calib.add_argument("--queries", type=int, default=20, help="Query embeddings sampled per user")
+    calib.add_argument("--k", type=int, default=10)
+    partition = commands.add_parser("partition", help="Hash-partition chunks on user_id")
+    partition.add_argument("--partitions", type=int, required=True)
+    compact = commands.add_parser("compact", help="Convert stored embeddings and rebuild the index")
+    compact.add_argument("--to", choices=tuple(COLUMNS), required=True)
+    compact.add_argument("--batch", type=int, default=5000, help="Rows converted per call")
+    compact.add_argument("--method", choices=("ivfflat", "hnsw", "binary"), default=None,
+                         help="Index method (default: the current one)")
+    storage = commands.add_parser("storage", help="Bytes per chunk and table / index sizes")
+    storage.add_argument("--document-id", default=None)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(parser.parse_args()))
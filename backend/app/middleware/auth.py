@@ -1,15 +1,30 @@
+import asyncio
+import hashlib
+import logging
+import time
 import jwt
+from cachetools import LRUCache
 from jwt import PyJWKClient
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config import settings
 from app.models.schemas import AuthenticatedUser
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
 # Cache the JWKS client — fetches public keys from Supabase for ES256 verification
 _jwks_client: PyJWKClient | None = None
 
+# ES256 public keys by kid, filled at startup and refreshed in the background
+_signing_keys: dict[str, object] = {}
+_refresh_task: asyncio.Task | None = None
+
+# Verified tokens by sha256(token) -> (user, exp); re-checked against exp on every hit
+_verified_tokens: LRUCache = LRUCache(maxsize=settings.auth_token_cache_size)
+_token_cache_stats = {"hits": 0, "misses": 0}
+
 
 def _get_jwks_client() -> PyJWKClient:
     global _jwks_client
@@ -19,29 +34,92 @@ def _get_jwks_client() -> PyJWKClient:
     return _jwks_client
 
 
+def _fetch_signing_keys() -> dict[str, object]:
+    """Download the project's JWKS (blocking; call from a worker thread)."""
+    jwk_set = _get_jwks_client().get_jwk_set(refresh=True)
+    return {jwk.key_id: jwk.key for jwk in jwk_set.keys if jwk.key_id}
+
+
+async def refresh_signing_keys() -> None:
+    global _signing_keys
+    _signing_keys = await asyncio.to_thread(_fetch_signing_keys)
+
+
+async def _refresh_loop() -> None:
+    while True:
+        try:
+            await refresh_signing_keys()
+        except Exception:
+            # Not fatal: HS256-only projects have no keys, and an unknown kid
+            # still falls back to an on-demand fetch
+            logger.warning("JWKS refresh failed; keeping previous keys", exc_info=True)
+        await asyncio.sleep(settings.auth_jwks_refresh_seconds)
+
+
+async def start_jwks_refresh() -> None:
+    """Prefetch JWKS keys at startup and keep them fresh in the background."""
+    global _refresh_task
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_jwks_refresh() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
+
+
+async def _get_signing_key(token: str, kid: str | None):
+    key = _signing_keys.get(kid) if kid else None
+    if key is not None:
+        return key
+    # Unknown kid (key rotation, or no prefetch yet): fetch off the event loop
+    signing_key = await asyncio.to_thread(_get_jwks_client().get_signing_key_from_jwt, token)
+    if kid:
+        _signing_keys[kid] = signing_key.key
+    return signing_key.key
+
+
+async def _verify_token(token: str) -> dict:
+    # Try ES256 (newer Supabase projects) via JWKS
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") == "ES256":
+        return jwt.decode(
+            token,
+            await _get_signing_key(token, header.get("kid")),
+            algorithms=["ES256"],
+            audience="authenticated",
+        )
+    # Fall back to HS256 (older Supabase projects)
+    return jwt.decode(
+        token,
+        settings.supabase_jwt_secret,
+        algorithms=["HS256"],
+        audience="authenticated",
+    )
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> AuthenticatedUser:
     token = credentials.credentials
+    token_hash = hashlib.sha256(token.encode()).digest()
+
+    cached = _verified_tokens.get(token_hash)
+    if cached is not None:
+        user, exp = cached
+        if exp is None or exp > time.time():
+            _token_cache_stats["hits"] += 1
+            return user
+        _verified_tokens.pop(token_hash, None)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired"
+        )
+    _token_cache_stats["misses"] += 1
+
     try:
-        # Try ES256 (newer Supabase projects) via JWKS
-        header = jwt.get_unverified_header(token)
-        if header.get("alg") == "ES256":
-            signing_key = _get_jwks_client().get_signing_key_from_jwt(token)
-            payload = jwt.decode(
-                token,
-                signing_key.key,
-                algorithms=["ES256"],
-                audience="authenticated",
-            )
-        else:
-            # Fall back to HS256 (older Supabase projects)
-            payload = jwt.decode(
-                token,
-                settings.supabase_jwt_secret,
-                algorithms=["HS256"],
-                audience="authenticated",
-            )
+        payload = await _verify_token(token)
 
         user_id = payload.get("sub")
         email = payload.get("email")
@@ -49,7 +127,9 @@ async def get_current_user(
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
             )
-        return AuthenticatedUser(id=user_id, email=email or "")
+        user = AuthenticatedUser(id=user_id, email=email or "")
+        _verified_tokens[token_hash] = (user, payload.get("exp"))
+        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired"
@@ -58,3 +138,13 @@ async def get_current_user(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         )
+
+
+def auth_stats() -> dict:
+    lookups = _token_cache_stats["hits"] + _token_cache_stats["misses"]
+    return {
+        **_token_cache_stats,
+        "hit_rate": _token_cache_stats["hits"] / lookups if lookups else 0.0,
+        "entries": len(_verified_tokens),
+        "jwks_keys": len(_signing_keys),
+    }
@@ -35,10 +35,38 @@ class DocumentResponse(BaseModel):
     status: str
     error_message: str | None = None
     chunk_count: int
+    ingest_stats: dict | None = None
+    metadata: dict | None = None
     created_at: datetime
     updated_at: datetime
 
 
+class SkippedUpload(BaseModel):
+    filename: str
+    reason: str
+
+
+class BatchUploadResponse(BaseModel):
+    batch_id: str
+    documents: list[DocumentResponse]  # Created, re-queued and unchanged, in upload order
+    skipped: list[SkippedUpload]
+
+
+class BatchProgressResponse(BaseModel):
+    batch_id: str
+    total: int
+    pending: int
+    processing: int
+    completed: int
+    failed: int
+    chunk_count: int
+
+
+class DeletedDocumentsResponse(BaseModel):
+    document_ids: list[str]
+    complete: bool  # False if `since` predates the kept tombstones; reload the full list
+
+
 class UserSettingsRequest(BaseModel):
     llm_base_url: str | None = None
     llm_model: str | None = None
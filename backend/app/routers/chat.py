@@ -1,86 +1,48 @@
+import asyncio
 import json
+import time
+import uuid
 from fastapi import APIRouter, Depends, HTTPException
 from sse_starlette.sse import EventSourceResponse
 from app.middleware.auth import get_current_user
 from app.models.schemas import AuthenticatedUser, ChatRequest
 from app.database.supabase_client import supabase
 from app.services.llm_service import stream_chat_response
+from app.services.context_service import build_messages, schedule_summary_update
+from app.services.context_packer import pack_results
+from app.services.metadata_service import normalize_date
 from app.config import settings
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
 
-def _build_messages(system_prompt: str, history: list[dict]) -> list[dict]:
-    """Build Chat Completions messages array from system prompt + history."""
-    messages = [{"role": "system", "content": system_prompt}]
-    for msg in history:
-        messages.append({"role": msg["role"], "content": msg["content"]})
-    return messages
-
-
-def _get_user_llm_settings(user_id: str) -> dict:
-    """Load user's LLM settings. Returns dict with model and base_url (may be None)."""
-    result = (
-        supabase.table("user_settings")
-        .select("llm_base_url, llm_model")
-        .eq("user_id", user_id)
-        .execute()
-    )
-    if result.data:
-        return result.data[0]
-    return {}
-
-
 @router.post("/chat")
 async def chat(
     request: ChatRequest, user: AuthenticatedUser = Depends(get_current_user)
 ):
-    thread_id = request.thread_id
-
-    if thread_id:
-        # Verify thread belongs to user
-        result = (
-            supabase.table("threads")
-            .select("id")
-            .eq("id", thread_id)
-            .eq("user_id", user.id)
-            .execute()
-        )
-        if not result.data:
-            raise HTTPException(status_code=404, detail="Thread not found")
-    else:
-        # Auto-create thread with message preview as title
-        title = request.message[:50] + ("..." if len(request.message) > 50 else "")
-        result = (
-            supabase.table("threads")
-            .insert({"user_id": user.id, "title": title})
-            .execute()
-        )
-        thread_id = result.data[0]["id"]
-
-    # Save user message
-    supabase.table("messages").insert(
+    # Verify or create the thread, save the user message and load bounded
+    # history + LLM settings in a single round trip
+    title = request.message[:50] + ("..." if len(request.message) > 50 else "")
+    result = await supabase.rpc(
+        "begin_chat_turn",
         {
-            "thread_id": thread_id,
-            "user_id": user.id,
-            "role": "user",
-            "content": request.message,
-        }
+            "p_user_id": user.id,
+            "p_thread_id": request.thread_id,
+            "p_message": request.message,
+            "p_title": title,
+            "p_history_limit": 2 * settings.chat_history_max_turns,
+        },
     ).execute()
+    turn = result.data
+    if not turn:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    thread_id = turn["thread_id"]
+    user_llm_settings = turn["settings"]
 
-    # Load full conversation history for this thread
-    history_result = (
-        supabase.table("messages")
-        .select("role, content")
-        .eq("thread_id", thread_id)
-        .eq("user_id", user.id)
-        .order("created_at")
-        .execute()
-    )
-    messages = _build_messages(settings.llm_system_prompt, history_result.data)
+    # Recent turns verbatim; anything older is covered by the thread summary
+    messages = build_messages(settings.llm_system_prompt, turn["summary"], turn["history"])
 
     async def event_generator():
-        user_llm_settings = _get_user_llm_settings(user.id)
         yield {"event": "thread_id", "data": json.dumps({"thread_id": thread_id})}
 
         full_content = ""
@@ -108,19 +70,17 @@ async def chat(
                 elif event_type == "tool_call":
                     tool_calls_received.append(data)
                 elif event_type == "done":
-                    # Save assistant message
-                    supabase.table("messages").insert(
+                    # Save assistant message (a trigger bumps the thread's updated_at)
+                    await supabase.rpc(
+                        "finish_chat_turn",
                         {
-                            "thread_id": thread_id,
-                            "user_id": user.id,
-                            "role": "assistant",
-                            "content": full_content,
-                        }
+                            "p_user_id": user.id,
+                            "p_thread_id": thread_id,
+                            "p_content": full_content,
+                        },
                     ).execute()
-                    # Update thread updated_at
-                    supabase.table("threads").update(
-                        {"title": supabase.table("threads").select("title").eq("id", thread_id).execute().data[0]["title"]}
-                    ).eq("id", thread_id).eq("user_id", user.id).execute()
+                    # Fold turns leaving the window into the summary, off the response path
+                    schedule_summary_update(thread_id, user.id)
                     yield {
                         "event": "done",
                         "data": json.dumps({"thread_id": thread_id}),
@@ -154,11 +114,33 @@ async def chat(
                     }
                 )
 
-                # Execute each tool call
-                for tc in tool_calls_received:
-                    tool_result = await _execute_tool_call(
-                        tc["name"], tc["arguments"], user.id
-                    )
+                # Execute the round's tool calls concurrently, reporting progress as they go
+                tool_results: list[str] = [""] * len(tool_calls_received)
+                async for event_type, i, data in _execute_tool_calls(
+                    tool_calls_received, user.id
+                ):
+                    tc = tool_calls_received[i]
+                    if event_type == "tool_start":
+                        yield {
+                            "event": "tool_start",
+                            "data": json.dumps({"id": tc["id"], "name": tc["name"]}),
+                        }
+                    else:
+                        tool_results[i] = data["content"]
+                        yield {
+                            "event": "tool_result",
+                            "data": json.dumps(
+                                {
+                                    "id": tc["id"],
+                                    "name": tc["name"],
+                                    "status": data["status"],
+                                    "elapsed_ms": data["elapsed_ms"],
+                                }
+                            ),
+                        }
+
+                # Results go back in the order the model issued the calls
+                for tc, tool_result in zip(tool_calls_received, tool_results):
                     current_messages.append(
                         {
                             "role": "tool",
@@ -180,6 +162,79 @@ async def chat(
     )
 
 
+async def _execute_tool_calls(tool_calls: list[dict], user_id: str):
+    """Run one round of tool calls concurrently.
+
+    At most settings.chat_tool_concurrency calls run at once and each is bounded
+    by settings.chat_tool_timeout_seconds; a failed or timed-out call yields an
+    error result for the model instead of aborting the round.
+
+    Yields tuples of (event_type, index, data) as calls start and finish:
+        - ("tool_start", i, None)
+        - ("tool_result", i, {"content": str, "status": "ok" | "error" | "timeout", "elapsed_ms": float})
+    """
+    semaphore = asyncio.Semaphore(settings.chat_tool_concurrency)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run(i: int, tc: dict) -> None:
+        async with semaphore:
+            events.put_nowait(("tool_start", i, None))
+            start = time.perf_counter()
+            try:
+                content = await asyncio.wait_for(
+                    _execute_tool_call(tc["name"], tc["arguments"], user_id),
+                    timeout=settings.chat_tool_timeout_seconds,
+                )
+                status = "ok"
+            except asyncio.TimeoutError:
+                content = json.dumps({"error": f"Tool {tc['name']} timed out"})
+                status = "timeout"
+            except Exception as e:
+                content = json.dumps({"error": f"Tool {tc['name']} failed: {e}"})
+                status = "error"
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        events.put_nowait(
+            ("tool_result", i, {"content": content, "status": status, "elapsed_ms": elapsed_ms})
+        )
+
+    tasks = [asyncio.create_task(run(i, tc)) for i, tc in enumerate(tool_calls)]
+    try:
+        for _ in range(2 * len(tasks)):
+            yield await events.get()
+    finally:
+        # Client disconnected mid-round: don't leave searches running
+        for task in tasks:
+            task.cancel()
+
+
+def _tool_date(value, end: bool = False) -> str | None:
+    """ISO date from a tool argument ("YYYY-MM-DD", "YYYY-MM" or "YYYY"), or None.
+
+    With `end`, a year or month resolves to its last day, so date_to "2024-03"
+    includes all of March.
+    """
+    if not value:
+        return None
+    normalized = normalize_date(str(value), end=end)
+    if normalized is None:
+        raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+    return normalized
+
+
+def _tool_document_ids(value) -> list[str] | None:
+    """Document ids from a tool argument as canonical UUID strings, or None."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise ValueError("document_ids must be a list of document ids")
+    try:
+        return [str(uuid.UUID(str(document_id))) for document_id in value]
+    except ValueError:
+        raise ValueError(f"Invalid document_ids: {value} (expected document UUIDs)") from None
+
+
 async def _execute_tool_call(name: str, arguments: str, user_id: str) -> str:
     """Execute a tool call and return the result as a string."""
     try:
@@ -192,9 +247,36 @@ async def _execute_tool_call(name: str, arguments: str, user_id: str) -> str:
         from app.services.retrieval_service import search_documents
 
         query = args.get("query", "")
-        results = await search_documents(query=query, user_id=user_id)
+        # Filter fields map onto chunk metadata (see metadata_service)
+        metadata = {
+            key: args[arg]
+            for key, arg in (("filename", "filename"), ("type", "document_type"), ("tags", "tags"))
+            if args.get(arg)
+        }
+        if "type" in metadata:
+            metadata["type"] = str(metadata["type"]).lower()
+        if "tags" in metadata:
+            tags = metadata["tags"]
+            # A single tag ("q3") would otherwise be split into characters
+            metadata["tags"] = [str(tag).lower() for tag in (tags if isinstance(tags, list) else [tags])]
+        try:
+            document_ids = _tool_document_ids(args.get("document_ids"))
+            date_from = _tool_date(args.get("date_from"))
+            date_to = _tool_date(args.get("date_to"), end=True)
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        results = await search_documents(
+            query=query,
+            user_id=user_id,
+            document_ids=document_ids,
+            metadata=metadata or None,
+            date_from=date_from,
+            date_to=date_to,
+        )
         if not results:
             return json.dumps({"results": [], "message": "No relevant documents found."})
+        if settings.context_packing:
+            return json.dumps(pack_results(results), ensure_ascii=False)
         return json.dumps({"results": results})
     else:
         return json.dumps({"error": f"Unknown tool: {name}"})
@@ -1,20 +1,116 @@
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+import hashlib
+import json
+import logging
+import os
+import uuid
+import zipfile
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import PurePosixPath
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
+from sse_starlette.sse import EventSourceResponse
+from app.config import settings
 from app.middleware.auth import get_current_user
-from app.models.schemas import AuthenticatedUser, DocumentResponse
+from app.models.schemas import (
+    AuthenticatedUser,
+    BatchProgressResponse,
+    BatchUploadResponse,
+    DeletedDocumentsResponse,
+    DocumentResponse,
+    SkippedUpload,
+)
 from app.database.supabase_client import supabase
-from app.services.ingestion_service import process_document
+from app.database.pagination import keyset_page, next_page
+from app.database.storage import upload_stream
+from app.services.document_events import document_events, publish_document_event
+from app.services.job_queue import wake_workers
+from app.services.parser_pool import discard_extracted_text
+from app.services.parsers import DOCX_MIME, parsed_mime_types
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
-# Allowed MIME types (plain text for Module 2; PDF/DOCX/HTML added in Module 5)
+# Plain text is chunked as stored; everything else goes through a registered parser
 ALLOWED_MIME_TYPES = {
     "text/plain",
     "text/markdown",
-    "text/html",
-}
+} | parsed_mime_types()
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
+MAX_BATCH_SIZE = 500 * 1024 * 1024  # 500 MB per batch upload, uncompressed
+
+ZIP_MIME_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+# For zip entries, and browsers that send no (or a generic) content type
+EXTENSION_MIME_TYPES = {
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".markdown": "text/markdown",
+    ".html": "text/html",
+    ".htm": "text/html",
+    ".pdf": "application/pdf",
+    ".docx": DOCX_MIME,
+}
+
+# DocumentResponse fields, so listings don't ship storage paths, hashes and lease columns
+DOCUMENT_COLUMNS = (
+    "id, filename, mime_type, file_size, status, error_message, chunk_count, "
+    "ingest_stats, metadata, created_at, updated_at"
+)
+
+
+async def _stream_to_storage(
+    read: Callable[[int], Awaitable[bytes]], content_type: str, storage_path: str
+) -> tuple[int, str]:
+    """Copy a file to Storage chunk by chunk, enforcing the size limit and hashing as it goes.
+
+    Args:
+        read: Async `read(n)` of the source (an UploadFile, or a zip entry).
+        content_type: MIME type stored with the object.
+        storage_path: Object path in the documents bucket.
+
+    Returns:
+        (file_size, sha256 hex digest) of the stored object.
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    async def chunks():
+        nonlocal size
+        while chunk := await read(settings.storage_stream_chunk_size):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                raise HTTPException(status_code=400, detail="File too large (max 50MB)")
+            digest.update(chunk)
+            yield chunk
+
+    try:
+        await upload_stream("documents", storage_path, chunks(), content_type)
+    except Exception:
+        await _remove_objects([storage_path])
+        raise
+    return size, digest.hexdigest()
+
+
+def _safe_filename(name: str | None) -> str | None:
+    """The final path component of a client-supplied name, or None if there isn't one.
+
+    Filenames become part of the Storage path, and Storage URLs resolve "..",
+    so directories (including "../" and absolute paths) are dropped.
+    """
+    name = PurePosixPath((name or "").replace("\\", "/")).name
+    return name if name not in ("", ".", "..") else None
+
+
+async def _remove_objects(storage_paths: list[str]) -> None:
+    # Storage removes up to 1000 objects per request
+    for i in range(0, len(storage_paths), 1000):
+        try:
+            await supabase.storage.from_("documents").remove(storage_paths[i : i + 1000])
+        except Exception:
+            pass  # Storage deletion is best-effort
 
 
 @router.post("", response_model=DocumentResponse)
@@ -28,72 +124,358 @@ async def upload_document(
             status_code=400,
             detail=f"Unsupported file type: {file.content_type}. Allowed: {', '.join(ALLOWED_MIME_TYPES)}",
         )
+    filename = _safe_filename(file.filename)
+    if filename is None:
+        raise HTTPException(status_code=400, detail="Invalid filename")
+
+    # Every upload streams to a fresh object, so a re-upload never clobbers the
+    # current version before we know (from its hash) whether it changed
+    upload_id = str(uuid.uuid4())
+    storage_path = f"{user.id}/{upload_id}/{filename}"
+    file_size, file_hash = await _stream_to_storage(file.read, file.content_type, storage_path)
+
+    # Record manager: a re-upload of the same filename updates that document
+    existing = (
+        await supabase.table("documents")
+        .select("*")
+        .eq("user_id", user.id)
+        .eq("filename", filename)
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    if existing.data:
+        doc = existing.data[0]
+        if doc["content_hash"] == file_hash and doc["status"] != "failed":
+            # Unchanged file — nothing to keep or re-ingest
+            await _remove_objects([storage_path])
+            return doc
+        if doc["status"] == "processing":
+            # Re-queueing would let a second worker ingest it alongside the running one
+            await _remove_objects([storage_path])
+            raise HTTPException(
+                status_code=409,
+                detail=f"{filename} is still being processed; upload the new version when it finishes",
+            )
 
-    # Read file content
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large (max 50MB)")
+        # Point the document at the new object and re-queue; ingestion diffs
+        # chunk hashes so only changed chunks are re-embedded
+        doc_result = (
+            await supabase.table("documents")
+            .update(
+                {
+                    "storage_path": storage_path,
+                    "mime_type": file.content_type,
+                    "file_size": file_size,
+                    "content_hash": file_hash,
+                    "status": "pending",
+                    "error_message": None,
+                    "attempts": 0,
+                    "next_attempt_at": datetime.now(timezone.utc).isoformat(),
+                    "locked_by": None,
+                    "lease_expires_at": None,
+                }
+            )
+            .eq("id", doc["id"])
+            .neq("status", "processing")  # Claimed since we read it
+            .execute()
+        )
+        if not doc_result.data:
+            await _remove_objects([storage_path])
+            raise HTTPException(
+                status_code=409,
+                detail=f"{filename} is still being processed; upload the new version when it finishes",
+            )
+        if doc["storage_path"] != storage_path:
+            await _remove_objects([doc["storage_path"]])
+        if doc["content_hash"] != file_hash:
+            await discard_extracted_text(user.id, doc["content_hash"])
+        wake_workers()
+        publish_document_event(user.id, doc["id"], "pending")
+        return doc_result.data[0]
 
-    # Create document record
+    # Create document record (status 'pending' = queued for ingestion); the
+    # file is already stored, so the row is claimable by a worker right away
     doc_result = (
-        supabase.table("documents")
+        await supabase.table("documents")
         .insert(
             {
+                "id": upload_id,
                 "user_id": user.id,
-                "filename": file.filename,
-                "storage_path": "",  # Will update after storage upload
+                "filename": filename,
+                "storage_path": storage_path,
                 "mime_type": file.content_type,
-                "file_size": len(content),
+                "file_size": file_size,
+                "content_hash": file_hash,
             }
         )
         .execute()
     )
-    doc = doc_result.data[0]
-    document_id = doc["id"]
-
-    # Upload to Supabase Storage
-    storage_path = f"{user.id}/{document_id}/{file.filename}"
-    supabase.storage.from_("documents").upload(
-        path=storage_path,
-        file=content,
-        file_options={"content-type": file.content_type},
+
+    # Wake any in-process workers instead of waiting for their next poll
+    wake_workers()
+    publish_document_event(user.id, upload_id, "pending")
+
+    return doc_result.data[0]
+
+
+def _upload_mime_type(filename: str, content_type: str | None = None) -> str | None:
+    """The declared type if supported, else one inferred from the extension (None if unsupported)."""
+    if content_type in ALLOWED_MIME_TYPES:
+        return content_type
+    return EXTENSION_MIME_TYPES.get(os.path.splitext(filename)[1].lower())
+
+
+def _zip_reader(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> Callable[[int], Awaitable[bytes]]:
+    """Async read(n) for one zip entry; decompression runs in a thread."""
+    member = None
+
+    async def read(size: int) -> bytes:
+        nonlocal member
+        if member is None:
+            member = archive.open(info)
+        data = await asyncio.to_thread(member.read, size)
+        if not data:
+            member.close()
+        return data
+
+    return read
+
+
+@router.post("/batch", response_model=BatchUploadResponse)
+async def upload_documents_batch(
+    files: list[UploadFile] = File(...),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    """Upload many files, or .zip archives of them, as one batch.
+
+    Files are streamed to Storage concurrently (UPLOAD_CONCURRENCY at a time),
+    registered with a single create_document_batch call and queued together.
+    Zip entries are stored under their base name. Re-uploads follow the same
+    rules as the single upload route. Unsupported, oversized or duplicate
+    files are listed in `skipped` instead of failing the batch; more than
+    500MB read in total (whatever the declared sizes) fails it. Track
+    progress with GET /batches/{batch_id} or the event stream.
+    """
+    batch_id = str(uuid.uuid4())
+    # (filename, mime_type, read) per file to store, in upload order
+    pending: list[tuple[str, str, Callable[[int], Awaitable[bytes]]]] = []
+    skipped: list[SkippedUpload] = []
+    seen: set[str] = set()
+    total_size = 0
+
+    def add(filename: str, mime_type: str | None, read, size: int | None) -> None:
+        nonlocal total_size
+        if mime_type is None:
+            skipped.append(SkippedUpload(filename=filename, reason="Unsupported file type"))
+        elif filename in seen:
+            skipped.append(SkippedUpload(filename=filename, reason="Duplicate filename in batch"))
+        elif size is not None and size > MAX_FILE_SIZE:
+            skipped.append(SkippedUpload(filename=filename, reason="File too large (max 50MB)"))
+        else:
+            seen.add(filename)
+            pending.append((filename, mime_type, read))
+            total_size += size or 0
+
+    for upload in files:
+        if upload.content_type in ZIP_MIME_TYPES or upload.filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                skipped.append(SkippedUpload(filename=upload.filename, reason="Not a valid zip archive"))
+                continue
+            for info in archive.infolist():
+                # Entry names are attacker-controlled ("../../<user>/x.txt"); keep the base name only
+                name = _safe_filename(info.filename)
+                if info.is_dir() or info.filename.startswith("__MACOSX/") or not name or name.startswith("."):
+                    continue
+                add(name, _upload_mime_type(name), _zip_reader(archive, info), info.file_size)
+        else:
+            name = _safe_filename(upload.filename)
+            if name is None:
+                skipped.append(SkippedUpload(filename=upload.filename or "", reason="Invalid filename"))
+                continue
+            add(name, _upload_mime_type(name, upload.content_type), upload.read, upload.size)
+
+    if len(pending) > settings.upload_batch_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files (max {settings.upload_batch_max_files} per batch)",
+        )
+    if total_size > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail="Batch too large (max 500MB)")
+
+    semaphore = asyncio.Semaphore(settings.upload_concurrency)
+    # Declared sizes (zip headers especially) can lie; the cap also applies to bytes actually read
+    received = 0
+
+    def counted(read: Callable[[int], Awaitable[bytes]]) -> Callable[[int], Awaitable[bytes]]:
+        async def read_counted(size: int) -> bytes:
+            nonlocal received
+            data = await read(size)
+            received += len(data)
+            if received > MAX_BATCH_SIZE:
+                raise HTTPException(status_code=400, detail="Batch too large (max 500MB)")
+            return data
+
+        return read_counted
+
+    async def store(filename: str, mime_type: str, read) -> dict | SkippedUpload:
+        async with semaphore:
+            document_id = str(uuid.uuid4())
+            storage_path = f"{user.id}/{document_id}/{filename}"
+            try:
+                file_size, file_hash = await _stream_to_storage(counted(read), mime_type, storage_path)
+            except HTTPException as e:
+                return SkippedUpload(filename=filename, reason=e.detail)
+            except Exception:
+                logger.warning("Batch %s: storing %s failed", batch_id, filename, exc_info=True)
+                return SkippedUpload(filename=filename, reason="Storage upload failed")
+            return {
+                "id": document_id,
+                "filename": filename,
+                "storage_path": storage_path,
+                "mime_type": mime_type,
+                "file_size": file_size,
+                "content_hash": file_hash,
+            }
+
+    results = await asyncio.gather(*(store(*item) for item in pending))
+    stored = [r for r in results if isinstance(r, dict)]
+    if received > MAX_BATCH_SIZE:
+        await _remove_objects([r["storage_path"] for r in stored])
+        raise HTTPException(status_code=400, detail="Batch too large (max 500MB)")
+    skipped.extend(r for r in results if isinstance(r, SkippedUpload))
+    if not stored:
+        return BatchUploadResponse(batch_id=batch_id, documents=[], skipped=skipped)
+
+    # One round trip registers every file; rows come back from the function,
+    # so nothing is re-selected
+    try:
+        result = await supabase.rpc(
+            "create_document_batch",
+            {"p_user_id": user.id, "p_batch_id": batch_id, "p_documents": stored},
+        ).execute()
+    except Exception:
+        await _remove_objects([r["storage_path"] for r in stored])
+        raise
+    created, updated, unchanged = (result.data[key] for key in ("created", "updated", "unchanged"))
+    busy = result.data.get("busy") or []
+    skipped.extend(
+        SkippedUpload(filename=doc["filename"], reason="Still being processed; upload again when it finishes")
+        for doc in busy
     )
 
-    # Update storage path
-    supabase.table("documents").update({"storage_path": storage_path}).eq(
-        "id", document_id
-    ).execute()
+    # Unchanged files keep their current object; re-uploads replace theirs;
+    # new versions of documents being processed are dropped
+    new_paths = {r["filename"]: r["storage_path"] for r in stored}
+    await _remove_objects(
+        [new_paths[doc["filename"]] for doc in unchanged + busy]
+        + [doc["old_storage_path"] for doc in updated if doc["old_storage_path"] != doc["storage_path"]]
+    )
+    for doc in updated:
+        if doc["old_content_hash"] and doc["old_content_hash"] != doc["content_hash"]:
+            await discard_extracted_text(user.id, doc["old_content_hash"])
 
-    # Kick off background processing
-    asyncio.create_task(process_document(document_id, user.id))
+    queued = created + updated
+    if queued:
+        wake_workers()
+    for doc in queued:
+        publish_document_event(user.id, doc["id"], "pending")
 
-    # Return the document (re-fetch to get updated storage_path)
-    result = (
-        supabase.table("documents").select("*").eq("id", document_id).execute()
+    by_filename = {doc["filename"]: doc for doc in queued + unchanged}
+    return BatchUploadResponse(
+        batch_id=batch_id,
+        documents=[by_filename[r["filename"]] for r in stored if r["filename"] in by_filename],
+        skipped=skipped,
     )
-    return result.data[0]
+
+
+@router.get("/batches/{batch_id}", response_model=BatchProgressResponse)
+async def get_batch_progress(
+    batch_id: uuid.UUID, user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Aggregate status counts for an upload batch (documents later re-uploaded elsewhere drop out)."""
+    result = await supabase.rpc(
+        "document_batch_progress", {"p_user_id": user.id, "p_batch_id": str(batch_id)}
+    ).execute()
+    if not result.data or not result.data["total"]:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return {"batch_id": str(batch_id), **result.data}
 
 
 @router.get("", response_model=list[DocumentResponse])
-async def list_documents(user: AuthenticatedUser = Depends(get_current_user)):
-    result = (
-        supabase.table("documents")
-        .select("*")
-        .eq("user_id", user.id)
-        .order("created_at", desc=True)
-        .execute()
-    )
+async def list_documents(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    updated_since: datetime | None = None,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    """List the user's documents, newest first; pass X-Next-Cursor back as `cursor` for more.
+
+    With `updated_since`, only documents changed after that time are returned
+    (a delta for clients catching up after an event stream reconnect; page
+    through it with `cursor` and fetch deletions from /deleted).
+    """
+    query = supabase.table("documents").select(DOCUMENT_COLUMNS).eq("user_id", user.id)
+    if updated_since:
+        query = query.gt("updated_at", updated_since.isoformat())
+    result = await keyset_page(query, "created_at", cursor, limit).execute()
+    return next_page(result.data, "created_at", limit, response)
+
+
+@router.get("/deleted", response_model=DeletedDocumentsResponse)
+async def list_deleted_documents(
+    since: datetime, user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Ids of the user's documents deleted after `since`, from 023_document_tombstones.
+
+    `complete` is false when `since` is older than the tombstones kept; the
+    client should then reload its list instead of applying a delta.
+    """
+    result = await supabase.rpc(
+        "deleted_documents_since", {"p_user_id": user.id, "p_since": since.isoformat()}
+    ).execute()
     return result.data
 
 
+@router.get("/events")
+async def document_events_stream(user: AuthenticatedUser = Depends(get_current_user)):
+    """Server-sent events for the user's documents.
+
+    Each `document` event carries {"document_id", "status", ...}: status
+    changes (pending, processing, completed, failed, deleted) and ingestion
+    progress (chunks_done / chunks_total while processing).
+    """
+    queue = document_events.subscribe(user.id)
+
+    async def event_generator():
+        try:
+            while True:
+                event = await queue.get()
+                yield {"event": "document", "data": json.dumps(event)}
+        finally:
+            document_events.unsubscribe(user.id, queue)
+
+    return EventSourceResponse(
+        event_generator(),
+        ping=15,
+        headers={
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-cache",
+        },
+    )
+
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str, user: AuthenticatedUser = Depends(get_current_user)
 ):
     # Fetch document to get storage path
     doc_result = (
-        supabase.table("documents")
-        .select("*")
+        await supabase.table("documents")
+        .select("storage_path, content_hash")
         .eq("id", document_id)
         .eq("user_id", user.id)
         .execute()
@@ -104,14 +486,13 @@ async def delete_document(
     doc = doc_result.data[0]
 
     # Delete from Supabase Storage
-    try:
-        supabase.storage.from_("documents").remove([doc["storage_path"]])
-    except Exception:
-        pass  # Storage deletion is best-effort
+    await _remove_objects([doc["storage_path"]])
 
     # Delete document row (cascade deletes chunks)
-    supabase.table("documents").delete().eq("id", document_id).eq(
+    await supabase.table("documents").delete().eq("id", document_id).eq(
         "user_id", user.id
     ).execute()
+    await discard_extracted_text(user.id, doc["content_hash"])
+    publish_document_event(user.id, document_id, "deleted")
 
     return {"status": "deleted"}
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends
+from app.middleware.auth import auth_stats, get_current_user
+from app.models.schemas import AuthenticatedUser
+from app.services.embedding_cache import embedding_cache, query_embedding_cache
+from app.services.embedding_service import get_embedding_scheduler
+from app.services.local_vector_store import local_vector_store
+from app.services.document_events import document_events
+from app.services.parser_pool import parser_pool
+from app.services.reranker import rerank_stats
+from app.services.user_cache import user_cache
+from app.services.vector_index import search_tuner
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get("")
+async def get_metrics(user: AuthenticatedUser = Depends(get_current_user)):
+    """In-process cache counters for this API replica."""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "embedding_scheduler": get_embedding_scheduler().stats(),
+        "reranker": rerank_stats(),
+        "user_cache": user_cache.stats(),
+        "auth_token_cache": auth_stats(),
+        "document_events": document_events.stats(),
+        "parser_pool": parser_pool.stats(),
+        "vector_index": search_tuner.stats(),
+        "local_vector_store": local_vector_store.stats(),
+    }
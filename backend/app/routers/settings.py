@@ -7,6 +7,7 @@ from app.models.schemas import (
     SettingsDefaultsResponse,
 )
 from app.database.supabase_client import supabase
+from app.services.user_cache import user_cache
 from app.config import settings
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
@@ -14,15 +15,10 @@ router = APIRouter(prefix="/api/settings", tags=["settings"])
 
 @router.get("", response_model=UserSettingsResponse)
 async def get_settings(user: AuthenticatedUser = Depends(get_current_user)):
-    result = (
-        supabase.table("user_settings")
-        .select("llm_base_url, llm_model")
-        .eq("user_id", user.id)
-        .execute()
-    )
-    if not result.data:
+    cached = await user_cache.get_settings(user.id)
+    if not cached:
         return UserSettingsResponse()
-    return result.data[0]
+    return cached
 
 
 @router.put("", response_model=UserSettingsResponse)
@@ -32,7 +28,7 @@ async def update_settings(
 ):
     # Upsert: insert or update on conflict
     result = (
-        supabase.table("user_settings")
+        await supabase.table("user_settings")
         .upsert(
             {
                 "user_id": user.id,
@@ -43,6 +39,7 @@ async def update_settings(
         )
         .execute()
     )
+    user_cache.set_settings(user.id, result.data[0])
     return result.data[0]
 
 
@@ -1,27 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from app.middleware.auth import get_current_user
 from app.models.schemas import AuthenticatedUser, ThreadResponse, MessageResponse
 from app.database.supabase_client import supabase
+from app.database.pagination import keyset_page, next_page
+from app.services.user_cache import user_cache
 
 router = APIRouter(prefix="/api/threads", tags=["threads"])
 
 
+THREAD_COLUMNS = "id, title, created_at, updated_at"
+MESSAGE_COLUMNS = "id, thread_id, role, content, created_at"
+
+
 @router.get("", response_model=list[ThreadResponse])
-async def list_threads(user: AuthenticatedUser = Depends(get_current_user)):
-    result = (
-        supabase.table("threads")
-        .select("*")
-        .eq("user_id", user.id)
-        .order("updated_at", desc=True)
-        .execute()
-    )
-    return result.data
+async def list_threads(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    """Most recently updated threads first; pass X-Next-Cursor back as `cursor` for more."""
+    query = supabase.table("threads").select(THREAD_COLUMNS).eq("user_id", user.id)
+    result = await keyset_page(query, "updated_at", cursor, limit).execute()
+    return next_page(result.data, "updated_at", limit, response)
 
 
 @router.post("", response_model=ThreadResponse)
 async def create_thread(user: AuthenticatedUser = Depends(get_current_user)):
     result = (
-        supabase.table("threads")
+        await supabase.table("threads")
         .insert({"user_id": user.id, "title": "New Chat"})
         .execute()
     )
@@ -30,27 +37,25 @@ async def create_thread(user: AuthenticatedUser = Depends(get_current_user)):
 
 @router.get("/{thread_id}/messages", response_model=list[MessageResponse])
 async def get_messages(
-    thread_id: str, user: AuthenticatedUser = Depends(get_current_user)
+    thread_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    user: AuthenticatedUser = Depends(get_current_user),
 ):
+    """The latest messages in chronological order; `cursor` pages back to older ones."""
     # Verify thread belongs to user
-    thread = (
-        supabase.table("threads")
-        .select("id")
-        .eq("id", thread_id)
-        .eq("user_id", user.id)
-        .execute()
-    )
-    if not thread.data:
+    if not await user_cache.owns_thread(user.id, thread_id):
         raise HTTPException(status_code=404, detail="Thread not found")
-    result = (
+    query = (
         supabase.table("messages")
-        .select("*")
+        .select(MESSAGE_COLUMNS)
         .eq("thread_id", thread_id)
         .eq("user_id", user.id)
-        .order("created_at")
-        .execute()
     )
-    return result.data
+    result = await keyset_page(query, "created_at", cursor, limit).execute()
+    page = next_page(result.data, "created_at", limit, response)
+    return list(reversed(page))
 
 
 @router.delete("/{thread_id}")
@@ -58,7 +63,7 @@ async def delete_thread(
     thread_id: str, user: AuthenticatedUser = Depends(get_current_user)
 ):
     result = (
-        supabase.table("threads")
+        await supabase.table("threads")
         .delete()
         .eq("id", thread_id)
         .eq("user_id", user.id)
@@ -66,4 +71,5 @@ async def delete_thread(
     )
     if not result.data:
         raise HTTPException(status_code=404, detail="Thread not found")
+    user_cache.invalidate_thread(thread_id)
     return {"status": "deleted"}
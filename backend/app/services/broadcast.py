@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+import json
+import logging
+from collections.abc import Callable
+from app.config import settings
+from app.database.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+# Only processes holding the service role key (API replicas, workers) can sign
+_KEY = hashlib.sha256(b"realtime-broadcast:" + settings.supabase_service_role_key.encode()).digest()
+
+
+def _signature(payload: dict) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hmac.new(_KEY, body.encode(), hashlib.sha256).hexdigest()
+
+
+def sign(payload: dict) -> dict:
+    """Payload plus an HMAC "sig" that `verify` checks on the receiving side."""
+    return {**payload, "sig": _signature(payload)}
+
+
+def verify(payload: dict) -> dict | None:
+    """The payload without its signature, or None if it wasn't sent by the backend."""
+    payload = dict(payload)
+    sig = payload.pop("sig", None)
+    if not isinstance(sig, str) or not hmac.compare_digest(sig, _signature(payload)):
+        return None
+    return payload
+
+
+async def join_private_channel(name: str, event: str, handler: Callable[[dict], None]):
+    """Join a private Supabase Realtime channel shared by backend processes.
+
+    Private channels are authorized by RLS on realtime.messages, which grants
+    nothing to anon/authenticated users (see 021_private_realtime.sql), so
+    browsers can neither read nor send on it. Messages are also signed, and
+    `handler` only receives payloads that verify.
+    """
+
+    def on_broadcast(message: dict) -> None:
+        payload = verify(message.get("payload") or {})
+        if payload is None:
+            logger.warning("Ignoring unsigned %s broadcast on %s", event, name)
+            return
+        handler(payload)
+
+    channel = supabase.channel(name, {"config": {"private": True}})
+    channel.on_broadcast(event, on_broadcast)
+    await channel.subscribe()
+    return channel
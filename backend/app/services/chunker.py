@@ -0,0 +1,337 @@
+import math
+import re
+from collections.abc import AsyncIterable, AsyncIterator, Iterator
+from app.config import settings
+
+# A chunker walks a text by character offsets: each step finds the end of
+# the current chunk and where the next one starts (earlier, for overlap).
+# Boundaries are located with str.rfind / compiled regexes over one window
+# at a time, so the cost is a few C-level scans per chunk however large the
+# text is, and nothing but the chunks themselves is ever copied.
+
+# (start, end, next_start) offsets of one chunk
+Span = tuple[int, int, int]
+
+
+class Tokenizer:
+    """Maps token budgets to character offsets."""
+
+    name = "base"
+    chars_per_token = 4.0  # For estimates only
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+    def char_limit(self, text: str, start: int, max_tokens: int) -> int:
+        """Offset just past the longest run of at most `max_tokens` tokens from `start`."""
+        raise NotImplementedError
+
+    def tail_start(self, text: str, end: int, tokens: int) -> int:
+        """Offset where the last `tokens` tokens before `end` begin."""
+        raise NotImplementedError
+
+
+class ApproxTokenizer(Tokenizer):
+    """~4 characters per token (the same estimate embedding_service uses). No dependencies."""
+
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def char_limit(self, text, start, max_tokens):
+        return min(len(text), start + int(max_tokens * self.chars_per_token))
+
+    def tail_start(self, text, end, tokens):
+        return max(0, end - int(tokens * self.chars_per_token))
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact BPE token counts. Requires `pip install tiktoken`."""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: str):
+        try:
+            import tiktoken
+        except ImportError as e:
+            raise RuntimeError("CHUNK_TOKENIZER=tiktoken requires the tiktoken package") from e
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode_ordinary(text))
+
+    def char_limit(self, text, start, max_tokens):
+        # Encode a window that almost always holds max_tokens; widen if not
+        width = max_tokens * 8
+        while True:
+            window = text[start : start + width]
+            tokens = self._encoding.encode_ordinary(window)
+            if len(tokens) > max_tokens:
+                return start + len(self._encoding.decode(tokens[:max_tokens]))
+            if start + width >= len(text):
+                return len(text)
+            width *= 2
+
+    def tail_start(self, text, end, tokens):
+        window = text[max(0, end - tokens * 8) : end]
+        encoded = self._encoding.encode_ordinary(window)
+        return end - len(self._encoding.decode(encoded[-tokens:])) if tokens else end
+
+
+class Chunker:
+    """Splits text into chunks for embedding."""
+
+    name = "base"
+
+    def _spans(self, text: str, start: int, final: bool) -> Iterator[Span]:
+        """Yield chunk offsets from `start`.
+
+        Unless `final`, stop before any chunk that could change if more text
+        were appended, so a streaming caller can resume from the last next_start.
+        """
+        raise NotImplementedError
+
+    def estimate_count(self, length: int) -> int:
+        """Approximate number of chunks for `length` characters (or bytes)."""
+        raise NotImplementedError
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """Lazily yield the non-empty chunks of `text`, in document order."""
+        for start, end, _ in self._spans(text, 0, final=True):
+            chunk = text[start:end].strip()
+            if chunk:
+                yield chunk
+
+    async def aiter_chunks(self, pieces: AsyncIterable[str]) -> AsyncIterator[str]:
+        """iter_chunks over text arriving in pieces (e.g. a decoded download stream).
+
+        Yields exactly the chunks iter_chunks would for the joined text, holding
+        only the unconsumed tail of the text in memory.
+        """
+        buffer = ""
+        async for piece in pieces:
+            buffer += piece
+            resume = 0
+            for start, end, resume in self._spans(buffer, 0, final=False):
+                chunk = buffer[start:end].strip()
+                if chunk:
+                    yield chunk
+            buffer = buffer[resume:]
+        for start, end, _ in self._spans(buffer, 0, final=True):
+            chunk = buffer[start:end].strip()
+            if chunk:
+                yield chunk
+
+
+class CharacterChunker(Chunker):
+    """Fixed character windows with a fixed overlap (the original chunker).
+
+    Cuts wherever the window ends, including mid-word.
+    """
+
+    name = "character"
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.step = chunk_size - chunk_overlap
+
+    def _spans(self, text, start, final):
+        n = len(text)
+        while start < n:
+            end = start + self.chunk_size
+            if end > n and not final:
+                return
+            yield start, min(end, n), start + self.step
+            start += self.step
+
+    def estimate_count(self, length):
+        return math.ceil(length / self.step) if length else 0
+
+
+# Boundary levels, strongest first: (separators, min_fill). A chunk ends after
+# the last separator of the first level that occurs past `min_fill` of the
+# token window. Strings are matched with rfind, patterns with finditer.
+Level = tuple[tuple[str | re.Pattern, ...], float]
+
+_SENTENCE_END = re.compile(r"[.?!]\s")
+_SENTENCE_LEVEL: Level = ((_SENTENCE_END,), 0.5)
+_WORD_LEVEL: Level = ((" ", "\n"), 0.5)
+
+WORD_LEVELS: list[Level] = [_WORD_LEVEL]
+
+TEXT_LEVELS: list[Level] = [
+    (("\n\n",), 0.5),
+    (("\n",), 0.5),
+    _SENTENCE_LEVEL,
+    _WORD_LEVEL,
+]
+
+MARKDOWN_LEVELS: list[Level] = [
+    # Cut before a heading even when the chunk so far is short
+    ((re.compile(r"\n(?=#{1,6} )"),), 0.25),
+    ((re.compile(r"\n(?=```)"),), 0.5),
+    (("\n\n",), 0.5),
+    (("\n",), 0.5),
+    _SENTENCE_LEVEL,
+    _WORD_LEVEL,
+]
+
+HTML_LEVELS: list[Level] = [
+    ((re.compile(r"(?=<(?:h[1-6]|section|article|header|footer|table)\b)", re.I),), 0.25),
+    (
+        ("</p>", "</div>", "</li>", "</tr>", "</pre>", "</blockquote>", "</ul>", "</ol>", "</table>"),
+        0.5,
+    ),
+    (("<br>", "<br/>", "<br />", "\n"), 0.5),
+    _SENTENCE_LEVEL,
+    _WORD_LEVEL,
+]
+
+
+class TokenChunker(Chunker):
+    """Token-budgeted windows that end on the strongest boundary available.
+
+    Every chunk is at most `max_tokens` tokens. It ends at the last boundary
+    of the strongest `levels` entry found past that level's min_fill of the
+    window (for the default levels, any whitespace), or exactly at the budget
+    if there is none. The next chunk starts at most `overlap_tokens` tokens
+    before the end, moved forward to a sentence or word start.
+    """
+
+    name = "token"
+
+    def __init__(
+        self,
+        tokenizer: Tokenizer,
+        max_tokens: int,
+        overlap_tokens: int,
+        levels: list[Level] = WORD_LEVELS,
+    ):
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be >= 0 and less than max_tokens")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        # A greedy `.*` prefix makes one match() call find a pattern's last
+        # occurrence in the window (backtracking from the end) instead of
+        # iterating over every occurrence
+        self._levels = [
+            (
+                tuple(sep for sep in separators if isinstance(sep, str)),
+                [
+                    re.compile(f"(?s:.*)(?:{sep.pattern})", sep.flags)
+                    for sep in separators
+                    if isinstance(sep, re.Pattern)
+                ],
+                min_fill,
+            )
+            for separators, min_fill in levels
+        ]
+
+    def _cut(self, text: str, start: int, limit: int) -> int:
+        span = limit - start
+        for literals, patterns, min_fill in self._levels:
+            lo = start + int(span * min_fill)
+            best = -1
+            for sep in literals:
+                i = text.rfind(sep, lo, limit)
+                if i != -1 and i + len(sep) > best:
+                    best = i + len(sep)
+            for pattern in patterns:
+                match = pattern.match(text, lo, limit)
+                if match and match.end() > best:
+                    best = match.end()
+            if best > start:
+                return best
+        return limit
+
+    def _next_start(self, text: str, start: int, end: int) -> int:
+        if not self.overlap_tokens:
+            return end
+        tail = self.tokenizer.tail_start(text, end, self.overlap_tokens)
+        # Begin the overlap on a sentence start if there is one, else a word start
+        match = _SENTENCE_END.search(text, tail, end)
+        if match:
+            tail = match.end()
+        else:
+            space, newline = text.find(" ", tail, end), text.find("\n", tail, end)
+            if space != -1 or newline != -1:
+                tail = min(i for i in (space, newline) if i != -1) + 1
+        return tail if start < tail < end else end
+
+    def _spans(self, text, start, final):
+        n = len(text)
+        while start < n:
+            limit = self.tokenizer.char_limit(text, start, self.max_tokens)
+            if limit >= n:
+                if not final:
+                    return
+                yield start, n, n
+                return
+            end = self._cut(text, start, limit)
+            next_start = self._next_start(text, start, end)
+            yield start, end, next_start
+            start = next_start
+
+    def estimate_count(self, length):
+        step = (self.max_tokens - self.overlap_tokens) * self.tokenizer.chars_per_token
+        return math.ceil(length / step) if length else 0
+
+
+class RecursiveChunker(TokenChunker):
+    """TokenChunker that prefers headings, then paragraphs, lines, sentences and words.
+
+    The boundary levels follow the document format (markdown, HTML or plain text).
+    """
+
+    name = "recursive"
+
+    FORMAT_LEVELS = {
+        "text/markdown": MARKDOWN_LEVELS,
+        "text/html": HTML_LEVELS,
+    }
+
+    def __init__(self, tokenizer: Tokenizer, max_tokens: int, overlap_tokens: int, mime_type: str):
+        super().__init__(
+            tokenizer,
+            max_tokens,
+            overlap_tokens,
+            levels=self.FORMAT_LEVELS.get(mime_type, TEXT_LEVELS),
+        )
+
+
+_tokenizer: Tokenizer | None = None
+_chunkers: dict[str, Chunker] = {}
+
+
+def get_tokenizer() -> Tokenizer:
+    """The configured tokenizer (tiktoken loads its BPE ranks on first use)."""
+    global _tokenizer
+    if _tokenizer is None:
+        if settings.chunk_tokenizer == "tiktoken":
+            _tokenizer = TiktokenTokenizer(settings.chunk_tiktoken_encoding)
+        else:
+            _tokenizer = ApproxTokenizer()
+    return _tokenizer
+
+
+def get_chunker(mime_type: str) -> Chunker:
+    """The configured chunker for documents of `mime_type`."""
+    key = mime_type if settings.chunker == "recursive" else ""
+    if key not in _chunkers:
+        if settings.chunker == "character":
+            chunker: Chunker = CharacterChunker(settings.chunk_size, settings.chunk_overlap)
+        elif settings.chunker == "token":
+            chunker = TokenChunker(
+                get_tokenizer(), settings.chunk_max_tokens, settings.chunk_overlap_tokens
+            )
+        else:
+            chunker = RecursiveChunker(
+                get_tokenizer(),
+                settings.chunk_max_tokens,
+                settings.chunk_overlap_tokens,
+                mime_type,
+            )
+        _chunkers[key] = chunker
+    return _chunkers[key]
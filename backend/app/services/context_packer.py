@@ -0,0 +1,154 @@
+import re
+from app.config import settings
+from app.services.embedding_service import estimate_tokens
+
+_WORD_RE = re.compile(r"\w+")
+
+# Shortest suffix/prefix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+# A result that doesn't fit is cut to the remaining budget if at least this much is left
+MIN_PARTIAL_TOKENS = 60
+
+
+def join_overlapping(first: str, second: str) -> str:
+    """Concatenate consecutive chunks, keeping their shared overlap once.
+
+    Chunkers repeat the end of one chunk at the start of the next; the longest
+    suffix of `first` that is a prefix of `second` is dropped from `second`.
+    """
+    probe = second[:MIN_OVERLAP_CHARS]
+    if len(probe) == MIN_OVERLAP_CHARS:
+        start = max(0, len(first) - len(second))
+        while (pos := first.find(probe, start)) != -1:
+            if second.startswith(first[pos:]):
+                return first + second[len(first) - pos :]
+            start = pos + 1
+    return first.rstrip() + "\n" + second.lstrip()
+
+
+def merge_adjacent(results: list[dict]) -> list[dict]:
+    """Merge hits on the same or consecutive chunk_index of a document.
+
+    Args:
+        results: search_documents rows, best first.
+
+    Returns:
+        Passages best first (ranked by their best member), each with
+        document_id, metadata, first/last chunk_index, content and the ids
+        of the chunks it covers.
+    """
+    runs: list[list[tuple[int, dict]]] = []
+    by_document: dict[str, list[tuple[int, dict]]] = {}
+    for rank, row in enumerate(results):
+        by_document.setdefault(row["document_id"], []).append((rank, row))
+    for hits in by_document.values():
+        hits.sort(key=lambda hit: hit[1]["chunk_index"])
+        run = [hits[0]]
+        for hit in hits[1:]:
+            if hit[1]["chunk_index"] - run[-1][1]["chunk_index"] <= 1:
+                run.append(hit)
+            else:
+                runs.append(run)
+                run = [hit]
+        runs.append(run)
+
+    passages = []
+    for run in runs:
+        content = run[0][1]["content"]
+        for (_, previous), (_, row) in zip(run, run[1:]):
+            if row["chunk_index"] != previous["chunk_index"]:
+                content = join_overlapping(content, row["content"])
+        passages.append(
+            {
+                "rank": min(rank for rank, _ in run),
+                "document_id": run[0][1]["document_id"],
+                "metadata": run[0][1].get("metadata") or {},
+                "first_chunk": run[0][1]["chunk_index"],
+                "last_chunk": run[-1][1]["chunk_index"],
+                "content": content,
+                "ids": [row["id"] for _, row in run],
+            }
+        )
+    passages.sort(key=lambda p: p["rank"])
+    return passages
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def drop_near_duplicates(passages: list[dict], threshold: float) -> list[dict]:
+    """Drop passages mostly contained in a better-ranked one.
+
+    A passage is a duplicate when at least `threshold` of its word 3-grams
+    occur in a kept passage: the same text uploaded twice, boilerplate
+    repeated across chunks, or a chunk already inside a merged passage.
+    """
+    kept: list[tuple[dict, set]] = []
+    for passage in passages:
+        shingles = _shingles(passage["content"])
+        if any(len(shingles & other) >= threshold * len(shingles) for _, other in kept):
+            continue
+        kept.append((passage, shingles))
+    return [passage for passage, _ in kept]
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text to about `tokens` estimated tokens at a word boundary."""
+    limit = max(0, (tokens - 1) * 4)
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[: cut if cut > limit // 2 else limit].rstrip() + " …"
+
+
+def pack_results(results: list[dict], token_budget: int | None = None) -> dict:
+    """Turn search_documents rows into a compact tool result within a token budget.
+
+    Consecutive hits of a document are merged (their overlap kept once), near
+    duplicates dropped, then passages are added best first until
+    `token_budget` estimated tokens are used; the first passage that doesn't
+    fit is truncated if enough budget remains. Each source document is listed
+    once and passages cite it as "D<n>:<first chunk>[-<last chunk>]".
+
+    Args:
+        results: search_documents rows, best first.
+        token_budget: Defaults to settings.context_token_budget.
+
+    Returns:
+        {"documents": [{"ref", "id", "filename", ...metadata}],
+         "results": [{"cite", "text"}], "omitted": int}
+    """
+    token_budget = token_budget or settings.context_token_budget
+    passages = drop_near_duplicates(merge_adjacent(results), settings.context_duplicate_threshold)
+
+    documents: dict[str, dict] = {}
+    packed, omitted, used = [], 0, 0
+    for passage in passages:
+        document = documents.get(passage["document_id"])
+        ref = document["ref"] if document else f"D{len(documents) + 1}"
+        cite = f"{ref}:{passage['first_chunk']}"
+        if passage["last_chunk"] != passage["first_chunk"]:
+            cite += f"-{passage['last_chunk']}"
+        overhead = estimate_tokens(cite) + 8  # JSON keys and punctuation
+        if document is None:
+            document = {"ref": ref, "id": passage["document_id"], **passage["metadata"]}
+            overhead += estimate_tokens(str(document)) + 8
+
+        text = passage["content"]
+        cost = overhead + estimate_tokens(text)
+        if used + cost > token_budget:
+            remaining = token_budget - used - overhead
+            if packed and remaining < MIN_PARTIAL_TOKENS:
+                omitted += 1
+                continue
+            text = _truncate(text, max(remaining, MIN_PARTIAL_TOKENS))
+            cost = overhead + estimate_tokens(text)
+        documents.setdefault(passage["document_id"], document)
+        packed.append({"cite": cite, "text": text})
+        used += cost
+
+    return {"documents": list(documents.values()), "results": packed, "omitted": omitted}
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.embedding_service import estimate_tokens
+from app.services.llm_service import complete_chat
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new messages below. Keep facts, names, numbers, decisions "
+    "and open questions the assistant may need later; drop pleasantries. "
+    "Reply with the updated summary only."
+)
+
+# Threads with a summary update in flight in this process, and strong refs to the tasks
+_summarizing: set[str] = set()
+_summary_tasks: set[asyncio.Task] = set()
+
+
+def _select_recent(history: list[dict], budget: int) -> list[dict]:
+    """Newest messages (oldest-first order) that fit within `budget` estimated tokens.
+
+    Always keeps at least the latest message.
+    """
+    kept, used = [], 0
+    for msg in reversed(history):
+        cost = estimate_tokens(msg["content"])
+        if kept and used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+def _history_budget(summary: str | None) -> int:
+    return settings.chat_history_token_budget - (estimate_tokens(summary) if summary else 0)
+
+
+async def load_recent_messages(
+    thread_id: str, user_id: str, summarized_until: str | None
+) -> list[dict]:
+    """Fetch the newest unsummarized messages of a thread, oldest first.
+
+    Bounded by settings.chat_history_max_turns (one turn = user + assistant message).
+    """
+    query = (
+        supabase.table("messages")
+        .select("role, content, created_at")
+        .eq("thread_id", thread_id)
+        .eq("user_id", user_id)
+    )
+    if summarized_until:
+        query = query.gt("created_at", summarized_until)
+    result = (
+        await query.order("created_at", desc=True)
+        .limit(2 * settings.chat_history_max_turns)
+        .execute()
+    )
+    return list(reversed(result.data or []))
+
+
+def build_messages(system_prompt: str, summary: str | None, history: list[dict]) -> list[dict]:
+    """Build the Chat Completions messages array for a turn.
+
+    The thread summary (if any) follows the system prompt, then as many of the
+    most recent messages as fit in settings.chat_history_token_budget.
+
+    Args:
+        system_prompt: System prompt for the model.
+        summary: Rolling summary of turns older than `history`, or None.
+        history: Recent messages (oldest first), from load_recent_messages.
+
+    Returns:
+        Messages array starting with the system prompt.
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append(
+            {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+        )
+    for msg in _select_recent(history, _history_budget(summary)):
+        messages.append({"role": msg["role"], "content": msg["content"]})
+    return messages
+
+
+async def update_thread_summary(thread_id: str, user_id: str) -> bool:
+    """Fold messages that have left the verbatim window into the thread summary.
+
+    The window is what build_messages would send next turn. At most
+    settings.chat_summary_fold_limit messages are folded per call, so a long
+    backlog is caught up over several turns. The write is conditional on
+    summarized_until being unchanged, so a concurrent update elsewhere wins
+    rather than being overwritten.
+
+    Returns:
+        True if the summary was updated.
+    """
+    thread_result = (
+        await supabase.table("threads")
+        .select("summary, summarized_until")
+        .eq("id", thread_id)
+        .eq("user_id", user_id)
+        .execute()
+    )
+    if not thread_result.data:
+        return False
+    summary = thread_result.data[0]["summary"]
+    summarized_until = thread_result.data[0]["summarized_until"]
+
+    recent = await load_recent_messages(thread_id, user_id, summarized_until)
+    window = _select_recent(recent, _history_budget(summary))
+    if not window:
+        return False
+
+    query = (
+        supabase.table("messages")
+        .select("role, content, created_at")
+        .eq("thread_id", thread_id)
+        .eq("user_id", user_id)
+        .lt("created_at", window[0]["created_at"])
+    )
+    if summarized_until:
+        query = query.gt("created_at", summarized_until)
+    fold_result = await query.order("created_at").limit(settings.chat_summary_fold_limit).execute()
+    to_fold = fold_result.data or []
+    if not to_fold:
+        return False
+
+    transcript = "\n\n".join(f"{m['role']}: {m['content']}" for m in to_fold)
+    new_summary = await complete_chat(
+        [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {
+                "role": "user",
+                "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}",
+            },
+        ],
+        model=settings.chat_summary_model or None,
+        max_tokens=settings.chat_summary_max_tokens,
+    )
+    if not new_summary.strip():
+        return False
+
+    update = (
+        supabase.table("threads")
+        .update({"summary": new_summary.strip(), "summarized_until": to_fold[-1]["created_at"]})
+        .eq("id", thread_id)
+        .eq("user_id", user_id)
+    )
+    if summarized_until:
+        update = update.eq("summarized_until", summarized_until)
+    else:
+        update = update.is_("summarized_until", "null")
+    result = await update.execute()
+    return bool(result.data)
+
+
+def schedule_summary_update(thread_id: str, user_id: str) -> None:
+    """Run update_thread_summary in the background (at most one per thread at a time)."""
+    if thread_id in _summarizing:
+        return
+    _summarizing.add(thread_id)
+
+    async def run() -> None:
+        try:
+            await update_thread_summary(thread_id, user_id)
+        except Exception:
+            logger.warning("Summary update failed for thread %s", thread_id, exc_info=True)
+        finally:
+            _summarizing.discard(thread_id)
+
+    task = asyncio.create_task(run())
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.broadcast import join_private_channel, sign
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_EVENT = "document"
+
+
+class DocumentEventBus:
+    """Fans document status/progress events out to each user's open SSE streams.
+
+    Subscribers get a bounded queue; when a slow client falls behind, its
+    oldest events are dropped (a reconnect catches up with `updated_since` and /deleted).
+    When a channel is connected, published events are also broadcast over
+    Supabase Realtime so streams held by other API replicas, and events from
+    standalone workers, reach every subscriber.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._listeners: list[Callable[[str, dict], None]] = []
+        self._channel = None
+        self._tasks: set[asyncio.Task] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def add_listener(self, listener: Callable[[str, dict], None]) -> None:
+        """Call `listener(user_id, event)` for every event, local or broadcast (e.g. cache invalidation)."""
+        self._listeners.append(listener)
+
+    def publish(self, user_id: str, event: dict, broadcast: bool = True) -> None:
+        self.published += 1
+        for listener in self._listeners:
+            try:
+                listener(user_id, event)
+            except Exception:
+                logger.warning("Document event listener failed", exc_info=True)
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+        if broadcast and self._channel is not None:
+            self._broadcast(user_id, event)
+
+    def _broadcast(self, user_id: str, event: dict) -> None:
+        async def send() -> None:
+            try:
+                await self._channel.send_broadcast(
+                    BROADCAST_EVENT, sign({"user_id": user_id, "event": event})
+                )
+            except Exception:
+                logger.warning("Document event broadcast failed", exc_info=True)
+
+        task = asyncio.create_task(send())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _on_broadcast(self, payload: dict) -> None:
+        if payload.get("user_id") and payload.get("event"):
+            self.publish(payload["user_id"], payload["event"], broadcast=False)
+
+    async def connect(self, channel_name: str) -> None:
+        """Join the private Realtime channel shared by API replicas and workers."""
+        self._channel = await join_private_channel(channel_name, BROADCAST_EVENT, self._on_broadcast)
+
+    async def disconnect(self) -> None:
+        if self._channel is not None:
+            channel, self._channel = self._channel, None
+            await supabase.remove_channel(channel)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": sum(len(q) for q in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+            "shared": self._channel is not None,
+        }
+
+
+document_events = DocumentEventBus(queue_size=settings.document_events_queue_size)
+
+
+def publish_document_event(user_id: str, document_id: str, status: str, **fields) -> None:
+    """Publish a document change: {"document_id", "status", **fields}.
+
+    Fields used by the ingestion pipeline: chunks_done / chunks_total while
+    processing, chunk_count once completed, error_message on failure.
+    """
+    document_events.publish(user_id, {"document_id": document_id, "status": status, **fields})
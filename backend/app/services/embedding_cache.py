@@ -0,0 +1,195 @@
+import array
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from collections.abc import Awaitable, Callable
+from cachetools import LRUCache, TTLCache
+from postgrest.types import ReturnMethod
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.embedding_service import pgvector_literal
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for hashing: NFC, collapsed whitespace, trimmed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier chunk embedding cache keyed by (model, dimensions, content hash).
+
+    Tier 1 is an in-process LRU holding vectors as compact float32 arrays.
+    Tier 2 is the `embedding_cache` table (009_embedding_cache.sql), shared by
+    every API/worker process and surviving restarts.
+    """
+
+    def __init__(self, max_entries: int, persistent: bool):
+        self._memory: LRUCache = LRUCache(maxsize=max_entries)
+        self.persistent = persistent
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _key(self, digest: str) -> tuple[str, int, str]:
+        return (settings.embedding_model, settings.embedding_dimensions, digest)
+
+    async def get_many(self, texts: list[str]) -> list[list[float] | None]:
+        """Look up embeddings for texts. Returns None in each position that missed."""
+        digests = [content_hash(t) for t in texts]
+        results: list[list[float] | None] = [None] * len(texts)
+        missing: dict[str, list[int]] = {}
+
+        for i, digest in enumerate(digests):
+            vec = self._memory.get(self._key(digest))
+            if vec is not None:
+                results[i] = vec.tolist()
+                self.memory_hits += 1
+            else:
+                missing.setdefault(digest, []).append(i)
+
+        if missing and self.persistent:
+            try:
+                result = (
+                    await supabase.table("embedding_cache")
+                    .select("content_hash, embedding")
+                    .eq("model", settings.embedding_model)
+                    .eq("dimensions", settings.embedding_dimensions)
+                    .in_("content_hash", list(missing))
+                    .execute()
+                )
+            except Exception:
+                # The cache is an optimization — degrade to misses rather than fail
+                logger.warning("Embedding cache lookup failed", exc_info=True)
+                result = None
+            for row in (result.data if result else None) or []:
+                # pgvector columns come back from PostgREST as "[0.1,0.2,...]" strings
+                vec = json.loads(row["embedding"]) if isinstance(row["embedding"], str) else row["embedding"]
+                self._memory[self._key(row["content_hash"])] = array.array("f", vec)
+                for i in missing.pop(row["content_hash"], []):
+                    results[i] = vec
+                    self.persistent_hits += 1
+
+        self.misses += sum(len(idxs) for idxs in missing.values())
+        return results
+
+    async def put_many(self, texts: list[str], embeddings: list[list[float]]) -> None:
+        """Store freshly generated embeddings in both tiers."""
+        rows = {}
+        for text, embedding in zip(texts, embeddings):
+            digest = content_hash(text)
+            self._memory[self._key(digest)] = array.array("f", embedding)
+            rows[digest] = {
+                "model": settings.embedding_model,
+                "dimensions": settings.embedding_dimensions,
+                "content_hash": digest,
+                "embedding": pgvector_literal(embedding),
+            }
+        if rows and self.persistent:
+            try:
+                await supabase.table("embedding_cache").upsert(
+                    list(rows.values()),
+                    on_conflict="model,dimensions,content_hash",
+                    ignore_duplicates=True,
+                    returning=ReturnMethod.minimal,
+                ).execute()
+            except Exception:
+                logger.warning("Embedding cache write failed", exc_info=True)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=settings.embedding_cache_size,
+    persistent=settings.embedding_cache_persistent,
+)
+
+
+class QueryEmbeddingCache:
+    """TTL+LRU cache for query embeddings with single-flight request coalescing.
+
+    Keyed on (model, dimensions, normalized query). Case is kept: embedding
+    models are case-sensitive, so "SKU ABC" and "sku abc" differ. Concurrent
+    misses for the same key share one provider call instead of each issuing
+    their own.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._cache: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._miss_seconds = 0.0
+
+    def _key(self, query: str) -> tuple[str, int, str]:
+        return (
+            settings.embedding_model,
+            settings.embedding_dimensions,
+            normalize_text(query),
+        )
+
+    async def get(
+        self, query: str, embed: Callable[[str], Awaitable[list[float]]]
+    ) -> list[float]:
+        """Return the cached embedding for query, calling `embed` at most once per key."""
+        key = self._key(query)
+        vec = self._cache.get(key)
+        if vec is not None:
+            self.hits += 1
+            return vec.tolist()
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key, query, embed))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so one cancelled caller doesn't cancel the call others await
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: tuple, query: str, embed) -> list[float]:
+        start = time.perf_counter()
+        embedding = await embed(query)
+        self._miss_seconds += time.perf_counter() - start
+        self._cache[key] = array.array("f", embedding)
+        return embedding
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        avg_miss = self._miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "avg_miss_ms": avg_miss * 1000,
+            # Each hit skipped a full provider round trip
+            "saved_seconds_estimate": self.hits * avg_miss,
+            "entries": len(self._cache),
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=settings.query_embedding_cache_size,
+    ttl_seconds=settings.query_embedding_cache_ttl_seconds,
+)
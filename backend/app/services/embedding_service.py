@@ -1,25 +1,61 @@
-from openai import AsyncOpenAI
+import asyncio
+import math
+import re
+from collections import deque
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    BadRequestError,
+    InternalServerError,
+    RateLimitError,
+    UnprocessableEntityError,
+)
 from app.config import settings
 
-# Separate client for embeddings (can point to a different provider than LLM)
+# Separate client for embeddings (can point to a different provider than LLM).
+# Retries are handled by the scheduler so 429s back off globally, not per call.
 _client = AsyncOpenAI(
     base_url=settings.embedding_base_url,
     api_key=settings.embedding_api_key,
+    max_retries=0,
 )
 
 
-async def generate_embeddings(texts: list[str]) -> list[list[float]]:
-    """Generate embeddings for a list of texts.
+# chunks column for each EMBEDDING_STORAGE
+EMBEDDING_COLUMNS = {"vector": "embedding", "halfvec": "embedding_half"}
 
-    Args:
-        texts: List of text strings to embed. Max recommended batch size ~100.
+_LEADING_ZERO_RE = re.compile(r"(?<!\d)0\.")
 
-    Returns:
-        List of embedding vectors, one per input text.
+# Provider rejected the input itself (too long, empty, malformed), not the request rate
+_INPUT_ERRORS = (BadRequestError, UnprocessableEntityError)
+
+
+def embedding_column() -> str:
+    """The chunks column new embeddings are written to and searched in."""
+    return EMBEDDING_COLUMNS[settings.embedding_storage]
+
+
+def pgvector_literal(embedding: Sequence[float], half: bool = False) -> str:
+    """Compact pgvector text form ("[.0123,-.5,...]") for inserts and RPC arguments.
+
+    JSON float lists carry 17 significant digits per value; 9 round-trip a
+    float32 exactly (what a vector column stores) and 5 a float16 (halfvec),
+    which roughly halves the request body. pgvector parses the string itself.
     """
-    if not texts:
-        return []
+    digits = ".5g" if half else ".9g"
+    return "[" + _LEADING_ZERO_RE.sub(".", ",".join(format(x, digits) for x in embedding)) + "]"
 
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for budgeting
+    return len(text) // 4 + 1
+
+
+async def _create_embeddings(texts: list[str]) -> list[list[float]]:
+    """One provider request for a list of texts."""
     response = await _client.embeddings.create(
         model=settings.embedding_model,
         input=texts,
@@ -31,6 +67,218 @@ async def generate_embeddings(texts: list[str]) -> list[list[float]]:
     return [item.embedding for item in sorted_data]
 
 
+def retry_after_seconds(value: str | None) -> float | None:
+    """Delay from a Retry-After header, in delta-seconds or HTTP-date form; None if unparseable."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return max(0.0, seconds) if math.isfinite(seconds) else None
+
+
+class EmbeddingScheduler:
+    """Micro-batches embedding requests from all concurrent callers.
+
+    Texts submitted within `window_ms` of each other are merged into one
+    provider request (capped by `max_batch_size` texts and `max_batch_tokens`
+    estimated tokens), and results are fanned back out to each caller. A 429
+    pauses every outgoing request until the provider's retry-after elapses,
+    and an optional tokens-per-minute budget paces requests up front. If the
+    provider rejects a merged batch's input, each caller's texts are retried
+    on their own so only the caller that sent the bad input fails.
+    """
+
+    def __init__(
+        self,
+        window_ms: float,
+        max_batch_size: int,
+        max_batch_tokens: int,
+        max_concurrent_requests: int,
+        tokens_per_minute: int,
+        max_retries: int,
+    ):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self._slots = asyncio.Semaphore(max_concurrent_requests)
+        self._queue: deque[tuple[str, asyncio.Future, object]] = deque()  # text, its future, caller token
+        self._runner: asyncio.Task | None = None
+        self._sending: set[asyncio.Task] = set()
+        self._paused_until = 0.0
+        self._bucket = float(tokens_per_minute)
+        self._bucket_updated = 0.0
+        self.requests = 0
+        self.texts = 0
+        self.rate_limited = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        caller = object()
+        self._queue.extend((text, future, caller) for text, future in zip(texts, futures))
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self) -> None:
+        while self._queue:
+            if len(self._queue) < self.max_batch_size:
+                await asyncio.sleep(self.window)  # Let concurrent callers join the batch
+            await self._slots.acquire()
+            batch = self._take_batch()
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        self._runner = None
+
+    def _take_batch(self) -> list[tuple[str, asyncio.Future, object]]:
+        batch, tokens = [], 0
+        while self._queue and len(batch) < self.max_batch_size:
+            text, future, _ = self._queue[0]
+            cost = estimate_tokens(text)
+            if batch and tokens + cost > self.max_batch_tokens:
+                break
+            item = self._queue.popleft()
+            if not future.done():  # Skip texts whose caller was cancelled
+                batch.append(item)
+                tokens += cost
+        return batch
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future, object]]) -> None:
+        try:
+            if batch:
+                await self._deliver(batch)
+        finally:
+            self._slots.release()
+
+    async def _deliver(self, batch: list[tuple[str, asyncio.Future, object]]) -> None:
+        """Embed a batch and resolve its futures; input errors are retried per caller."""
+        try:
+            embeddings = await self._call_with_retries([text for text, _, _ in batch])
+        except _INPUT_ERRORS as e:
+            callers: dict[object, list] = {}
+            for item in batch:
+                callers.setdefault(item[2], []).append(item)
+            if len(callers) == 1:
+                self._fail(batch, e)
+                return
+            for items in callers.values():
+                await self._deliver(items)
+            return
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        for (_, future, _), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    @staticmethod
+    def _fail(batch: list[tuple[str, asyncio.Future, object]], error: Exception) -> None:
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _call_with_retries(self, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        tokens = sum(estimate_tokens(t) for t in texts)
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_capacity(tokens)
+            try:
+                self.requests += 1
+                embeddings = await _create_embeddings(texts)
+                self.texts += len(texts)
+                return embeddings
+            except RateLimitError as e:
+                self.rate_limited += 1
+                if attempt == self.max_retries:
+                    raise
+                delay = retry_after_seconds(e.response.headers.get("retry-after") if e.response else None)
+                if delay is None:
+                    delay = min(2**attempt, 30)
+                self._paused_until = max(self._paused_until, loop.time() + delay)
+            except (APIConnectionError, InternalServerError):
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(min(2**attempt, 30))
+        raise RuntimeError("unreachable")
+
+    async def _wait_for_capacity(self, tokens: int) -> None:
+        """Honour a 429 pause, then take `tokens` from the per-minute budget."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if not self.tokens_per_minute:
+                return
+            rate = self.tokens_per_minute / 60
+            if self._bucket_updated:
+                self._bucket = min(
+                    self.tokens_per_minute,
+                    self._bucket + (now - self._bucket_updated) * rate,
+                )
+            self._bucket_updated = now
+            needed = min(tokens, self.tokens_per_minute)
+            if self._bucket >= needed:
+                self._bucket -= needed
+                return
+            await asyncio.sleep((needed - self._bucket) / rate)
+
+    def stats(self) -> dict:
+        return {
+            "provider_requests": self.requests,
+            "texts_embedded": self.texts,
+            "avg_batch_size": self.texts / self.requests if self.requests else 0.0,
+            "rate_limited": self.rate_limited,
+            "queued": len(self._queue),
+        }
+
+
+_scheduler: EmbeddingScheduler | None = None
+
+
+def get_embedding_scheduler() -> EmbeddingScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = EmbeddingScheduler(
+            window_ms=settings.embedding_batch_window_ms,
+            max_batch_size=settings.embedding_max_batch_size,
+            max_batch_tokens=settings.embedding_max_batch_tokens,
+            max_concurrent_requests=settings.embedding_max_concurrent_requests,
+            tokens_per_minute=settings.embedding_tokens_per_minute,
+            max_retries=settings.embedding_max_retries,
+        )
+    return _scheduler
+
+
+async def generate_embeddings(texts: list[str]) -> list[list[float]]:
+    """Generate embeddings for a list of texts.
+
+    Requests are micro-batched with those of other concurrent callers (see
+    EmbeddingScheduler), so any number of texts may be passed.
+
+    Args:
+        texts: List of text strings to embed.
+
+    Returns:
+        List of embedding vectors, one per input text.
+    """
+    if not texts:
+        return []
+    return await get_embedding_scheduler().embed(texts)
+
+
 async def generate_embedding(text: str) -> list[float]:
     """Generate a single embedding vector for a text string."""
     embeddings = await generate_embeddings([text])
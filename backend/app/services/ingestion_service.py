@@ -1,10 +1,32 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from postgrest.types import ReturnMethod
 from app.config import settings
 from app.database.supabase_client import supabase
-from app.services.embedding_service import generate_embeddings
+from app.database.storage import download_text_stream
+from app.services.chunker import CharacterChunker, get_chunker
+from app.services.embedding_service import embedding_column, generate_embeddings, pgvector_literal
+from app.services.parser_pool import extract_text
+from app.services.parsers import has_parser
+from app.services.embedding_cache import content_hash, embedding_cache
+from app.services.record_manager import apply_chunk_diff, load_chunk_records
+from app.services.document_events import publish_document_event
+from app.services.metadata_service import extract_document_metadata, metadata_sample
+
+logger = logging.getLogger(__name__)
+
+# A batch is a list of (chunk_index, chunk_text) pairs
+ChunkBatch = list[tuple[int, str]]
+
+
+def iter_chunks(text: str, chunk_size: int, chunk_overlap: int) -> Iterator[str]:
+    """Lazily yield fixed-size character chunks (see chunker.CharacterChunker)."""
+    return CharacterChunker(chunk_size, chunk_overlap).iter_chunks(text)
 
 
 def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
-    """Split text into overlapping chunks.
+    """Split text into overlapping fixed-size character chunks.
 
     Args:
         text: The full text to chunk.
@@ -14,40 +36,156 @@ def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
     Returns:
         List of text chunks.
     """
-    if not text.strip():
-        return []
+    return list(iter_chunks(text, chunk_size, chunk_overlap))
+
+
+def iter_batches(chunks: Iterable[tuple[int, str]], batch_size: int) -> Iterator[ChunkBatch]:
+    """Group a stream of (chunk_index, text) pairs into batches without materializing it."""
+    batch: ChunkBatch = []
+    for pair in chunks:
+        batch.append(pair)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def aiter_batches(
+    chunks: Iterable[tuple[int, str]] | AsyncIterable[tuple[int, str]], batch_size: int
+) -> AsyncIterator[ChunkBatch]:
+    """iter_batches for a sync or async stream of (chunk_index, text) pairs."""
+    if not isinstance(chunks, AsyncIterable):
+        for batch in iter_batches(chunks, batch_size):
+            yield batch
+        return
+    batch: ChunkBatch = []
+    async for pair in chunks:
+        batch.append(pair)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def embed_chunks_pipeline(
+    chunks: Iterable[tuple[int, str]] | AsyncIterable[tuple[int, str]],
+    on_batch: Callable[[ChunkBatch, list[list[float]]], Awaitable[None]],
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+    use_cache: bool = True,
+) -> int:
+    """Embed a chunk stream with bounded concurrency, handing off each batch as it completes.
+
+    Chunks are pulled from the iterable lazily; at most `concurrency` batches are
+    in flight (embedding or being stored) at once, so peak memory is bounded by
+    `batch_size * concurrency` chunks and their vectors regardless of file size.
+
+    Each window of chunks is first looked up in the embedding cache. Hits go
+    straight to `on_batch`; only misses are accumulated into provider requests,
+    so a mostly-cached document costs few (and full) embedding calls.
+
+    Args:
+        chunks: Iterable or async iterable of (chunk_index, text) pairs (may be a generator).
+        on_batch: Async callback receiving (batch, embeddings) once a batch is embedded.
+        batch_size: Chunks per embedding request. Defaults to settings.embedding_batch_size.
+        concurrency: Max in-flight batches. Defaults to settings.ingestion_concurrency.
+        use_cache: Consult and populate the embedding cache.
+
+    Returns:
+        Total number of chunks processed.
+    """
+    batch_size = batch_size or settings.embedding_batch_size
+    concurrency = concurrency or settings.ingestion_concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    pending: set[asyncio.Task] = set()
+    total = 0
+
+    async def embed(batch: ChunkBatch):
+        try:
+            texts = [text for _, text in batch]
+            embeddings = await generate_embeddings(texts)
+            if use_cache:
+                await asyncio.gather(
+                    embedding_cache.put_many(texts, embeddings),
+                    on_batch(batch, embeddings),
+                )
+            else:
+                await on_batch(batch, embeddings)
+        finally:
+            semaphore.release()
 
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        start += chunk_size - chunk_overlap
+    async def store_cached(batch: ChunkBatch, embeddings: list[list[float]]):
+        try:
+            await on_batch(batch, embeddings)
+        finally:
+            semaphore.release()
 
-    return chunks
+    async def submit(coro):
+        await semaphore.acquire()
+        # Surface failures from finished batches before starting more work
+        for task in [t for t in pending if t.done()]:
+            pending.discard(task)
+            task.result()
+        pending.add(asyncio.create_task(coro))
 
+    try:
+        misses: ChunkBatch = []
+        async for window in aiter_batches(chunks, batch_size):
+            total += len(window)
+            if not use_cache:
+                await submit(embed(window))
+                continue
+
+            cached = await embedding_cache.get_many([text for _, text in window])
+            hits = [(pair, vec) for pair, vec in zip(window, cached) if vec is not None]
+            if hits:
+                await submit(store_cached([p for p, _ in hits], [v for _, v in hits]))
+            misses.extend(pair for pair, vec in zip(window, cached) if vec is None)
+            while len(misses) >= batch_size:
+                await submit(embed(misses[:batch_size]))
+                misses = misses[batch_size:]
+        if misses:
+            await submit(embed(misses))
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return total
+
+
+async def process_document(document_id: str, user_id: str) -> dict:
+    """Process a document: stream download, chunk, embed, store.
 
-async def process_document(document_id: str, user_id: str):
-    """Process a document: download, chunk, embed, store.
+    This is the ingestion job handler run by the worker pool (see job_queue).
+    Status transitions are owned by the job queue; exceptions are re-raised so
+    the queue can retry or mark the document failed.
 
-    This is the main ingestion pipeline. Call via asyncio.create_task().
-    Updates the document status in the database as it progresses.
+    Re-ingestion is incremental: chunks whose content hash is already stored
+    for this document are reused, only new chunks are embedded and inserted,
+    and chunks that vanished from the new version are deleted at the end.
+
+    Document metadata (title, type, date, tags) is extracted from the opening
+    chunks in one LLM call, run alongside embedding, and then merged into the
+    metadata of every chunk of the document so searches can filter on it.
 
     Args:
         document_id: UUID of the document row.
         user_id: UUID of the owning user.
+
+    Returns:
+        Dict with chunk_count plus reused/embedded/deleted chunk counts and the
+        extracted metadata fields.
     """
+    records = None
+    extraction: asyncio.Task | None = None
     try:
-        # Update status to processing
-        supabase.table("documents").update({"status": "processing"}).eq(
-            "id", document_id
-        ).execute()
-
         # Fetch document metadata
         doc_result = (
-            supabase.table("documents")
+            await supabase.table("documents")
             .select("*")
             .eq("id", document_id)
             .execute()
@@ -56,57 +194,112 @@ async def process_document(document_id: str, user_id: str):
             raise ValueError(f"Document {document_id} not found")
         doc = doc_result.data[0]
 
-        # Download file from Supabase Storage
-        file_bytes = supabase.storage.from_("documents").download(doc["storage_path"])
-        text = file_bytes.decode("utf-8")
+        # Chunks already stored (previous version, or an interrupted attempt)
+        records = await load_chunk_records(document_id)
 
-        # Chunk the text
-        chunks = chunk_text(
-            text,
-            chunk_size=settings.chunk_size,
-            chunk_overlap=settings.chunk_overlap,
-        )
+        if has_parser(doc["mime_type"]):
+            # PDF/DOCX/HTML: extracted in the parser process pool (or read
+            # back from the extraction cache) as markdown-style text
+            text, text_length = await extract_text(doc)
+            chunker = get_chunker("text/markdown")
+        else:
+            # Plain text: stream the file from Supabase Storage, decoding and
+            # chunking as it arrives
+            text = download_text_stream(
+                "documents", doc["storage_path"], settings.storage_stream_chunk_size
+            )
+            text_length = doc["file_size"]
+            chunker = get_chunker(doc["mime_type"])
+        chunks_total = chunker.estimate_count(text_length)
+        stored = 0
+        # Until the new extraction lands, chunks carry the previous version's metadata
+        chunk_metadata = {"filename": doc["filename"], **(doc.get("metadata") or {})}
+        opening: list[str] = []
+
+        def start_extraction():
+            nonlocal extraction
+            if settings.metadata_extraction and extraction is None and opening:
+                sample = metadata_sample(opening, settings.metadata_extraction_chars)
+                extraction = asyncio.create_task(extract_document_metadata(doc["filename"], sample))
+
+        async def new_chunks():
+            chunks = chunker.aiter_chunks(text)
+            idx = 0
+            async for chunk in chunks:
+                if extraction is None:
+                    opening.append(chunk)
+                    if sum(map(len, opening)) >= settings.metadata_extraction_chars:
+                        start_extraction()
+                if not records.claim(chunk, idx):
+                    yield idx, chunk
+                idx += 1
+            start_extraction()  # Documents shorter than the sample
+
+        column = embedding_column()
+        half = column == "embedding_half"
+
+        async def store_batch(batch: ChunkBatch, embeddings: list[list[float]]):
+            rows = [
+                {
+                    "document_id": document_id,
+                    "user_id": user_id,
+                    "content": chunk,
+                    "content_hash": content_hash(chunk),
+                    "chunk_index": idx,
+                    column: pgvector_literal(embedding, half),
+                    "metadata": chunk_metadata,
+                }
+                for (idx, chunk), embedding in zip(batch, embeddings)
+            ]
+            await supabase.table("chunks").insert(
+                rows, returning=ReturnMethod.minimal
+            ).execute()
+
+            nonlocal stored
+            stored += len(batch)
+            chunks_done = records.reused + stored
+            publish_document_event(
+                user_id,
+                document_id,
+                "processing",
+                chunks_done=chunks_done,
+                chunks_total=max(chunks_total, chunks_done),
+            )
+
+        # Chunk lazily -> skip unchanged -> embed N batches concurrently -> insert as each completes
+        embedded = await embed_chunks_pipeline(new_chunks(), on_batch=store_batch)
+        deleted = await apply_chunk_diff(document_id, records)
+
+        metadata = {}
+        if extraction is not None:
+            try:
+                metadata = await extraction
+            except Exception:
+                # Metadata only narrows searches; the document is still usable without it
+                logger.warning("Metadata extraction failed for document %s", document_id, exc_info=True)
+            if metadata:
+                await supabase.rpc(
+                    "set_document_metadata", {"p_document_id": document_id, "p_metadata": metadata}
+                ).execute()
+
+        return {
+            "chunk_count": records.reused + embedded,
+            "reused": records.reused,
+            "embedded": embedded,
+            "deleted": deleted,
+            "metadata": sorted(metadata),
+        }
 
-        if not chunks:
-            supabase.table("documents").update(
-                {"status": "completed", "chunk_count": 0}
-            ).eq("id", document_id).execute()
-            return
-
-        # Generate embeddings in batches
-        batch_size = 100
-        all_embeddings = []
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i : i + batch_size]
-            embeddings = await generate_embeddings(batch)
-            all_embeddings.extend(embeddings)
-
-        # Insert chunks with embeddings
-        chunk_rows = [
-            {
-                "document_id": document_id,
-                "user_id": user_id,
-                "content": chunk,
-                "chunk_index": idx,
-                "embedding": embedding,
-                "metadata": {"filename": doc["filename"]},
-            }
-            for idx, (chunk, embedding) in enumerate(zip(chunks, all_embeddings))
-        ]
-
-        # Insert in batches (Supabase has row limits per request)
-        insert_batch_size = 500
-        for i in range(0, len(chunk_rows), insert_batch_size):
-            batch = chunk_rows[i : i + insert_batch_size]
-            supabase.table("chunks").insert(batch).execute()
-
-        # Update document status
-        supabase.table("documents").update(
-            {"status": "completed", "chunk_count": len(chunks)}
-        ).eq("id", document_id).execute()
-
-    except Exception as e:
-        # Mark document as failed
-        supabase.table("documents").update(
-            {"status": "failed", "error_message": str(e)[:500]}
-        ).eq("id", document_id).execute()
+    except Exception:
+        if extraction is not None:
+            extraction.cancel()
+        # First ingestion: drop partially inserted chunks (best-effort). On
+        # re-ingestion keep them; the retry reconciles them by content hash.
+        if records is not None and records.existing == 0:
+            try:
+                await supabase.table("chunks").delete().eq(
+                    "document_id", document_id
+                ).execute()
+            except Exception:
+                pass
+        raise
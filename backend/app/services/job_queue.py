@@ -0,0 +1,374 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.document_events import publish_document_event
+
+logger = logging.getLogger(__name__)
+
+# Handler signature: (document_id, user_id) -> {"chunk_count": int, **stats}. Raises on failure.
+JobHandler = Callable[[str, str], Awaitable[dict]]
+
+
+class JobStore:
+    """Persistence backend for the ingestion queue.
+
+    Jobs are rows of the `documents` table; the store owns every status
+    transition after upload (pending -> processing -> completed/failed).
+    """
+
+    async def claim(self, worker_id: str, limit: int, lease_seconds: int, max_attempts: int) -> list[dict]:
+        """Claim up to `limit` jobs. Expired leases with `max_attempts` used are
+        marked failed instead and returned with status "failed"."""
+        raise NotImplementedError
+
+    async def heartbeat(self, document_id: str, worker_id: str, lease_seconds: int) -> bool:
+        raise NotImplementedError
+
+    async def complete(self, document_id: str, worker_id: str, result: dict) -> None:
+        raise NotImplementedError
+
+    async def fail(
+        self,
+        document_id: str,
+        worker_id: str,
+        error: str,
+        max_attempts: int,
+        backoff_seconds: float,
+    ) -> str | None:
+        raise NotImplementedError
+
+    async def recover(self, max_attempts: int) -> int:
+        raise NotImplementedError
+
+
+class SupabaseJobStore(JobStore):
+    """Job store backed by the queue functions in 008_ingestion_jobs.sql (as amended by 024)."""
+
+    async def claim(self, worker_id, limit, lease_seconds, max_attempts):
+        result = await supabase.rpc(
+            "claim_ingestion_jobs",
+            {
+                "p_worker_id": worker_id,
+                "p_limit": limit,
+                "p_lease_seconds": lease_seconds,
+                "p_max_attempts": max_attempts,
+            },
+        ).execute()
+        return result.data or []
+
+    async def heartbeat(self, document_id, worker_id, lease_seconds):
+        result = await supabase.rpc(
+            "heartbeat_ingestion_job",
+            {
+                "p_document_id": document_id,
+                "p_worker_id": worker_id,
+                "p_lease_seconds": lease_seconds,
+            },
+        ).execute()
+        return bool(result.data)
+
+    async def complete(self, document_id, worker_id, result):
+        stats = {k: v for k, v in result.items() if k != "chunk_count"}
+        await supabase.rpc(
+            "complete_ingestion_job",
+            {
+                "p_document_id": document_id,
+                "p_worker_id": worker_id,
+                "p_chunk_count": result["chunk_count"],
+                "p_stats": stats or None,
+            },
+        ).execute()
+
+    async def fail(self, document_id, worker_id, error, max_attempts, backoff_seconds):
+        result = await supabase.rpc(
+            "fail_ingestion_job",
+            {
+                "p_document_id": document_id,
+                "p_worker_id": worker_id,
+                "p_error": error,
+                "p_max_attempts": max_attempts,
+                "p_backoff_seconds": backoff_seconds,
+            },
+        ).execute()
+        return result.data
+
+    async def recover(self, max_attempts):
+        result = await supabase.rpc("recover_ingestion_jobs", {"p_max_attempts": max_attempts}).execute()
+        return result.data or 0
+
+
+def _died_message(job: dict) -> str:
+    return (
+        f"Gave up after {job['attempts']} attempts: the worker stopped "
+        "(crash, kill or out of memory) while processing it"
+    )
+
+
+class InMemoryJobStore(JobStore):
+    """In-process stand-in with the same semantics as the SQL functions.
+
+    Used by the local queue harness and for running workers without a database.
+    """
+
+    def __init__(self):
+        self.jobs: dict[str, dict] = {}
+
+    def enqueue(self, document_id: str, user_id: str) -> None:
+        self.jobs[document_id] = {
+            "id": document_id,
+            "user_id": user_id,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": time.time(),
+            "locked_by": None,
+            "lease_expires_at": None,
+            "error_message": None,
+            "chunk_count": 0,
+            "seq": len(self.jobs),
+        }
+
+    async def claim(self, worker_id, limit, lease_seconds, max_attempts):
+        now = time.time()
+        exhausted = []
+        for j in self.jobs.values():
+            if j["status"] == "processing" and j["lease_expires_at"] < now and j["attempts"] >= max_attempts:
+                j.update(status="failed", error_message=_died_message(j), locked_by=None, lease_expires_at=None)
+                exhausted.append(dict(j))
+        runnable = sorted(
+            (
+                j
+                for j in self.jobs.values()
+                if (j["status"] == "pending" and j["next_attempt_at"] <= now)
+                or (j["status"] == "processing" and j["lease_expires_at"] < now)
+            ),
+            key=lambda j: (j["next_attempt_at"], j["seq"]),
+        )
+        in_flight: dict[str, int] = {}
+        for j in self.jobs.values():
+            if j["status"] == "processing" and j["lease_expires_at"] >= now:
+                in_flight[j["user_id"]] = in_flight.get(j["user_id"], 0) + 1
+
+        # Round-robin across users, fewest in-flight first (mirrors claim_ingestion_jobs)
+        user_rank: dict[str, int] = {}
+        ranked = []
+        for j in runnable:
+            user_rank[j["user_id"]] = user_rank.get(j["user_id"], 0) + 1
+            ranked.append((user_rank[j["user_id"]], in_flight.get(j["user_id"], 0), j["next_attempt_at"], j["seq"], j))
+        ranked.sort(key=lambda r: r[:4])
+
+        claimed = []
+        for *_, j in ranked[:limit]:
+            j.update(
+                status="processing",
+                locked_by=worker_id,
+                lease_expires_at=now + lease_seconds,
+                attempts=j["attempts"] + 1,
+                error_message=None,
+            )
+            claimed.append(dict(j))
+        return exhausted + claimed
+
+    async def heartbeat(self, document_id, worker_id, lease_seconds):
+        j = self.jobs.get(document_id)
+        if not j or j["locked_by"] != worker_id or j["status"] != "processing":
+            return False
+        j["lease_expires_at"] = time.time() + lease_seconds
+        return True
+
+    async def complete(self, document_id, worker_id, result):
+        j = self.jobs.get(document_id)
+        if j and j["locked_by"] == worker_id:
+            stats = {k: v for k, v in result.items() if k != "chunk_count"}
+            j.update(
+                status="completed",
+                chunk_count=result["chunk_count"],
+                ingest_stats=stats or None,
+                locked_by=None,
+                lease_expires_at=None,
+            )
+
+    async def fail(self, document_id, worker_id, error, max_attempts, backoff_seconds):
+        j = self.jobs.get(document_id)
+        if not j or j["locked_by"] != worker_id:
+            return None
+        j.update(
+            status="pending" if j["attempts"] < max_attempts else "failed",
+            next_attempt_at=time.time() + backoff_seconds * 2 ** max(j["attempts"] - 1, 0),
+            error_message=error[:500],
+            locked_by=None,
+            lease_expires_at=None,
+        )
+        return j["status"]
+
+    async def recover(self, max_attempts):
+        now = time.time()
+        recovered = 0
+        for j in self.jobs.values():
+            if j["status"] == "processing" and (
+                j["lease_expires_at"] is None or j["lease_expires_at"] < now
+            ):
+                if j["attempts"] >= max_attempts:
+                    j.update(status="failed", error_message=_died_message(j))
+                else:
+                    j.update(status="pending")
+                j.update(next_attempt_at=now, locked_by=None, lease_expires_at=None)
+                recovered += 1
+        return recovered
+
+
+# Pools running in this process, so the upload route can wake them immediately
+_local_pools: set["IngestionWorkerPool"] = set()
+
+
+def wake_workers() -> None:
+    """Signal in-process worker pools that new jobs were enqueued."""
+    for pool in _local_pools:
+        pool.notify()
+
+
+class IngestionWorkerPool:
+    """Claims ingestion jobs from a JobStore and runs up to `concurrency` at once.
+
+    Each running job holds a lease that is extended by a heartbeat; if the
+    lease is lost (another worker reclaimed it) the job is cancelled. Failures
+    are retried with exponential backoff up to `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        concurrency: int | None = None,
+        worker_id: str | None = None,
+        lease_seconds: int | None = None,
+        heartbeat_seconds: float | None = None,
+        max_attempts: int | None = None,
+        backoff_seconds: float | None = None,
+        poll_interval: float | None = None,
+    ):
+        self.store = store
+        self.handler = handler
+        self.concurrency = concurrency or settings.ingestion_worker_concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds or settings.ingestion_lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds or settings.ingestion_heartbeat_seconds
+        self.max_attempts = max_attempts or settings.ingestion_max_attempts
+        self.backoff_seconds = backoff_seconds or settings.ingestion_retry_backoff_seconds
+        self.poll_interval = poll_interval or settings.ingestion_poll_interval
+        self._active: dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._runner: asyncio.Task | None = None
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        try:
+            recovered = await self.store.recover(self.max_attempts)
+            if recovered:
+                logger.info("Recovered %d orphaned ingestion jobs", recovered)
+        except Exception:
+            logger.exception("Ingestion job recovery failed; expired leases are still reclaimed on claim")
+        _local_pools.add(self)
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 30) -> None:
+        """Stop claiming, give active jobs `drain_timeout` seconds, then cancel them.
+
+        Cancelled jobs keep their lease and are picked up again once it expires.
+        """
+        self._stopping = True
+        _local_pools.discard(self)
+        self.notify()
+        if self._runner:
+            await self._runner
+        if self._active:
+            _, pending = await asyncio.wait(self._active.values(), timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            free = self.concurrency - len(self._active)
+            jobs = []
+            if free > 0:
+                try:
+                    jobs = await self.store.claim(self.worker_id, free, self.lease_seconds, self.max_attempts)
+                except Exception:
+                    logger.exception("Failed to claim ingestion jobs")
+            exhausted = [job for job in jobs if job["status"] == "failed"]
+            for job in exhausted:
+                # Poison job: its worker died on every attempt
+                logger.warning("Ingestion job %s failed: %s", job["id"], job["error_message"])
+                publish_document_event(job["user_id"], job["id"], "failed", error_message=job["error_message"])
+            jobs = [job for job in jobs if job["status"] != "failed"]
+            for job in jobs:
+                task = asyncio.create_task(self._process(job))
+                self._active[job["id"]] = task
+                task.add_done_callback(lambda _, job_id=job["id"]: self._finished(job_id))
+            if (jobs or exhausted) and len(self._active) < self.concurrency:
+                continue  # More capacity and the queue may have more — claim again
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finished(self, job_id: str) -> None:
+        self._active.pop(job_id, None)
+        self.notify()  # A slot freed up
+
+    async def _process(self, job: dict) -> None:
+        document_id, user_id = job["id"], job["user_id"]
+        publish_document_event(user_id, document_id, "processing")
+        work = asyncio.create_task(self.handler(document_id, user_id))
+        heartbeat = asyncio.create_task(self._heartbeat(document_id, work))
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if not work.cancelled():
+                raise
+            logger.warning("Ingestion job %s cancelled (lease lost or shutdown)", document_id)
+            return
+        except Exception as e:
+            status = await self.store.fail(
+                document_id, self.worker_id, str(e), self.max_attempts, self.backoff_seconds
+            )
+            logger.warning("Ingestion job %s failed (attempt %s, now %s): %s", document_id, job.get("attempts"), status, e)
+            if status:
+                publish_document_event(user_id, document_id, status, error_message=str(e))
+            return
+        finally:
+            heartbeat.cancel()
+        await self.store.complete(document_id, self.worker_id, result)
+        publish_document_event(user_id, document_id, "completed", chunk_count=result["chunk_count"])
+
+    async def _heartbeat(self, document_id: str, work: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                owned = await self.store.heartbeat(document_id, self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("Heartbeat failed for ingestion job %s", document_id)
+                continue
+            if not owned:
+                work.cancel()
+                return
+
+
+def create_worker_pool(concurrency: int | None = None) -> IngestionWorkerPool:
+    """Worker pool wired to the documents table and the ingestion pipeline."""
+    from app.services.ingestion_service import process_document
+
+    return IngestionWorkerPool(SupabaseJobStore(), process_document, concurrency=concurrency)
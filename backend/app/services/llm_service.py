@@ -35,14 +35,44 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "search_documents",
-            "description": "Search the user's uploaded documents for relevant information. Use this when the user asks questions that might be answered by their documents.",
+            "description": (
+                "Search the user's uploaded documents for relevant information. Use this when the user "
+                "asks questions that might be answered by their documents. Results list each source "
+                "document once (ref, id, filename, title) and passages cite them as D<n>:<chunk range>."
+            ),
             "parameters": {
                 "type": "object",
                 "properties": {
                     "query": {
                         "type": "string",
                         "description": "The search query to find relevant document chunks",
-                    }
+                    },
+                    "document_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Only search these documents (document ids from earlier results)",
+                    },
+                    "filename": {
+                        "type": "string",
+                        "description": "Only search the document with this exact filename",
+                    },
+                    "document_type": {
+                        "type": "string",
+                        "description": "Only search documents of this type, e.g. report, invoice, contract",
+                    },
+                    "tags": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Only search documents tagged with all of these lowercase topics",
+                    },
+                    "date_from": {
+                        "type": "string",
+                        "description": "Only documents dated on or after this date (YYYY-MM-DD)",
+                    },
+                    "date_to": {
+                        "type": "string",
+                        "description": "Only documents dated on or before this date (YYYY-MM-DD)",
+                    },
                 },
                 "required": ["query"],
             },
@@ -129,3 +159,29 @@ async def stream_chat_response(
 
     except Exception as e:
         yield ("error", str(e))
+
+
+async def complete_chat(
+    messages: list[dict],
+    model: str | None = None,
+    base_url: str | None = None,
+    max_tokens: int | None = None,
+) -> str:
+    """Non-streaming, tool-free completion (used for background work like summaries).
+
+    Args:
+        messages: Chat Completions messages array.
+        model: Override model. Falls back to env var default.
+        base_url: Override base_url. Falls back to env var default.
+        max_tokens: Optional cap on the completion length.
+
+    Returns:
+        The completion text ("" if the model returned none).
+    """
+    client = _get_client(base_url)
+    response = await client.chat.completions.create(
+        model=model or settings.llm_model,
+        messages=messages,
+        max_tokens=max_tokens,
+    )
+    return response.choices[0].message.content or ""
@@ -0,0 +1,548 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from cachetools import TTLCache
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.document_events import document_events
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+_PAGE = 1000
+_INT8_BLOCK = 4096  # Rows upcast to float32 at a time when scoring int8 matrices
+
+CHUNK_COLUMNS = "id, document_id, chunk_index, content, metadata, embedding, embedding_half"
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError(f"VECTOR_STORE={settings.vector_store} requires the numpy package") from e
+    return numpy
+
+
+def _contains(value, wanted) -> bool:
+    """jsonb `value @> wanted`: objects by key, arrays by element, scalars by equality."""
+    if isinstance(wanted, dict):
+        return isinstance(value, dict) and all(k in value and _contains(value[k], v) for k, v in wanted.items())
+    if isinstance(wanted, list):
+        return isinstance(value, list) and all(any(_contains(x, w) for x in value) for w in wanted)
+    return value == wanted
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class _Snapshot:
+    """Row metadata plus the matching matrix of unit-normalized embeddings.
+
+    Never mutated: add/delete build a new snapshot and swap it in with one
+    assignment, so a search running in a worker thread reads `tenant.snapshot`
+    once and always pairs rows with their own vectors and scales.
+    """
+
+    __slots__ = ("rows", "vectors", "scales", "_keywords")
+
+    def __init__(self, rows: list[dict], vectors, scales):
+        self.rows = rows  # id, document_id, chunk_index, content, metadata
+        self.vectors = vectors
+        self.scales = scales  # Per-row dequantization factor (int8 only)
+        self._keywords: tuple | None = None
+
+    @classmethod
+    def empty(cls, np, dims: int, dtype: str) -> "_Snapshot":
+        return cls([], np.zeros((0, dims), dtype=dtype), np.zeros(0, dtype="float32"))
+
+    def keyword_index(self, np) -> tuple[dict, object]:
+        """Postings (term -> (row indexes, term frequencies)) and row lengths, built on first use."""
+        if self._keywords is None:
+            postings: dict[str, tuple[list[int], list[int]]] = {}
+            lengths = []
+            for i, row in enumerate(self.rows):
+                counts = Counter(_tokenize(row["content"]))
+                lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    rows, tfs = postings.setdefault(term, ([], []))
+                    rows.append(i)
+                    tfs.append(tf)
+            self._keywords = (
+                {
+                    term: (np.asarray(rows, dtype="int64"), np.asarray(tfs, dtype="float32"))
+                    for term, (rows, tfs) in postings.items()
+                },
+                np.asarray(lengths, dtype="float32"),
+            )
+        return self._keywords
+
+
+class _Tenant:
+    """One user's current _Snapshot plus the state used to keep it in sync."""
+
+    def __init__(self, snapshot: _Snapshot):
+        self.snapshot = snapshot
+        self.versions: dict[str, str] = {}  # document_id -> documents.updated_at when loaded
+        self.checked_at = -math.inf
+        self.lock = asyncio.Lock()
+
+
+class LocalVectorStore:
+    """Exact in-process vector search over per-user NumPy matrices.
+
+    For tenants small enough that a match_chunks round trip costs more than
+    the search itself. Each user's embeddings are held as one unit-normalized
+    float32 matrix (or int8 with a per-row scale, 4x smaller with slightly
+    approximate scores), scored with one matrix-vector product and cut to
+    top-k with argpartition. With `directory` set, matrices are saved there
+    and memory-mapped back, so the OS page cache holds them instead of the
+    Python heap and they survive restarts.
+
+    Modes (VECTOR_STORE):
+        auto   Users whose documents total at most `max_rows` chunks are
+               loaded from Supabase on first search and kept in sync per
+               document (only documents whose updated_at changed are
+               re-read; at most every `ttl_seconds`, or on the next search
+               after a completed/deleted document event). Larger users stay
+               on the database.
+        local  Never touches the database: rows come from `add` (tests,
+               offline benchmarks) or snapshots in `directory`.
+
+    Hybrid search mirrors hybrid_match_chunks (RRF over keyword and vector
+    ranks) with BM25 over lowercase word tokens standing in for Postgres
+    full-text ranking, so keyword ranks can differ slightly from the database.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        max_rows: int,
+        max_users: int,
+        dtype: str,
+        directory: str,
+        ttl_seconds: float,
+        dims: int,
+    ):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unknown LOCAL_VECTOR_STORE_DTYPE: {dtype} (expected float32 or int8)")
+        self.mode = mode
+        self.max_rows = max_rows
+        self.max_users = max_users
+        self.dtype = dtype
+        self.directory = directory
+        self.ttl = ttl_seconds
+        self.dims = dims
+        self._tenants: OrderedDict[str, _Tenant] = OrderedDict()
+        self._remote: TTLCache = TTLCache(maxsize=100000, ttl=ttl_seconds)  # Users too large to load
+        self._loading: dict[str, asyncio.Lock] = {}
+        self.searches = 0
+        self.loads = 0
+        self.documents_synced = 0
+        self.evictions = 0
+
+    # -- tenant management --------------------------------------------------
+
+    def _install(self, user_id: str, loaded: tuple | None, create: bool) -> _Tenant | None:
+        """Register a tenant read from disk (or an empty one with `create`), evicting LRU users."""
+        tenant = self._tenants.get(user_id)
+        if tenant is not None:
+            return tenant  # Loaded by another caller meanwhile
+        if loaded is not None:
+            tenant = _Tenant(loaded[0])
+            tenant.versions = loaded[1]
+        elif create:
+            tenant = _Tenant(_Snapshot.empty(_numpy(), self.dims, self.dtype))
+        if tenant is not None:
+            self._tenants[user_id] = tenant
+            while len(self._tenants) > self.max_users:
+                self._tenants.popitem(last=False)
+                self.evictions += 1
+        return tenant
+
+    def _tenant(self, user_id: str, create: bool = False) -> _Tenant | None:
+        tenant = self._tenants.get(user_id)
+        if tenant is not None:
+            self._tenants.move_to_end(user_id)
+            return tenant
+        return self._install(user_id, self._load_snapshot(user_id), create)
+
+    async def _open_tenant(self, user_id: str, create: bool = False) -> _Tenant | None:
+        """_tenant for the request path: a snapshot on disk is read in a worker thread."""
+        tenant = self._tenants.get(user_id)
+        if tenant is not None:
+            self._tenants.move_to_end(user_id)
+            return tenant
+        return self._install(user_id, await asyncio.to_thread(self._load_snapshot, user_id), create)
+
+    async def serves(self, user_id: str) -> bool:
+        """Whether this user's searches run in-process (loading or syncing them if needed)."""
+        if self.mode == "local":
+            await self._open_tenant(user_id, create=True)
+            return True
+        if user_id in self._remote:
+            return False
+        tenant = self._tenants.get(user_id)
+        if tenant is not None and time.monotonic() - tenant.checked_at < self.ttl:
+            self._tenants.move_to_end(user_id)
+            return True
+        lock = self._loading.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            tenant = self._tenants.get(user_id)
+            if tenant is not None and time.monotonic() - tenant.checked_at < self.ttl:
+                return True  # Synced by the caller we waited for
+            try:
+                return await self._sync(user_id)
+            except Exception:
+                logger.warning("Local vector store sync failed for %s; using the database", user_id, exc_info=True)
+                return False
+            finally:
+                self._loading.pop(user_id, None)
+
+    async def _sync(self, user_id: str) -> bool:
+        """Bring a user's matrix up to date with their documents; False if too large.
+
+        Decoding, normalizing and saving run in a worker thread; the event loop
+        only swaps in the finished snapshot.
+        """
+        versions, total = {}, 0
+        offset = 0
+        while True:
+            result = (
+                await supabase.table("documents")
+                .select("id, updated_at, chunk_count")
+                .eq("user_id", user_id)
+                .order("id")
+                .range(offset, offset + _PAGE - 1)
+                .execute()
+            )
+            for doc in result.data:
+                versions[doc["id"]] = doc["updated_at"]
+                total += doc["chunk_count"] or 0
+            if len(result.data) < _PAGE:
+                break
+            offset += _PAGE
+        if total > self.max_rows:
+            self._remote[user_id] = True
+            self._tenants.pop(user_id, None)
+            await asyncio.to_thread(self._remove_files, user_id)
+            return False
+
+        tenant = await self._open_tenant(user_id, create=True)
+        async with tenant.lock:
+            stale = [doc_id for doc_id, version in versions.items() if tenant.versions.get(doc_id) != version]
+            removed = [doc_id for doc_id in tenant.versions if doc_id not in versions]
+            if stale or removed:
+                rows = await self._fetch_chunks(stale) if stale else []
+                tenant.snapshot = await asyncio.to_thread(
+                    self._rebuild, user_id, tenant.snapshot, set(stale) | set(removed), rows, versions
+                )
+                tenant.versions = versions
+                self.documents_synced += len(stale) + len(removed)
+                self.loads += 1
+            tenant.checked_at = time.monotonic()
+        return True
+
+    async def _fetch_chunks(self, document_ids: list[str]) -> list[dict]:
+        rows = []
+        for i in range(0, len(document_ids), 100):
+            ids = document_ids[i : i + 100]
+            offset = 0
+            while True:
+                result = (
+                    await supabase.table("chunks")
+                    .select(CHUNK_COLUMNS)
+                    .in_("document_id", ids)
+                    .order("id")
+                    .range(offset, offset + _PAGE - 1)
+                    .execute()
+                )
+                rows.extend(result.data)
+                if len(result.data) < _PAGE:
+                    break
+                offset += _PAGE
+        return rows
+
+    def _remove_files(self, user_id: str) -> None:
+        if self.directory:
+            for suffix in (".npy", ".scales.npy", ".json"):
+                try:
+                    os.remove(self._path(user_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def on_document_event(self, user_id: str, event: dict) -> None:
+        """Document event listener: re-sync a loaded user on their next search."""
+        if event.get("status") in ("completed", "deleted"):
+            tenant = self._tenants.get(user_id)
+            if tenant is not None:
+                tenant.checked_at = -math.inf
+            self._remote.pop(user_id, None)
+
+    # -- matrix updates -----------------------------------------------------
+    # Pure functions of a snapshot: they build and return a new one, so they
+    # can run in a worker thread while searches keep using the current one.
+
+    def _encode(self, embeddings: list) -> tuple:
+        np = _numpy()
+        vectors = np.array(
+            [json.loads(e) if isinstance(e, str) else e for e in embeddings], dtype="float32"
+        ).reshape(len(embeddings), self.dims)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        if self.dtype == "float32":
+            return vectors, np.zeros(0, dtype="float32")
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(vectors / scales[:, None]).astype("int8"), scales.astype("float32")
+
+    def _replace(self, current: _Snapshot, keep: list[int], rows: list[dict]) -> _Snapshot:
+        """Rows `keep` of `current` followed by `rows`."""
+        np = _numpy()
+        vectors, scales = self._encode(
+            [row["embedding"] if row.get("embedding") is not None else row["embedding_half"] for row in rows]
+        )
+        kept = np.asarray(keep, dtype="int64")
+        return _Snapshot(
+            [current.rows[i] for i in keep]
+            + [
+                {key: row.get(key) for key in ("id", "document_id", "chunk_index", "content", "metadata")}
+                for row in rows
+            ],
+            np.concatenate([current.vectors[kept], vectors]),
+            np.concatenate([current.scales[kept], scales]) if self.dtype == "int8" else current.scales,
+        )
+
+    def _rebuild(
+        self, user_id: str, current: _Snapshot, document_ids: set[str], rows: list[dict], versions: dict
+    ) -> _Snapshot:
+        """Drop every row of `document_ids`, append `rows` and save the result."""
+        keep = [i for i, row in enumerate(current.rows) if row["document_id"] not in document_ids]
+        return self._save(user_id, self._replace(current, keep, rows), versions)
+
+    def add(self, user_id: str, rows: list[dict]) -> None:
+        """Insert or replace chunk rows ({id, document_id, chunk_index, content, metadata, embedding}).
+
+        Runs synchronously; meant for local mode (tests, offline benchmarks).
+        """
+        tenant = self._tenant(user_id, create=True)
+        ids = {row["id"] for row in rows}
+        keep = [i for i, row in enumerate(tenant.snapshot.rows) if row["id"] not in ids]
+        tenant.snapshot = self._save(user_id, self._replace(tenant.snapshot, keep, rows), tenant.versions)
+
+    def delete(self, user_id: str, ids: list[str] | None = None, document_id: str | None = None) -> None:
+        """Remove chunks by id, or every chunk of a document."""
+        tenant = self._tenant(user_id)
+        if tenant is None:
+            return
+        drop = set(ids or ())
+        keep = [
+            i
+            for i, row in enumerate(tenant.snapshot.rows)
+            if row["id"] not in drop and row["document_id"] != document_id
+        ]
+        if len(keep) != len(tenant.snapshot.rows):
+            tenant.snapshot = self._save(user_id, self._replace(tenant.snapshot, keep, []), tenant.versions)
+
+    # -- persistence --------------------------------------------------------
+
+    def _path(self, user_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{user_id}{suffix}")
+
+    def _save(self, user_id: str, snapshot: _Snapshot, versions: dict) -> _Snapshot:
+        """Write a snapshot to `directory`; returns it memory-mapped from there (unchanged without one)."""
+        if not self.directory:
+            return snapshot
+        np = _numpy()
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = [(".npy", snapshot.vectors)] + ([(".scales.npy", snapshot.scales)] if self.dtype == "int8" else [])
+        for suffix, array in arrays:
+            tmp = self._path(user_id, suffix + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, self._path(user_id, suffix))
+        tmp = self._path(user_id, ".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dtype": self.dtype, "rows": snapshot.rows, "versions": versions}, f)
+        os.replace(tmp, self._path(user_id, ".json"))
+        # Re-open memory-mapped so the saved copy lives in the page cache, not the heap
+        return self._open_arrays(user_id, snapshot.rows)
+
+    def _open_arrays(self, user_id: str, rows: list[dict]) -> _Snapshot:
+        np = _numpy()
+        vectors = np.load(self._path(user_id, ".npy"), mmap_mode="r")
+        if self.dtype == "int8":
+            return _Snapshot(rows, vectors, np.load(self._path(user_id, ".scales.npy"), mmap_mode="r"))
+        return _Snapshot(rows, vectors, np.zeros(0, dtype="float32"))
+
+    def _load_snapshot(self, user_id: str) -> tuple[_Snapshot, dict] | None:
+        """(snapshot, versions) saved in `directory`, or None."""
+        if not self.directory or not os.path.exists(self._path(user_id, ".json")):
+            return None
+        with open(self._path(user_id, ".json")) as f:
+            meta = json.load(f)
+        if meta["dtype"] != self.dtype:
+            return None  # Re-built from the database in the configured dtype
+        return self._open_arrays(user_id, meta["rows"]), meta["versions"]
+
+    # -- search -------------------------------------------------------------
+
+    def _similarities(self, snapshot: _Snapshot, embedding):
+        np = _numpy()
+        query = np.array(json.loads(embedding) if isinstance(embedding, str) else embedding, dtype="float32")
+        query /= np.linalg.norm(query) or 1
+        if self.dtype == "float32":
+            return snapshot.vectors @ query
+        scores = np.empty(len(snapshot.rows), dtype="float32")
+        for start in range(0, len(scores), _INT8_BLOCK):
+            block = snapshot.vectors[start : start + _INT8_BLOCK].astype("float32")
+            scores[start : start + _INT8_BLOCK] = block @ query
+        return scores * snapshot.scales
+
+    @staticmethod
+    def _matching(snapshot: _Snapshot, filters: dict | None):
+        """Boolean row mask for nearest_chunks' filter_* arguments, or None without filters."""
+        if not filters:
+            return None
+        np = _numpy()
+        document_ids = set(filters.get("filter_document_ids") or ())
+        wanted = filters.get("filter_metadata")
+        date_from, date_to = filters.get("filter_date_from"), filters.get("filter_date_to")
+        mask = np.ones(len(snapshot.rows), dtype=bool)
+        for i, row in enumerate(snapshot.rows):
+            metadata = row.get("metadata") or {}
+            document_date = metadata.get("date")
+            mask[i] = (
+                (not document_ids or row["document_id"] in document_ids)
+                and (not wanted or _contains(metadata, wanted))
+                and (not date_from or (document_date is not None and document_date >= date_from))
+                and (not date_to or (document_date is not None and document_date <= date_to))
+            )
+        return mask
+
+    @staticmethod
+    def _top(scores, count: int, eligible=None) -> list[int]:
+        """Indexes of the `count` highest scores, best first."""
+        np = _numpy()
+        if eligible is not None:
+            scores = np.where(eligible, scores, -np.inf)
+        count = min(count, len(scores))
+        if count <= 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count] if count < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [int(i) for i in top if scores[i] != -np.inf]
+
+    def _search(
+        self, user_id: str, embedding, match_count: int, min_similarity: float, filters: dict | None = None
+    ) -> list[dict]:
+        tenant = self._tenants.get(user_id)
+        snapshot = tenant.snapshot if tenant is not None else None  # Read once; _replace may swap it
+        if snapshot is None or not snapshot.rows:
+            return []
+        rows, similarities = snapshot.rows, self._similarities(snapshot, embedding)
+        eligible = similarities >= min_similarity
+        matching = self._matching(snapshot, filters)
+        if matching is not None:
+            eligible &= matching
+        top = self._top(similarities, match_count, eligible)
+        return [{**rows[i], "similarity": float(similarities[i])} for i in top]
+
+    def _keyword_ranks(self, snapshot: _Snapshot, query_text: str, count: int, matching=None) -> list[int]:
+        """BM25 over the user's chunks; rows matching any query term, best first."""
+        np = _numpy()
+        postings, lengths = snapshot.keyword_index(np)
+        terms = set(_tokenize(query_text))
+        if not terms or not len(lengths):
+            return []
+        k1, b = 1.2, 0.75
+        norms = k1 * (1 - b + b * lengths / (lengths.mean() or 1.0))
+        scores = np.zeros(len(lengths), dtype="float32")
+        for term in terms:
+            if term not in postings:
+                continue
+            rows, tfs = postings[term]
+            idf = math.log(1 + (len(lengths) - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (k1 + 1) / (tfs + norms[rows])
+        return self._top(scores, count, scores > 0 if matching is None else (scores > 0) & matching)
+
+    def _hybrid_search(
+        self,
+        user_id: str,
+        query_text: str,
+        embedding,
+        match_count: int,
+        min_similarity: float,
+        full_text_weight: float,
+        semantic_weight: float,
+        rrf_k: int,
+        candidate_count: int,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        tenant = self._tenants.get(user_id)
+        snapshot = tenant.snapshot if tenant is not None else None  # Read once; _replace may swap it
+        if snapshot is None or not snapshot.rows:
+            return []
+        rows, similarities = snapshot.rows, self._similarities(snapshot, embedding)
+        matching = self._matching(snapshot, filters)
+        fused: dict[int, float] = {}
+        for rank, i in enumerate(self._keyword_ranks(snapshot, query_text, candidate_count, matching), 1):
+            fused[i] = fused.get(i, 0.0) + full_text_weight / (rrf_k + rank)
+        eligible = similarities >= min_similarity
+        if matching is not None:
+            eligible &= matching
+        semantic = self._top(similarities, candidate_count, eligible)
+        for rank, i in enumerate(semantic, 1):
+            fused[i] = fused.get(i, 0.0) + semantic_weight / (rrf_k + rank)
+        best = sorted(fused, key=fused.__getitem__, reverse=True)[:match_count]
+        return [{**rows[i], "similarity": float(similarities[i]), "score": fused[i]} for i in best]
+
+    async def search(
+        self, user_id: str, embedding, match_count: int, min_similarity: float, filters: dict | None = None
+    ) -> list[dict]:
+        """match_chunks in-process: rows with id, document_id, content, chunk_index, metadata, similarity.
+
+        `filters` are match_chunks' filter_* arguments (document ids, metadata
+        containment, document date range).
+        """
+        self.searches += 1
+        return await asyncio.to_thread(self._search, user_id, embedding, match_count, min_similarity, filters)
+
+    async def hybrid_search(self, user_id: str, query_text: str, embedding, match_count: int, **params) -> list[dict]:
+        """hybrid_match_chunks in-process; `params` are its min_similarity, weights, rrf_k,
+        candidate_count and filters."""
+        self.searches += 1
+        return await asyncio.to_thread(self._hybrid_search, user_id, query_text, embedding, match_count, **params)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "dtype": self.dtype,
+            "users": len(self._tenants),
+            "rows": sum(len(t.snapshot.rows) for t in self._tenants.values()),
+            "bytes": sum(t.snapshot.vectors.nbytes + t.snapshot.scales.nbytes for t in self._tenants.values()),
+            "users_on_database": len(self._remote),
+            "searches": self.searches,
+            "loads": self.loads,
+            "documents_synced": self.documents_synced,
+            "evictions": self.evictions,
+        }
+
+
+local_vector_store = LocalVectorStore(
+    mode=settings.vector_store,
+    max_rows=settings.local_vector_store_max_rows,
+    max_users=settings.local_vector_store_max_users,
+    dtype=settings.local_vector_store_dtype,
+    directory=settings.local_vector_store_dir,
+    ttl_seconds=settings.local_vector_store_ttl_seconds,
+    dims=settings.embedding_dimensions,
+)
+# Completed/deleted documents mark their user for re-sync, from any process
+# publishing to the shared event channel
+document_events.add_listener(local_vector_store.on_document_event)
@@ -0,0 +1,106 @@
+import calendar
+import json
+import logging
+import re
+from datetime import date
+from app.config import settings
+from app.services.llm_service import complete_chat
+
+logger = logging.getLogger(__name__)
+
+METADATA_PROMPT = (
+    "You catalogue documents. From the filename and the opening excerpts below, reply with "
+    'a JSON object only: {"title": string, "type": string, "date": string | null, '
+    '"tags": [string]}. "type" is one or two lowercase words for the kind of document '
+    '(e.g. "report", "invoice", "contract", "meeting notes", "article"). "date" is the '
+    "document's own date (issued, published, signed) as YYYY-MM-DD, YYYY-MM or YYYY, or "
+    'null if none is stated. "tags" are up to 8 short lowercase topics.'
+)
+
+MAX_TAGS = 8
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def normalize_date(value, end: bool = False) -> str | None:
+    """ISO yyyy-mm-dd from "YYYY-MM-DD", "YYYY-MM" or "YYYY".
+
+    A year or month maps to the first day of the period, or its last day with
+    `end` (for inclusive upper bounds such as date_to).
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if re.fullmatch(r"\d{4}", value):
+        value += "-12-31" if end else "-01-01"
+    elif match := re.fullmatch(r"(\d{4})-(\d{2})", value):
+        year, month = int(match[1]), int(match[2])
+        if not 1 <= month <= 12:
+            return None
+        value += f"-{calendar.monthrange(year, month)[1]:02d}" if end else "-01"
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def normalize_metadata(raw: dict) -> dict:
+    """Keep the known fields in the shape the chunk filters expect, dropping anything else.
+
+    Returns:
+        Dict with any of title, type (lowercase), date (yyyy-mm-dd) and tags
+        (lowercase, deduplicated); missing or malformed fields are omitted.
+    """
+    metadata = {}
+    if isinstance(raw.get("title"), str) and raw["title"].strip():
+        metadata["title"] = raw["title"].strip()[:300]
+    if isinstance(raw.get("type"), str) and raw["type"].strip():
+        metadata["type"] = raw["type"].strip().lower()[:50]
+    if document_date := normalize_date(raw.get("date")):
+        metadata["date"] = document_date
+    if isinstance(raw.get("tags"), list):
+        tags = []
+        for tag in raw["tags"]:
+            tag = tag.strip().lower()[:50] if isinstance(tag, str) else ""
+            if tag and tag not in tags:
+                tags.append(tag)
+        if tags:
+            metadata["tags"] = tags[:MAX_TAGS]
+    return metadata
+
+
+def metadata_sample(chunks: list[str], max_chars: int) -> str:
+    """Leading chunks joined into one excerpt of at most `max_chars` characters."""
+    parts, used = [], 0
+    for chunk in chunks:
+        if used >= max_chars:
+            break
+        parts.append(chunk[: max_chars - used])
+        used += len(parts[-1])
+    return "\n\n".join(parts)
+
+
+async def extract_document_metadata(filename: str, sample: str) -> dict:
+    """One LLM call for a whole document: title, type, date and tags from its opening text.
+
+    Args:
+        filename: Original filename (often carries the title or date).
+        sample: Opening excerpt of the document (see metadata_sample).
+
+    Returns:
+        Normalized metadata (see normalize_metadata); {} if the model's reply
+        isn't a JSON object.
+    """
+    reply = await complete_chat(
+        [
+            {"role": "system", "content": METADATA_PROMPT},
+            {"role": "user", "content": f"Filename: {filename}\n\nExcerpts:\n{sample}"},
+        ],
+        model=settings.metadata_extraction_model or None,
+        max_tokens=settings.metadata_extraction_max_tokens,
+    )
+    try:
+        raw = json.loads(_FENCE_RE.sub("", reply.strip()))
+    except json.JSONDecodeError:
+        logger.warning("Metadata extraction for %s returned no JSON: %.200s", filename, reply)
+        return {}
+    return normalize_metadata(raw) if isinstance(raw, dict) else {}
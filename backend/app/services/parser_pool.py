@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import multiprocessing
+import resource
+from collections.abc import AsyncIterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.database.storage import download_text_stream
+from app.services.parsers import PARSER_VERSION, parse_document
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentParseError(Exception):
+    """Text could not be extracted (corrupt file, timeout, memory limit)."""
+
+
+def _limit_memory(limit_mb: int) -> None:
+    # Runs in each worker process: an oversized parse raises MemoryError there
+    # instead of growing until the host's OOM killer picks a victim
+    if limit_mb:
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class ParserPool:
+    """Runs document parsers in worker processes.
+
+    Parsing is CPU-bound and would stall every SSE stream on the event loop,
+    so each file is handed to a ProcessPoolExecutor. A parse that runs past
+    `timeout_seconds` gets its pool's processes terminated (other parses in
+    flight on that pool fail and are retried by the job queue); the pool is
+    recreated on next use. Workers are spawned fresh, not forked from the
+    API process, and run under an address-space limit.
+    """
+
+    def __init__(self, max_workers: int, timeout_seconds: float, memory_limit_mb: int):
+        self.max_workers = max_workers
+        self.timeout = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self._pool: ProcessPoolExecutor | None = None
+        self.parsed = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_limit_memory,
+                initargs=(self.memory_limit_mb,),
+            )
+        return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        if self._pool is pool:
+            self._pool = None
+            self.restarts += 1
+        # ProcessPoolExecutor cannot cancel a running call; kill its processes
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def parse(self, mime_type: str, data: bytes) -> str:
+        """Extract text from `data` in a worker process.
+
+        Raises:
+            DocumentParseError: The parser failed, timed out or ran out of memory.
+        """
+        pool = self._get_pool()
+        future = asyncio.get_running_loop().run_in_executor(pool, parse_document, mime_type, data)
+        try:
+            text = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._discard(pool)
+            raise DocumentParseError(f"Parsing timed out after {self.timeout:g}s")
+        except BrokenProcessPool:
+            self.failed += 1
+            self._discard(pool)
+            raise DocumentParseError("Parser process died (memory limit exceeded?)")
+        except MemoryError:
+            self.failed += 1
+            raise DocumentParseError(f"Parsing exceeded the {self.memory_limit_mb} MB memory limit")
+        except RuntimeError:
+            self.failed += 1
+            raise  # Missing optional parser dependency; the message says which
+        except Exception as e:
+            self.failed += 1
+            raise DocumentParseError(f"Could not extract text: {e}") from e
+        self.parsed += 1
+        return text
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "parsed": self.parsed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "cache_hits": self.cache_hits,
+        }
+
+
+parser_pool = ParserPool(
+    max_workers=settings.parser_workers,
+    timeout_seconds=settings.parser_timeout_seconds,
+    memory_limit_mb=settings.parser_memory_limit_mb,
+)
+
+
+def _cache_path(user_id: str, file_hash: str) -> str:
+    return f"{user_id}/parsed/{file_hash}.v{PARSER_VERSION}.txt"
+
+
+async def _single(text: str) -> AsyncIterable[str]:
+    yield text
+
+
+async def extract_text(doc: dict) -> tuple[AsyncIterable[str], int]:
+    """Extracted text of a stored PDF/DOCX/HTML document, parsing at most once per file.
+
+    Text is cached in Storage next to the user's files, keyed by the file's
+    content hash, so retries and re-uploads of the same bytes stream the
+    cached text instead of downloading and parsing the original again.
+
+    Returns:
+        (text pieces, text length in characters) — the length drives progress estimates.
+    """
+    cache_path = _cache_path(doc["user_id"], doc["content_hash"])
+    bucket = supabase.storage.from_("documents")
+    try:
+        info = await bucket.info(cache_path)
+    except Exception:
+        info = None
+    if info:
+        parser_pool.cache_hits += 1
+        pieces = download_text_stream("documents", cache_path, settings.storage_stream_chunk_size)
+        return pieces, info.get("size") or doc["file_size"]
+
+    data = await bucket.download(doc["storage_path"])
+    text = await parser_pool.parse(doc["mime_type"], data)
+    del data
+    try:
+        await bucket.upload(
+            path=cache_path,
+            file=text.encode("utf-8"),
+            file_options={"content-type": "text/plain; charset=utf-8", "upsert": "true"},
+        )
+    except Exception:
+        logger.warning("Could not cache extracted text for %s", doc["id"], exc_info=True)
+    return _single(text), len(text)
+
+
+async def discard_extracted_text(user_id: str, file_hash: str) -> None:
+    """Drop a cached extraction once no document of the user has that content any more."""
+    try:
+        remaining = (
+            await supabase.table("documents")
+            .select("id")
+            .eq("user_id", user_id)
+            .eq("content_hash", file_hash)
+            .limit(1)
+            .execute()
+        )
+        if not remaining.data:
+            await supabase.storage.from_("documents").remove([_cache_path(user_id, file_hash)])
+    except Exception:
+        pass  # Storage deletion is best-effort
@@ -0,0 +1,132 @@
+import io
+import re
+from collections.abc import Callable
+from html.parser import HTMLParser
+
+# Text extraction for binary and markup formats, keyed by MIME type. Parsers
+# run in parser_pool's worker processes, so this module must stay importable
+# without the app's settings or clients. Every parser returns markdown-style
+# text (# headings, blank-line paragraphs, "- " list items) so the chunker
+# can split on the document's structure.
+
+# Bump when parser output changes, so cached extractions are not reused
+PARSER_VERSION = 1
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+_PARSERS: dict[str, Callable[[bytes], str]] = {}
+
+
+def register_parser(*mime_types: str):
+    """Register a `bytes -> text` parser for one or more MIME types."""
+
+    def decorator(fn: Callable[[bytes], str]) -> Callable[[bytes], str]:
+        for mime_type in mime_types:
+            _PARSERS[mime_type] = fn
+        return fn
+
+    return decorator
+
+
+def has_parser(mime_type: str) -> bool:
+    return mime_type in _PARSERS
+
+
+def parsed_mime_types() -> set[str]:
+    return set(_PARSERS)
+
+
+def parse_document(mime_type: str, data: bytes) -> str:
+    """Extract text from a file. This is the function run in the process pool."""
+    return _PARSERS[mime_type](data)
+
+
+def _tidy(text: str) -> str:
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+class _HTMLText(HTMLParser):
+    SKIP = {"script", "style", "noscript", "template", "svg"}
+    BLOCK = {
+        "p", "div", "section", "article", "header", "footer", "main", "aside", "nav",
+        "ul", "ol", "table", "tr", "pre", "blockquote", "figure", "form", "hr",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif len(tag) == 2 and tag[0] == "h" and tag[1] in "123456":
+            self.parts.append("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag == "br":
+            self.parts.append("\n")
+        elif tag in ("td", "th"):
+            if self.parts and not self.parts[-1].endswith("\n"):
+                self.parts.append(" | ")
+        elif tag in self.BLOCK:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCK or (len(tag) == 2 and tag[0] == "h" and tag[1] in "123456"):
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data.replace("\n", " "))
+
+
+@register_parser("text/html")
+def parse_html(data: bytes) -> str:
+    """Visible text of an HTML page; scripts and styles are dropped."""
+    parser = _HTMLText()
+    parser.feed(data.decode("utf-8", errors="replace"))
+    parser.close()
+    return _tidy("".join(parser.parts))
+
+
+@register_parser("application/pdf")
+def parse_pdf(data: bytes) -> str:
+    """Text of each PDF page, pages separated by blank lines. Requires `pip install pypdf`."""
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("PDF parsing requires the pypdf package") from e
+    reader = PdfReader(io.BytesIO(data))
+    return _tidy("\n\n".join(page.extract_text() or "" for page in reader.pages))
+
+
+@register_parser(DOCX_MIME)
+def parse_docx(data: bytes) -> str:
+    """Paragraphs, headings, lists and tables of a Word document. Requires `pip install python-docx`."""
+    try:
+        import docx
+        from docx.table import Table
+    except ImportError as e:
+        raise RuntimeError("DOCX parsing requires the python-docx package") from e
+    document = docx.Document(io.BytesIO(data))
+    parts = []
+    for block in document.iter_inner_content():
+        if isinstance(block, Table):
+            rows = ([cell.text.strip() for cell in row.cells] for row in block.rows)
+            parts.append("\n".join(" | ".join(cells) for cells in rows if any(cells)))
+            continue
+        style = block.style.name if block.style is not None else ""
+        if style.startswith("Heading ") and style[8:].isdigit():
+            parts.append("#" * min(int(style[8:]), 6) + " " + block.text)
+        elif style == "Title":
+            parts.append("# " + block.text)
+        elif style.startswith("List"):
+            parts.append("- " + block.text)
+        else:
+            parts.append(block.text)
+    return _tidy("\n\n".join(parts))
@@ -0,0 +1,71 @@
+from collections import defaultdict, deque
+from app.database.supabase_client import supabase
+from app.services.embedding_cache import content_hash
+
+# PostgREST caps rows per response (Supabase default max_rows = 1000)
+_PAGE_SIZE = 1000
+
+
+class ChunkRecords:
+    """The chunks a document already has stored, indexed by content hash.
+
+    During re-ingestion each new chunk is offered via `claim`; a stored chunk
+    with the same hash is reused (renumbered if its position moved) instead of
+    being re-embedded. Whatever is left unclaimed afterwards is stale.
+    """
+
+    def __init__(self, rows: list[dict]):
+        self._by_hash: dict[str, deque] = defaultdict(deque)
+        for row in sorted(rows, key=lambda r: r["chunk_index"]):
+            self._by_hash[row["content_hash"]].append(row)
+        self.existing = len(rows)
+        self.reused = 0
+        self.reindex: list[tuple[str, int]] = []
+
+    def claim(self, text: str, chunk_index: int) -> bool:
+        """Reuse a stored chunk for this text if one exists. Returns True on reuse."""
+        candidates = self._by_hash.get(content_hash(text))
+        if not candidates:
+            return False
+        row = candidates.popleft()
+        if row["chunk_index"] != chunk_index:
+            self.reindex.append((row["id"], chunk_index))
+        self.reused += 1
+        return True
+
+    def stale_ids(self) -> list[str]:
+        return [row["id"] for rows in self._by_hash.values() for row in rows]
+
+
+async def load_chunk_records(document_id: str) -> ChunkRecords:
+    """Fetch (id, chunk_index, content_hash) for every stored chunk of a document."""
+    rows: list[dict] = []
+    while True:
+        result = (
+            await supabase.table("chunks")
+            .select("id, chunk_index, content_hash")
+            .eq("document_id", document_id)
+            .order("id")
+            .range(len(rows), len(rows) + _PAGE_SIZE - 1)
+            .execute()
+        )
+        rows.extend(result.data or [])
+        if len(result.data or []) < _PAGE_SIZE:
+            return ChunkRecords(rows)
+
+
+async def apply_chunk_diff(document_id: str, records: ChunkRecords) -> int:
+    """Renumber moved chunks and delete stale ones. Returns the number deleted."""
+    stale = records.stale_ids()
+    if not stale and not records.reindex:
+        return 0
+    result = await supabase.rpc(
+        "apply_chunk_diff",
+        {
+            "p_document_id": document_id,
+            "p_reindex_ids": [chunk_id for chunk_id, _ in records.reindex],
+            "p_reindex_positions": [position for _, position in records.reindex],
+            "p_stale_ids": stale,
+        },
+    ).execute()
+    return result.data or 0
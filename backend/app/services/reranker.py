@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import math
+import re
+from collections import Counter
+from cachetools import LRUCache
+from app.config import settings
+from app.services.embedding_cache import normalize_text
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class Reranker:
+    """Scores (query, passage) pairs on CPU. Higher is more relevant."""
+
+    name = "base"
+    # Scores depend on the other candidates (e.g. BM25 IDF): not cacheable per chunk
+    pool_dependent = False
+
+    def score_many(self, requests: list[tuple[str, list[str]]]) -> list[list[float]]:
+        """Score several (query, passages) requests in one call."""
+        raise NotImplementedError
+
+
+class LexicalReranker(Reranker):
+    """BM25 over the candidate pool — no model, microseconds per passage.
+
+    IDF is computed across the candidates being reranked, which is what makes
+    rare exact terms (identifiers, error codes) count for more than filler.
+    """
+
+    name = "lexical"
+    pool_dependent = True
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def _score(self, query: str, passages: list[str]) -> list[float]:
+        query_terms = set(_tokenize(query))
+        if not query_terms or not passages:
+            return [0.0] * len(passages)
+        docs = [Counter(_tokenize(p)) for p in passages]
+        lengths = [sum(d.values()) for d in docs]
+        avg_len = (sum(lengths) / len(lengths)) or 1.0
+        n = len(docs)
+        idf = {}
+        for term in query_terms:
+            df = sum(1 for d in docs if term in d)
+            idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        scores = []
+        for doc, length in zip(docs, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_len)
+            scores.append(
+                sum(
+                    idf[t] * doc[t] * (self.k1 + 1) / (doc[t] + norm)
+                    for t in query_terms
+                    if t in doc
+                )
+            )
+        return scores
+
+    def score_many(self, requests):
+        return [self._score(query, passages) for query, passages in requests]
+
+
+class CrossEncoderReranker(Reranker):
+    """Local cross-encoder (sentence-transformers). Requires `pip install sentence-transformers`."""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise RuntimeError(
+                "RERANKER=cross-encoder requires the sentence-transformers package"
+            ) from e
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score_many(self, requests):
+        # One forward pass over every pair from every batched request
+        pairs = [(query, passage) for query, passages in requests for passage in passages]
+        flat = self.model.predict(pairs, batch_size=64).tolist() if pairs else []
+        results, offset = [], 0
+        for _, passages in requests:
+            results.append(flat[offset : offset + len(passages)])
+            offset += len(passages)
+        return results
+
+
+class RerankService:
+    """Reranks retrieval candidates, batching work across concurrent requests.
+
+    Requests arriving within `batch_window_ms` of each other are scored in a
+    single worker-thread call (so model inference never runs on the event
+    loop). Scores of pool-independent rerankers (the cross-encoder) are cached
+    per (reranker, query hash, chunk id); BM25 scores are only comparable
+    within one candidate pool, so the lexical reranker rescores every pool.
+    """
+
+    def __init__(self, reranker: Reranker, batch_window_ms: float, cache_size: int):
+        self.reranker = reranker
+        self.batch_window = batch_window_ms / 1000
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+        self._queue: list[tuple[str, list[str], asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+
+    async def _score(self, query: str, passages: list[str]) -> list[float]:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((query, passages, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        queue, self._queue, self._flush_task = self._queue, [], None
+        self.batches += 1
+        try:
+            results = await asyncio.to_thread(
+                self.reranker.score_many, [(q, p) for q, p, _ in queue]
+            )
+        except Exception as e:
+            for *_, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (*_, future), scores in zip(queue, results):
+            if not future.done():
+                future.set_result(scores)
+
+    async def rerank(self, query: str, results: list[dict], top_k: int) -> list[dict]:
+        """Rescore retrieval results (each must carry an "id") and return the best top_k."""
+        if not results:
+            return []
+        if self.reranker.pool_dependent:
+            scores = await self._score(query, [r["content"] for r in results])
+        else:
+            scores = await self._cached_scores(query, results)
+        ranked = sorted(zip(results, scores), key=lambda pair: pair[1], reverse=True)
+        return [{**r, "rerank_score": s} for r, s in ranked[:top_k]]
+
+    async def _cached_scores(self, query: str, results: list[dict]) -> list[float]:
+        query_hash = hashlib.sha256(normalize_text(query).encode("utf-8")).hexdigest()
+        keys = [(self.reranker.name, query_hash, r["id"]) for r in results]
+        scores = [self._cache.get(k) for k in keys]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        self.cache_hits += len(results) - len(missing)
+        self.cache_misses += len(missing)
+
+        if missing:
+            fresh = await self._score(query, [results[i]["content"] for i in missing])
+            for i, score in zip(missing, fresh):
+                scores[i] = score
+                self._cache[keys[i]] = score
+        return scores
+
+    def stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "reranker": self.reranker.name,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "batches": self.batches,
+        }
+
+
+_rerank_service: RerankService | None = None
+
+
+def get_rerank_service() -> RerankService:
+    """Lazily build the configured reranker (a cross-encoder loads a model)."""
+    global _rerank_service
+    if _rerank_service is None:
+        if settings.reranker == "cross-encoder":
+            reranker: Reranker = CrossEncoderReranker(settings.reranker_model)
+        else:
+            reranker = LexicalReranker()
+        _rerank_service = RerankService(
+            reranker,
+            batch_window_ms=settings.reranker_batch_window_ms,
+            cache_size=settings.reranker_cache_size,
+        )
+    return _rerank_service
+
+
+def rerank_stats() -> dict | None:
+    """Counters for the reranker, or None if it has not been used yet."""
+    return _rerank_service.stats() if _rerank_service else None
@@ -1,6 +1,10 @@
 from app.config import settings
 from app.database.supabase_client import supabase
-from app.services.embedding_service import generate_embedding
+from app.services.embedding_service import embedding_column, generate_embedding, pgvector_literal
+from app.services.embedding_cache import query_embedding_cache
+from app.services.local_vector_store import local_vector_store
+from app.services.reranker import get_rerank_service
+from app.services.vector_index import search_tuner
 
 
 async def search_documents(
@@ -8,43 +12,126 @@ async def search_documents(
     user_id: str,
     top_k: int | None = None,
     score_threshold: float | None = None,
+    mode: str | None = None,
+    rerank: bool | None = None,
+    document_ids: list[str] | None = None,
+    metadata: dict | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
 ) -> list[dict]:
-    """Search user's document chunks by vector similarity.
+    """Search user's document chunks by vector similarity, optionally fused with keyword search.
 
     Args:
         query: The search query text.
         user_id: UUID of the user (for RLS-like filtering).
         top_k: Max results to return. Defaults to settings.retrieval_top_k.
         score_threshold: Min similarity score (0-1). Defaults to settings.retrieval_score_threshold.
+            In hybrid mode it only prunes vector candidates; keyword hits always qualify.
+        mode: "hybrid" (keyword + vector with RRF) or "vector". Defaults to settings.retrieval_mode.
+        rerank: Over-fetch settings.retrieval_rerank_candidates and rerank down to top_k.
+            Defaults to settings.retrieval_rerank.
+        document_ids: Only search chunks of these documents.
+        metadata: Only chunks whose metadata contains this object (e.g. {"type": "invoice"},
+            {"tags": ["q3"]}); see 019_document_metadata.sql.
+        date_from: Only documents dated on or after this ISO date (YYYY-MM-DD).
+        date_to: Only documents dated on or before this ISO date.
 
     Returns:
-        List of dicts with keys: content, score, metadata, document_id, chunk_index
+        List of dicts with keys: id, content, score, metadata, document_id, chunk_index
+        (plus rerank_score when reranked)
     """
     top_k = top_k or settings.retrieval_top_k
     score_threshold = score_threshold or settings.retrieval_score_threshold
+    mode = mode or settings.retrieval_mode
+    rerank = settings.retrieval_rerank if rerank is None else rerank
+    match_count = max(top_k, settings.retrieval_rerank_candidates) if rerank else top_k
 
-    # Generate embedding for the query
-    query_embedding = await generate_embedding(query)
+    # Generate embedding for the query (cached; concurrent identical queries share one call)
+    query_embedding = await query_embedding_cache.get(query, generate_embedding)
 
-    # Use Supabase RPC for vector similarity search
-    # This requires a Postgres function — we'll create it in the migration
-    result = supabase.rpc(
-        "match_chunks",
-        {
-            "query_embedding": query_embedding,
-            "match_count": top_k,
-            "filter_user_id": user_id,
-            "min_similarity": score_threshold,
-        },
-    ).execute()
-
-    return [
+    fusion = {
+        "full_text_weight": settings.retrieval_full_text_weight,
+        "semantic_weight": settings.retrieval_semantic_weight,
+        "rrf_k": settings.retrieval_rrf_k,
+        "candidate_count": settings.retrieval_candidate_count,
+    }
+    score_key = "score" if mode == "hybrid" else "similarity"
+    # Applied in SQL before ranking, on indexed columns
+    filters = {
+        key: value
+        for key, value in {
+            "filter_document_ids": document_ids,
+            "filter_metadata": metadata,
+            "filter_date_from": date_from,
+            "filter_date_to": date_to,
+        }.items()
+        if value
+    }
+
+    if settings.vector_store != "supabase" and await local_vector_store.serves(user_id):
+        # Small tenant held in-process: exact search without a round trip
+        if mode == "hybrid":
+            rows = await local_vector_store.hybrid_search(
+                user_id, query, query_embedding, match_count, min_similarity=score_threshold,
+                filters=filters, **fusion
+            )
+        else:
+            rows = await local_vector_store.search(
+                user_id, query_embedding, match_count, score_threshold, filters=filters
+            )
+    else:
+        # ANN search depth for the recall target; small users are searched exactly
+        vector_count = max(match_count, settings.retrieval_candidate_count) if mode == "hybrid" else match_count
+        index_params = {
+            **await search_tuner.search_params(vector_count),
+            "exact_search_max_rows": settings.retrieval_exact_search_max_rows,
+            "embedding_column": embedding_column(),
+            "rescore_factor": settings.retrieval_rescore_factor,
+        }
+        # ~19 KB per query instead of ~34 KB of JSON floats
+        query_literal = pgvector_literal(query_embedding)
+        if mode == "hybrid":
+            # Keyword + vector candidates fused with RRF in a single round trip
+            result = await supabase.rpc(
+                "hybrid_match_chunks",
+                {
+                    "query_text": query,
+                    "query_embedding": query_literal,
+                    "match_count": match_count,
+                    "filter_user_id": user_id,
+                    "min_similarity": score_threshold,
+                    **fusion,
+                    **index_params,
+                    **filters,
+                },
+            ).execute()
+        else:
+            # Use Supabase RPC for vector similarity search
+            result = await supabase.rpc(
+                "match_chunks",
+                {
+                    "query_embedding": query_literal,
+                    "match_count": match_count,
+                    "filter_user_id": user_id,
+                    "min_similarity": score_threshold,
+                    **index_params,
+                    **filters,
+                },
+            ).execute()
+        rows = result.data or []
+
+    results = [
         {
+            "id": row["id"],
             "content": row["content"],
-            "score": row["similarity"],
+            "score": row[score_key],
             "metadata": row["metadata"],
             "document_id": row["document_id"],
             "chunk_index": row["chunk_index"],
         }
-        for row in (result.data or [])
+        for row in rows
     ]
+
+    if rerank:
+        results = await get_rerank_service().rerank(query, results, top_k)
+    return results
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from cachetools import TTLCache
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.broadcast import join_private_channel, sign
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_EVENT = "invalidate"
+
+
+class UserCache:
+    """In-process TTL cache for per-user values that rarely change.
+
+    Holds LLM settings per user and thread ownership (thread_id -> user_id;
+    only positive lookups are cached, so a missing thread is always re-checked).
+    Writes through this API invalidate locally and, when a channel is
+    connected, broadcast the invalidation to other API replicas. The TTL
+    bounds staleness for changes made anywhere else.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._settings: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._thread_owners: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._channel = None
+        self._tasks: set[asyncio.Task] = set()
+        self.counters = {
+            "settings": {"hits": 0, "misses": 0},
+            "threads": {"hits": 0, "misses": 0},
+        }
+
+    async def get_settings(self, user_id: str) -> dict:
+        """User's LLM settings ({"llm_base_url", "llm_model"}, values may be None), or {}."""
+        if user_id in self._settings:
+            self.counters["settings"]["hits"] += 1
+            return self._settings[user_id]
+        self.counters["settings"]["misses"] += 1
+        result = (
+            await supabase.table("user_settings")
+            .select("llm_base_url, llm_model")
+            .eq("user_id", user_id)
+            .execute()
+        )
+        value = result.data[0] if result.data else {}
+        self._settings[user_id] = value
+        return value
+
+    def set_settings(self, user_id: str, value: dict) -> None:
+        """Store freshly written settings and tell other replicas to drop theirs."""
+        self._settings[user_id] = {
+            "llm_base_url": value.get("llm_base_url"),
+            "llm_model": value.get("llm_model"),
+        }
+        self._broadcast("settings", user_id)
+
+    async def owns_thread(self, user_id: str, thread_id: str) -> bool:
+        if self._thread_owners.get(thread_id) == user_id:
+            self.counters["threads"]["hits"] += 1
+            return True
+        self.counters["threads"]["misses"] += 1
+        result = (
+            await supabase.table("threads")
+            .select("id")
+            .eq("id", thread_id)
+            .eq("user_id", user_id)
+            .execute()
+        )
+        if not result.data:
+            return False
+        self._thread_owners[thread_id] = user_id
+        return True
+
+    def invalidate_settings(self, user_id: str, broadcast: bool = True) -> None:
+        self._settings.pop(user_id, None)
+        if broadcast:
+            self._broadcast("settings", user_id)
+
+    def invalidate_thread(self, thread_id: str, broadcast: bool = True) -> None:
+        self._thread_owners.pop(thread_id, None)
+        if broadcast:
+            self._broadcast("thread", thread_id)
+
+    def _broadcast(self, kind: str, key: str) -> None:
+        if self._channel is None:
+            return
+
+        async def send() -> None:
+            try:
+                await self._channel.send_broadcast(INVALIDATE_EVENT, sign({"kind": kind, "key": key}))
+            except Exception:
+                logger.warning("Cache invalidation broadcast failed", exc_info=True)
+
+        task = asyncio.create_task(send())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _on_invalidate(self, payload: dict) -> None:
+        if payload.get("kind") == "settings":
+            self.invalidate_settings(payload.get("key"), broadcast=False)
+        elif payload.get("kind") == "thread":
+            self.invalidate_thread(payload.get("key"), broadcast=False)
+
+    async def connect(self, channel_name: str) -> None:
+        """Join the private Realtime channel shared by all replicas."""
+        self._channel = await join_private_channel(channel_name, INVALIDATE_EVENT, self._on_invalidate)
+
+    async def disconnect(self) -> None:
+        if self._channel is not None:
+            channel, self._channel = self._channel, None
+            await supabase.remove_channel(channel)
+
+    def stats(self) -> dict:
+        stats = {}
+        for name, counts in self.counters.items():
+            lookups = counts["hits"] + counts["misses"]
+            stats[name] = {
+                **counts,
+                "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+            }
+        stats["settings"]["entries"] = len(self._settings)
+        stats["threads"]["entries"] = len(self._thread_owners)
+        stats["shared_invalidation"] = self._channel is not None
+        return stats
+
+
+user_cache = UserCache(
+    max_entries=settings.user_cache_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
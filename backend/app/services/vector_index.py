@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Callable
+from app.config import settings
+from app.database.postgres import call_maintenance_function
+from app.database.supabase_client import supabase
+from app.services.embedding_service import embedding_column
+
+logger = logging.getLogger(__name__)
+
+# Until an index is calibrated, search depth is a multiple of a base depth
+# (sqrt(lists) probes for IVFFlat, pgvector's default ef_search of 40 for
+# HNSW): the first multiplier whose recall bound covers the target
+DEFAULT_DEPTH_MULTIPLIERS = ((0.90, 1), (0.95, 2), (0.98, 4), (0.99, 8))
+HNSW_BASE_EF_SEARCH = 40
+HNSW_MAX_EF_SEARCH = 1000  # pgvector's upper bound
+
+# Depths `calibrate` measures by default ("binary" is HNSW over binary-quantized vectors)
+CALIBRATION_DEPTHS = {
+    "ivfflat": (1, 2, 4, 8, 16, 32, 64, 128),
+    "hnsw": (20, 40, 80, 120, 200, 400),
+    "binary": (20, 40, 80, 120, 200, 400),
+}
+
+# exact_search_max_rows that makes nearest_chunks scan every row of a user
+EXACT = 1_000_000_000
+
+
+def search_depth(
+    status: dict | None,
+    calibration: list[tuple[int, float]],
+    recall_target: float,
+    match_count: int,
+) -> dict:
+    """Search parameters for match_chunks / hybrid_match_chunks.
+
+    Args:
+        status: chunk_index_status() result (None if unknown).
+        calibration: (search_depth, recall) pairs measured for the current index,
+            ascending by depth.
+        recall_target: Recall@k to reach.
+        match_count: Rows the search must return (HNSW can't return more than ef_search
+            without iterative scans).
+
+    Returns:
+        {"probes": int | None, "ef_search": int | None}; both None leaves the
+        database defaults (e.g. no ANN index).
+    """
+    method = (status or {}).get("method")
+    if method not in CALIBRATION_DEPTHS:
+        return {"probes": None, "ef_search": None}
+
+    if calibration:
+        depth = next((d for d, recall in calibration if recall >= recall_target), calibration[-1][0])
+    else:
+        multiplier = next(
+            (m for bound, m in DEFAULT_DEPTH_MULTIPLIERS if recall_target <= bound),
+            DEFAULT_DEPTH_MULTIPLIERS[-1][1],
+        )
+        if method == "ivfflat":
+            lists = status.get("lists") or 100
+            depth = min(lists, max(1, round(math.sqrt(lists))) * multiplier)
+        else:
+            depth = HNSW_BASE_EF_SEARCH * multiplier
+
+    if method == "ivfflat":
+        return {"probes": depth, "ef_search": None}
+    if method == "binary":
+        # The coarse pass returns match_count * RETRIEVAL_RESCORE_FACTOR rows
+        match_count *= max(1, settings.retrieval_rescore_factor)
+    return {"probes": None, "ef_search": min(HNSW_MAX_EF_SEARCH, max(depth, match_count))}
+
+
+class SearchTuner:
+    """Picks ivfflat.probes / hnsw.ef_search per query from a recall target.
+
+    The index method and build parameters (chunk_index_status) and the recall
+    curve recorded by `python -m app.manage_index calibrate` are re-read at
+    most every `refresh_seconds`, so searches don't pay an extra round trip.
+    If a refresh fails, the last known values keep being used.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._status: dict | None = None
+        self._calibration: list[tuple[int, float]] = []
+        self._loaded_at = -math.inf
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+        self.errors = 0
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return  # Another caller refreshed while we waited
+            try:
+                status = (await supabase.rpc("chunk_index_status", {}).execute()).data
+                calibration = []
+                if status and status.get("method"):
+                    result = (
+                        await supabase.table("vector_index_calibration")
+                        .select("search_depth, recall")
+                        .eq("method", status["method"])
+                        .order("search_depth")
+                        .execute()
+                    )
+                    calibration = [(row["search_depth"], row["recall"]) for row in result.data]
+            except Exception:
+                self.errors += 1
+                logger.warning("Could not read vector index status", exc_info=True)
+            else:
+                self._status, self._calibration = status, calibration
+                self.refreshes += 1
+            self._loaded_at = time.monotonic()
+
+    async def search_params(self, match_count: int, recall_target: float | None = None) -> dict:
+        """{"probes", "ef_search"} for a search returning `match_count` rows."""
+        if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            await self._refresh()
+        target = recall_target or settings.retrieval_recall_target
+        return search_depth(self._status, self._calibration, target, match_count)
+
+    def invalidate(self) -> None:
+        """Re-read status and calibration on the next search (after a rebuild)."""
+        self._loaded_at = -math.inf
+
+    def stats(self) -> dict:
+        return {
+            "method": (self._status or {}).get("method"),
+            "lists": (self._status or {}).get("lists"),
+            "calibrated_depths": len(self._calibration),
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+
+search_tuner = SearchTuner(refresh_seconds=settings.vector_index_refresh_seconds)
+
+
+async def index_status() -> dict:
+    return (await supabase.rpc("chunk_index_status", {}).execute()).data
+
+
+async def rebuild_index(
+    method: str,
+    lists: int | None = None,
+    m: int = 16,
+    ef_construction: int = 64,
+    maintenance_work_mem: str | None = None,
+    column: str | None = None,
+) -> dict:
+    """Drop and rebuild idx_chunks_embedding; returns the new index status.
+
+    `method` is "ivfflat", "hnsw" or "binary" (HNSW over binary-quantized
+    vectors, for RETRIEVAL_RESCORE_FACTOR > 0). IVFFlat `lists` defaults to
+    rows / 1000 per partition (sqrt(rows) past 1M). `column` defaults to the
+    one holding embeddings. Clears the recall calibration, which was measured
+    against the old index. Runs over DATABASE_URL (see app/database/postgres.py).
+    """
+    status = await call_maintenance_function(
+        "rebuild_chunk_index",
+        p_method=method,
+        p_lists=lists,
+        p_m=m,
+        p_ef_construction=ef_construction,
+        p_maintenance_work_mem=maintenance_work_mem,
+        p_column=column,
+    )
+    search_tuner.invalidate()
+    return status
+
+
+async def convert_embeddings(to: str, batch: int = 5000, progress: Callable[[int], None] | None = None) -> int:
+    """Move every stored embedding to `to` ("halfvec" or "vector") in batches; returns rows moved.
+
+    Rebuild the index afterwards: it covers only the column it was built on.
+    Runs over DATABASE_URL, one transaction per batch.
+    """
+    total = 0
+    while True:
+        moved = await call_maintenance_function("convert_chunk_embeddings", p_to=to, p_batch=batch)
+        if not moved:
+            return total
+        total += moved
+        if progress:
+            progress(total)
+
+
+async def storage_stats(document_id: str | None = None) -> dict:
+    """Average bytes per chunk for each embedding column, table and index totals."""
+    return (await supabase.rpc("chunk_storage_stats", {"p_document_id": document_id}).execute()).data
+
+
+async def partition_by_user(partitions: int) -> dict:
+    """Hash-partition chunks on user_id (one-off, locks the table while copying; over DATABASE_URL)."""
+    status = await call_maintenance_function("partition_chunks_by_user", p_partitions=partitions)
+    search_tuner.invalidate()
+    return status
+
+
+async def _match_ids(user_id: str, embedding, k: int, **params) -> list[str]:
+    result = await supabase.rpc(
+        "match_chunks",
+        {
+            "query_embedding": embedding,
+            "match_count": k,
+            "filter_user_id": user_id,
+            "min_similarity": -1,
+            "embedding_column": embedding_column(),
+            "rescore_factor": settings.retrieval_rescore_factor,
+            **params,
+        },
+    ).execute()
+    return [row["id"] for row in result.data]
+
+
+async def calibrate(
+    user_ids: list[str],
+    queries_per_user: int = 20,
+    k: int = 10,
+    depths: tuple[int, ...] | None = None,
+) -> list[dict]:
+    """Measure recall@k against exact search at each search depth and store the curve.
+
+    Stored chunk embeddings of `user_ids` serve as queries. Pick users of the
+    sizes that matter (large tenants always go through the index; tenants
+    under RETRIEVAL_EXACT_SEARCH_MAX_ROWS never do).
+
+    Returns:
+        [{"search_depth", "recall", "p50_ms"}] in depth order, as stored.
+    """
+    status = await index_status()
+    method = status.get("method")
+    if method not in CALIBRATION_DEPTHS:
+        raise RuntimeError("No IVFFlat or HNSW index on chunks to calibrate")
+    if method == "binary" and settings.retrieval_rescore_factor <= 0:
+        raise RuntimeError("A binary index is only searched with RETRIEVAL_RESCORE_FACTOR > 0")
+    depths = depths or CALIBRATION_DEPTHS[method]
+    param = "probes" if method == "ivfflat" else "ef_search"
+
+    cases = []  # (user_id, query embedding, exact top-k ids)
+    for user_id in user_ids:
+        sample = (
+            await supabase.table("chunks")
+            .select(embedding_column())
+            .eq("user_id", user_id)
+            .limit(queries_per_user)
+            .execute()
+        )
+        for row in sample.data:
+            embedding = row[embedding_column()]
+            truth = await _match_ids(user_id, embedding, k, exact_search_max_rows=EXACT)
+            cases.append((user_id, embedding, set(truth)))
+    if not cases:
+        raise RuntimeError("No chunks found for the given users")
+
+    curve = []
+    for depth in depths:
+        recalls, latencies = [], []
+        for user_id, embedding, truth in cases:
+            start = time.perf_counter()
+            ids = await _match_ids(user_id, embedding, k, **{param: depth})
+            latencies.append(time.perf_counter() - start)
+            recalls.append(len(truth.intersection(ids)) / len(truth) if truth else 1.0)
+        latencies.sort()
+        curve.append(
+            {
+                "method": method,
+                "search_depth": depth,
+                "recall": sum(recalls) / len(recalls),
+                "p50_ms": latencies[len(latencies) // 2] * 1000,
+            }
+        )
+
+    await supabase.table("vector_index_calibration").delete().eq("method", method).execute()
+    await supabase.table("vector_index_calibration").insert(curve).execute()
+    search_tuner.invalidate()
+    return curve
@@ -0,0 +1,44 @@
+"""Standalone ingestion worker.
+
+Run alongside the API (with INGESTION_WORKER_IN_API=false) to move document
+processing out of the web process:
+
+    python -m app.worker --concurrency 8
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+from app.config import settings
+from app.services.document_events import document_events
+from app.services.job_queue import create_worker_pool
+from app.services.parser_pool import parser_pool
+
+
+async def main(concurrency: int | None) -> None:
+    # Status/progress events reach API replicas' SSE streams only via the shared channel
+    if settings.document_events_channel:
+        await document_events.connect(settings.document_events_channel)
+    pool = create_worker_pool(concurrency=concurrency)
+    await pool.start()
+    logging.info("Ingestion worker %s started (concurrency=%d)", pool.worker_id, pool.concurrency)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logging.info("Shutting down, draining %d active jobs", pool.active_count)
+    await pool.stop()
+    parser_pool.shutdown()
+    await document_events.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion worker")
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(args.concurrency))
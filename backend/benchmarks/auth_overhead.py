@@ -0,0 +1,96 @@
+"""Per-request auth overhead: full JWT verification vs the verified-token cache.
+
+Calls `get_current_user` directly (no HTTP) with locally signed tokens, so
+only auth work is measured. ES256 uses a generated key injected as if
+prefetched from JWKS. Reports microseconds per call for full verification
+and for cache hits, then paces cached calls at --rps for a few seconds and
+reports the share of wall time spent in auth at that rate (the uncached
+share is extrapolated from the verify cost).
+
+Usage (from backend/):
+    python -m benchmarks.auth_overhead --rps 1000 --users 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault("LLM_API_KEY", "stub")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "stub")
+os.environ.setdefault("LANGSMITH_API_KEY", "stub")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-secret-benchmark-secret-32b")
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.config import settings
+from app.middleware import auth
+
+KID = "benchmark-key"
+
+
+def make_tokens(alg: str, count: int, private_key) -> list[str]:
+    exp = int(time.time()) + 3600
+    tokens = []
+    for _ in range(count):
+        claims = {"sub": str(uuid.uuid4()), "email": "bench@example.com", "aud": "authenticated", "exp": exp}
+        if alg == "ES256":
+            tokens.append(jwt.encode(claims, private_key, algorithm="ES256", headers={"kid": KID}))
+        else:
+            tokens.append(jwt.encode(claims, settings.supabase_jwt_secret, algorithm="HS256"))
+    return tokens
+
+
+async def per_call_us(tokens: list[str], rounds: int) -> float:
+    creds = [HTTPAuthorizationCredentials(scheme="Bearer", credentials=t) for t in tokens]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for c in creds:
+            await auth.get_current_user(c)
+    return (time.perf_counter() - start) / (rounds * len(creds)) * 1e6
+
+
+async def paced(tokens: list[str], rps: int, seconds: float) -> float:
+    """Share of wall time spent in auth while serving `rps` requests/second."""
+    creds = [HTTPAuthorizationCredentials(scheme="Bearer", credentials=t) for t in tokens]
+    total = int(rps * seconds)
+    in_auth, wall_start = 0.0, time.perf_counter()
+    for i in range(total):
+        start = time.perf_counter()
+        await auth.get_current_user(creds[i % len(creds)])
+        in_auth += time.perf_counter() - start
+        delay = wall_start + (i + 1) / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    return in_auth / (time.perf_counter() - wall_start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rps", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200, help="Distinct tokens in rotation")
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    auth._signing_keys[KID] = private_key.public_key()  # As if prefetched from JWKS
+
+    print(f"Share of one core spent in auth at {args.rps} rps")
+    print(f"{'alg':<6} {'verify':>10} {'cache hit':>10} {'uncached':>9} {'cached':>8}")
+    for alg in ("HS256", "ES256"):
+        tokens = make_tokens(alg, args.users, private_key)
+        auth._verified_tokens.clear()
+        verify_us = await per_call_us(tokens, rounds=1)  # Every call misses the cache
+        hit_us = await per_call_us(tokens, rounds=20)
+        share = await paced(tokens, args.rps, args.seconds)
+        uncached = verify_us * args.rps / 1e6
+        print(f"{alg:<6} {verify_us:>8.1f}us {hit_us:>8.1f}us {uncached * 100:>8.1f}% {share * 100:>7.2f}%")
+    print(auth.auth_stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""Bulk upload cost: one request per file vs the batch route, plain and zipped.
+
+Against the configured Supabase project (.env), uploads --files small
+markdown files for --user-id three ways by calling the route functions
+directly:
+
+    single  upload_document once per file, one after another (the old client loop)
+    batch   upload_documents_batch with every file in one request
+    zip     upload_documents_batch with one .zip holding every file
+
+Each mode uses its own filenames so none of them hits the re-upload path.
+Reports wall time, files/s and database round trips for registering the
+rows. Uploaded documents and objects are deleted afterwards; stop ingestion
+workers first if you don't want them to start embedding the files.
+
+Usage (from backend/):
+    python -m benchmarks.bulk_upload --user-id <uuid> --files 1000
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import time
+import zipfile
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.database.supabase_client import supabase
+from app.models.schemas import AuthenticatedUser
+from app.routers.documents import upload_document, upload_documents_batch
+
+MARKER = "bulk-upload-benchmark"
+WORDS = "latency vector chunk index embedding token stream batch query document".split()
+
+
+def synthetic_files(mode: str, count: int, size: int) -> list[tuple[str, bytes]]:
+    rng = random.Random(mode)
+    files = []
+    for i in range(count):
+        words = " ".join(rng.choice(WORDS) for _ in range(size // 8))
+        files.append((f"{MARKER}-{mode}-{i:05d}.md", f"# Note {i}\n\n{words}\n".encode()))
+    return files
+
+
+def upload_file(filename: str, data: bytes, content_type: str) -> UploadFile:
+    return UploadFile(
+        io.BytesIO(data),
+        size=len(data),
+        filename=filename,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+def zipped(files: list[tuple[str, bytes]]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in files:
+            archive.writestr(filename, data)
+    return buffer.getvalue()
+
+
+async def run(mode: str, files: list[tuple[str, bytes]], user: AuthenticatedUser) -> None:
+    start = time.perf_counter()
+    if mode == "single":
+        for filename, data in files:
+            await upload_document(upload_file(filename, data, "text/markdown"), user=user)
+        stored, skipped, round_trips = len(files), 0, 2 * len(files)  # select + insert per file
+    else:
+        if mode == "zip":
+            uploads = [upload_file(f"{MARKER}.zip", zipped(files), "application/zip")]
+        else:
+            uploads = [upload_file(filename, data, "text/markdown") for filename, data in files]
+        result = await upload_documents_batch(uploads, user=user)
+        stored, skipped, round_trips = len(result.documents), len(result.skipped), 1
+    elapsed = time.perf_counter() - start
+    print(
+        f"{mode:<7} {elapsed:7.2f}s {stored / elapsed:8.1f} files/s "
+        f"stored={stored:>5} skipped={skipped:>3} db round trips={round_trips}"
+    )
+
+
+async def cleanup(user_id: str) -> None:
+    while True:
+        result = (
+            await supabase.table("documents")
+            .select("id, storage_path")
+            .eq("user_id", user_id)
+            .like("filename", f"{MARKER}%")
+            .limit(1000)
+            .execute()
+        )
+        if not result.data:
+            return
+        await supabase.storage.from_("documents").remove([doc["storage_path"] for doc in result.data])
+        await supabase.table("documents").delete().in_("id", [doc["id"] for doc in result.data]).execute()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--file-bytes", type=int, default=2048)
+    parser.add_argument("--modes", default="single,batch,zip")
+    args = parser.parse_args()
+
+    user = AuthenticatedUser(id=args.user_id, email="bench@example.com")
+    print(f"{args.files} files of ~{args.file_bytes} bytes")
+    try:
+        for mode in args.modes.split(","):
+            await run(mode, synthetic_files(mode, args.files, args.file_bytes), user)
+    finally:
+        await cleanup(args.user_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""Streaming latency under concurrent chats while ingestion runs.
+
+Opens N concurrent `/api/chat` SSE streams against a running API and, at the
+same time, uploads documents so the ingestion pipeline is busy. Reports
+time-to-first-token and inter-token gap percentiles — a blocked event loop
+shows up directly as a fat p99 gap.
+
+Usage (from backend/):
+    python -m benchmarks.chat_concurrency --token $JWT --chats 100 \\
+        --upload ./sample.md --uploads 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import httpx
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def report(label: str, values: list[float]) -> None:
+    print(
+        f"{label:<22} n={len(values):<6} "
+        f"p50={percentile(values, 50) * 1000:8.1f}ms "
+        f"p95={percentile(values, 95) * 1000:8.1f}ms "
+        f"p99={percentile(values, 99) * 1000:8.1f}ms "
+        f"max={max(values, default=0) * 1000:8.1f}ms"
+    )
+
+
+async def run_chat(
+    client: httpx.AsyncClient,
+    message: str,
+    ttft: list[float],
+    gaps: list[float],
+    thread_ids: list[str],
+) -> None:
+    start = time.perf_counter()
+    last = None
+    event = None
+    async with client.stream("POST", "/api/chat", json={"message": message}) as res:
+        res.raise_for_status()
+        async for line in res.aiter_lines():
+            if line.startswith("event:"):
+                event = line.split(":", 1)[1].strip()
+            elif line.startswith("data:") and event == "thread_id":
+                thread_ids.append(json.loads(line[5:])["thread_id"])
+            elif line.startswith("data:") and event == "text_delta":
+                now = time.perf_counter()
+                if last is None:
+                    ttft.append(now - start)
+                else:
+                    gaps.append(now - last)
+                last = now
+
+
+async def run_uploads(client: httpx.AsyncClient, path: Path, count: int) -> None:
+    content = path.read_bytes()
+    mime = "text/markdown" if path.suffix == ".md" else "text/plain"
+
+    async def upload(i: int) -> None:
+        files = {"file": (f"bench-{i}-{path.name}", content, mime)}
+        res = await client.post("/api/documents", files=files)
+        res.raise_for_status()
+
+    await asyncio.gather(*(upload(i) for i in range(count)))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--token", default=os.environ.get("BENCH_TOKEN", ""))
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--message", default="Write three sentences about latency.")
+    parser.add_argument("--upload", type=Path, help="File to upload during the run")
+    parser.add_argument("--uploads", type=int, default=10)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    limits = httpx.Limits(max_connections=args.chats + args.uploads)
+    async with httpx.AsyncClient(
+        base_url=args.api_url, headers=headers, timeout=120, limits=limits
+    ) as client:
+        ttft: list[float] = []
+        gaps: list[float] = []
+        thread_ids: list[str] = []
+
+        tasks = [run_chat(client, args.message, ttft, gaps, thread_ids) for _ in range(args.chats)]
+        if args.upload:
+            tasks.append(run_uploads(client, args.upload, args.uploads))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        print(f"{args.chats} chats, {args.uploads if args.upload else 0} uploads in {elapsed:.2f}s ({len(errors)} errors)")
+        report("time to first token", ttft)
+        report("inter-token gap", gaps)
+
+        # Clean up benchmark threads
+        await asyncio.gather(
+            *(client.delete(f"/api/threads/{tid}") for tid in thread_ids),
+            return_exceptions=True,
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Pre-LLM latency of a chat turn: sequential PostgREST calls vs begin_chat_turn.
+
+Everything a turn does before the first LLM token is database work, so this
+is the part of time-to-first-token the RPC changes. Against the configured
+Supabase project (.env), it times the old sequence (ownership check, user
+message insert, full history select, settings select) and the single
+`begin_chat_turn` RPC on the same scratch thread, then deletes the thread.
+For end-to-end TTFT through a running API, use benchmarks.chat_concurrency.
+
+Usage (from backend/):
+    python -m benchmarks.chat_turn_latency --user-id <uuid> --turns 50 --history 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.config import settings
+from app.database.supabase_client import supabase
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label: str, values: list[float]) -> None:
+    print(
+        f"{label:<18} p50={percentile(values, 50) * 1000:7.1f}ms "
+        f"p95={percentile(values, 95) * 1000:7.1f}ms "
+        f"max={max(values) * 1000:7.1f}ms"
+    )
+
+
+async def sequential_turn(thread_id: str, user_id: str, message: str) -> None:
+    await supabase.table("threads").select("id").eq("id", thread_id).eq("user_id", user_id).execute()
+    await supabase.table("messages").insert(
+        {"thread_id": thread_id, "user_id": user_id, "role": "user", "content": message}
+    ).execute()
+    await (
+        supabase.table("messages")
+        .select("role, content")
+        .eq("thread_id", thread_id)
+        .eq("user_id", user_id)
+        .order("created_at")
+        .execute()
+    )
+    await (
+        supabase.table("user_settings")
+        .select("llm_base_url, llm_model")
+        .eq("user_id", user_id)
+        .execute()
+    )
+
+
+async def rpc_turn(thread_id: str, user_id: str, message: str) -> None:
+    await supabase.rpc(
+        "begin_chat_turn",
+        {
+            "p_user_id": user_id,
+            "p_thread_id": thread_id,
+            "p_message": message,
+            "p_title": "benchmark",
+            "p_history_limit": 2 * settings.chat_history_max_turns,
+        },
+    ).execute()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--history", type=int, default=200, help="Messages pre-seeded in the thread")
+    args = parser.parse_args()
+
+    thread = (
+        await supabase.table("threads")
+        .insert({"user_id": args.user_id, "title": "chat_turn_latency benchmark"})
+        .execute()
+    )
+    thread_id = thread.data[0]["id"]
+    try:
+        seed = [
+            {
+                "thread_id": thread_id,
+                "user_id": args.user_id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"seed message {i} " + "lorem ipsum " * 40,
+            }
+            for i in range(args.history)
+        ]
+        for start in range(0, len(seed), 500):
+            await supabase.table("messages").insert(seed[start : start + 500]).execute()
+
+        print(f"{args.turns} turns, thread pre-seeded with {args.history} messages")
+        for label, turn in (("sequential (4 RTT)", sequential_turn), ("begin_chat_turn", rpc_turn)):
+            latencies = []
+            for i in range(args.turns):
+                start = time.perf_counter()
+                await turn(thread_id, args.user_id, f"benchmark turn {i}")
+                latencies.append(time.perf_counter() - start)
+            report(label, latencies)
+    finally:
+        await supabase.table("threads").delete().eq("id", thread_id).execute()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""Chunker throughput and chunk quality on a synthetic markdown corpus.
+
+Compares the original fixed character windows (`chunk_text`) with the token
+and recursive chunkers: seconds and MB/s to chunk --mb of text, chunk count,
+mean/max tokens per chunk, and how many chunks end on a sentence boundary or
+start mid-word. The streaming row feeds the same text to `aiter_chunks` in
+1 MiB pieces, as ingestion does. With tiktoken installed, token counts are
+exact and the tiktoken-backed recursive chunker is included.
+
+Usage (from backend/):
+    python -m benchmarks.chunking --mb 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.chunker import (
+    ApproxTokenizer,
+    RecursiveChunker,
+    TiktokenTokenizer,
+    TokenChunker,
+)
+from app.services.ingestion_service import chunk_text
+
+WORDS = "latency vector chunk index embedding token stream batch query document".split()
+
+
+def synthetic_markdown(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, total = [], 0
+    while total < size_bytes:
+        roll = rng.random()
+        if roll < 0.03:
+            part = f"\n## {rng.choice(WORDS).title()} {rng.choice(WORDS)}\n\n"
+        elif roll < 0.15:
+            part = "\n\n"
+        else:
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 25)))
+            part = words.capitalize() + rng.choice(".?!") + " "
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def report(label: str, seconds: float, mb: float, chunks: list[str], text: str, counter) -> None:
+    tokens = [counter.count(c) for c in chunks[:20000]]
+    sentence_end = sum(c[-1] in ".?!" or c.startswith("#") for c in chunks) / len(chunks)
+    # A chunk starts mid-word if the character before it in the text is a letter
+    starts, mid_word, pos = 0, 0, 0
+    for c in chunks[:20000]:
+        i = text.find(c, pos)
+        if i > 0:
+            starts += 1
+            mid_word += text[i - 1].isalnum()
+            pos = i
+    print(
+        f"{label:<24} {seconds:>6.2f}s {mb / seconds:>8.1f}MB/s {len(chunks):>8} "
+        f"{sum(tokens) / len(tokens):>7.1f} {max(tokens):>6} "
+        f"{sentence_end * 100:>8.1f}% {mid_word / max(starts, 1) * 100:>8.1f}%"
+    )
+
+
+async def streamed(chunker, text: str, piece: int) -> list[str]:
+    async def pieces():
+        for i in range(0, len(text), piece):
+            yield text[i : i + piece]
+
+    return [c async for c in chunker.aiter_chunks(pieces())]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=50)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    text = synthetic_markdown(int(args.mb * 1024 * 1024))
+    approx = ApproxTokenizer()
+    try:
+        exact = TiktokenTokenizer("cl100k_base")
+    except RuntimeError:
+        exact = None
+    counter = exact or approx
+    print(f"{args.mb:.0f} MB markdown; token counts: {counter.name}")
+    print(
+        f"{'chunker':<24} {'time':>7} {'throughput':>10} {'chunks':>8} "
+        f"{'mean tok':>7} {'max':>6} {'sent. end':>9} {'mid-word':>9}"
+    )
+
+    start = time.perf_counter()
+    chunks = chunk_text(text, 1000, 200)
+    report("chunk_text 1000/200", time.perf_counter() - start, args.mb, chunks, text, counter)
+
+    chunkers = [
+        ("token", TokenChunker(approx, args.max_tokens, args.overlap_tokens)),
+        ("recursive (text)", RecursiveChunker(approx, args.max_tokens, args.overlap_tokens, "text/plain")),
+        ("recursive (markdown)", RecursiveChunker(approx, args.max_tokens, args.overlap_tokens, "text/markdown")),
+    ]
+    if exact:
+        chunkers.append(
+            ("recursive (md, tiktoken)", RecursiveChunker(exact, args.max_tokens, args.overlap_tokens, "text/markdown"))
+        )
+    for label, chunker in chunkers:
+        start = time.perf_counter()
+        chunks = list(chunker.iter_chunks(text))
+        report(label, time.perf_counter() - start, args.mb, chunks, text, counter)
+
+    chunker = chunkers[2][1]
+    start = time.perf_counter()
+    chunks = asyncio.run(streamed(chunker, text, 1024 * 1024))
+    report("recursive (md) streamed", time.perf_counter() - start, args.mb, chunks, text, counter)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Compact embedding storage: wire size, insert throughput, bytes per chunk and recall.
+
+Offline: encodes --rows synthetic 1536-dim embeddings as a JSON float list
+(what inserts and RPC arguments used to send), as pgvector_literal and as
+its halfvec form, reporting bytes per vector and encode throughput. With
+numpy installed it also reports recall@k against exact float32 search for
+float16 storage and for a binary-quantized (Hamming) coarse pass rescored
+exactly at each --rescore-factors.
+
+With --user-id, against the configured Supabase project (.env): inserts
+--rows synthetic chunks into each of the embedding and embedding_half
+columns (rows/s), reads chunk_storage_stats for each (bytes per chunk),
+and runs --queries match_chunks searches per column and rescore factor
+with the exact-search shortcut disabled, reporting recall@k against an
+exact scan and p50 latency. A binary index is only used by the rescored
+searches if one exists (`python -m app.manage_index rebuild --method
+binary`); otherwise they scan. The synthetic document is deleted afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.compact_embeddings --rows 2000
+    python -m benchmarks.compact_embeddings --user-id <uuid> --rows 5000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from postgrest.types import ReturnMethod
+
+from app.services.embedding_service import pgvector_literal
+from app.services.vector_index import EXACT
+
+MARKER = "compact-embeddings-benchmark"
+DIMS = 1536
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_embeddings(count: int, seed: int = 0, clusters: int = 64) -> list[list[float]]:
+    """Unit-length clustered vectors, like normalized provider embeddings."""
+    rng = random.Random(seed)
+    centroids = [[rng.gauss(0, 1) for _ in range(DIMS)] for _ in range(clusters)]
+    vectors = []
+    for _ in range(count):
+        c = rng.choice(centroids)
+        v = [x + rng.gauss(0, 0.6) for x in c]
+        norm = sum(x * x for x in v) ** 0.5
+        vectors.append([x / norm for x in v])
+    return vectors
+
+
+def wire_sizes(embeddings: list[list[float]]) -> None:
+    encoders = {
+        "json list": json.dumps,
+        "literal": pgvector_literal,
+        "halfvec literal": lambda e: pgvector_literal(e, half=True),
+    }
+    print(f"Wire encoding, {len(embeddings)} x {DIMS} dims")
+    for label, encode in encoders.items():
+        start = time.perf_counter()
+        encoded = [encode(e) for e in embeddings]
+        elapsed = time.perf_counter() - start
+        size = sum(len(s) for s in encoded) / len(encoded)
+        print(f"  {label:<16} {size / 1024:6.1f}KB/vector {len(embeddings) / elapsed:8.0f} vectors/s")
+
+
+def offline_recall(embeddings: list[list[float]], queries: int, k: int, factors: list[int]) -> None:
+    try:
+        import numpy as np
+    except ImportError:
+        print("numpy not installed: skipping offline recall")
+        return
+    matrix = np.array(embeddings, dtype=np.float32)
+    qs = matrix[np.random.default_rng(1).choice(len(matrix), queries, replace=False)]
+    qs = qs + np.random.default_rng(2).normal(scale=0.01, size=qs.shape).astype(np.float32)
+
+    def top(scores, n):
+        idx = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        return np.take_along_axis(idx, np.argsort(-np.take_along_axis(scores, idx, 1), 1), 1)
+
+    def recall(found):
+        return np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, found)])
+
+    truth = top(qs @ matrix.T, k)
+    half = matrix.astype(np.float16).astype(np.float32)
+    print(f"Offline recall@{k}, {len(matrix)} rows, {queries} queries")
+    print(f"  {'float16':<16} recall={recall(top(qs @ half.T, k)):.3f} bytes/vector={half.shape[1] * 2}")
+
+    bits, query_bits = matrix > 0, qs > 0
+    hamming = (query_bits[:, None, :] != bits[None, :, :]).sum(axis=2)
+    print(f"  {'binary only':<16} recall={recall(top(-hamming, k)):.3f} bytes/vector={DIMS // 8}")
+    for factor in factors:
+        candidates = top(-hamming, min(len(matrix), k * factor))
+        rescored = np.einsum("qd,qcd->qc", qs, matrix[candidates])
+        found = np.take_along_axis(candidates, top(rescored, k), 1)
+        print(f"  {'binary x' + str(factor):<16} recall={recall(found):.3f}")
+
+
+async def database(user_id: str, embeddings: list[list[float]], queries: int, k: int, factors: list[int]) -> None:
+    from app.database.supabase_client import supabase
+
+    document = await supabase.table("documents").insert(
+        {
+            "user_id": user_id,
+            "filename": f"{MARKER}.txt",
+            "storage_path": f"{user_id}/{MARKER}.txt",
+            "mime_type": "text/plain",
+            "file_size": 0,
+            "status": "completed",  # Never claimed by ingestion workers
+        }
+    ).execute()
+    document_id = document.data[0]["id"]
+    query_literals = [pgvector_literal(e) for e in embeddings[:queries]]
+
+    async def match(q: str, **params) -> tuple[list[str], float]:
+        start = time.perf_counter()
+        result = await supabase.rpc(
+            "match_chunks",
+            {"query_embedding": q, "match_count": k, "filter_user_id": user_id, "min_similarity": -1, **params},
+        ).execute()
+        return [row["id"] for row in result.data], time.perf_counter() - start
+
+    try:
+        for column in ("embedding", "embedding_half"):
+            await supabase.table("chunks").delete().eq("document_id", document_id).execute()
+            half = column == "embedding_half"
+            start = time.perf_counter()
+            for offset in range(0, len(embeddings), 500):
+                rows = [
+                    {
+                        "document_id": document_id,
+                        "user_id": user_id,
+                        "content": f"{MARKER} {i}",
+                        "chunk_index": i,
+                        column: pgvector_literal(embeddings[i], half),
+                    }
+                    for i in range(offset, min(len(embeddings), offset + 500))
+                ]
+                await supabase.table("chunks").insert(rows, returning=ReturnMethod.minimal).execute()
+            elapsed = time.perf_counter() - start
+            stats = (await supabase.rpc("chunk_storage_stats", {"p_document_id": document_id}).execute()).data
+            print(
+                f"{column}: {len(embeddings) / elapsed:.0f} rows/s inserted, "
+                f"{stats[column + '_bytes']:.0f} embedding bytes/chunk, {stats['row_bytes']:.0f} row bytes/chunk"
+            )
+
+            truth = [
+                set((await match(q, embedding_column=column, exact_search_max_rows=EXACT))[0])
+                for q in query_literals
+            ]
+            for factor in [0, *factors]:
+                recalls, latencies = [], []
+                for q, expected in zip(query_literals, truth):
+                    ids, elapsed = await match(q, embedding_column=column, rescore_factor=factor)
+                    latencies.append(elapsed)
+                    recalls.append(len(expected.intersection(ids)) / len(expected) if expected else 1.0)
+                label = f"rescore x{factor}" if factor else "index"
+                print(
+                    f"  {label:<12} recall@{k}={sum(recalls) / len(recalls):6.3f} "
+                    f"p50={percentile(latencies, 50) * 1000:7.1f}ms"
+                )
+    finally:
+        await supabase.table("documents").delete().eq("id", document_id).execute()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factors", default="2,4,8")
+    parser.add_argument("--user-id", default=None, help="Also measure storage and recall in Supabase")
+    args = parser.parse_args()
+
+    factors = [int(f) for f in args.rescore_factors.split(",")]
+    embeddings = synthetic_embeddings(args.rows)
+    wire_sizes(embeddings)
+    offline_recall(embeddings, args.queries, args.k, factors)
+    if args.user_id:
+        await database(args.user_id, embeddings, args.queries, args.k, factors)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
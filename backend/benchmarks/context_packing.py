@@ -0,0 +1,144 @@
+"""Prompt size of search results sent to the model: raw rows vs the context packer.
+
+Offline: chunks a synthetic document (or --file) with the configured
+chunker, plus a verbatim copy of it as a second document, and simulates
+--trials searches whose --top-k hits cluster around a few spots, as real
+hits on one topic do. For each result set it compares the old tool result
+(json.dumps of every row) with pack_results at --budget: estimated tokens,
+passages after merging and deduplication, and packing time.
+
+With --user-id and --query, the same comparison runs on real
+search_documents results from the configured Supabase project (.env).
+Adding --llm also times a tool-free completion over each variant (max 1
+output token, so the time is mostly prompt processing).
+
+Usage (from backend/):
+    python -m benchmarks.context_packing --top-k 10 --budget 3000
+    python -m benchmarks.context_packing --user-id <uuid> --query "refund policy" --llm
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.config import settings
+from app.services.chunker import get_chunker
+from app.services.context_packer import pack_results
+from app.services.embedding_service import estimate_tokens
+
+WORDS = (
+    "the a of to and in policy refund customer order shipping invoice payment account "
+    "support request days within after before contact team update version release"
+).split()
+
+
+def synthetic_text(rng: random.Random, paragraphs: int = 200) -> str:
+    def sentence() -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+    return "\n\n".join(
+        " ".join(sentence() for _ in range(rng.randint(3, 8))) for _ in range(paragraphs)
+    )
+
+
+def simulated_hits(rng: random.Random, chunks: list[str], top_k: int) -> list[dict]:
+    """top_k hits around 3 spots of the document, some on its verbatim copy."""
+    spots = [rng.randrange(len(chunks)) for _ in range(3)]
+    picked: set[tuple[str, int]] = set()
+    while len(picked) < min(top_k, 2 * len(chunks)):
+        index = min(len(chunks) - 1, max(0, rng.choice(spots) + rng.randint(-2, 2)))
+        picked.add(("doc-copy" if rng.random() < 0.2 else "doc", index))
+    hits = list(picked)
+    rng.shuffle(hits)
+    return [
+        {
+            "id": f"{document_id}-{index}",
+            "content": chunks[index],
+            "score": 1.0 - rank / top_k,
+            "metadata": {"filename": f"{document_id}.md", "title": "Synthetic handbook"},
+            "document_id": document_id,
+            "chunk_index": index,
+        }
+        for rank, (document_id, index) in enumerate(hits)
+    ]
+
+
+def compare(results: list[dict], budget: int) -> tuple[int, int, int, float]:
+    raw = json.dumps({"results": results})
+    start = time.perf_counter()
+    packed = pack_results(results, budget)
+    elapsed = time.perf_counter() - start
+    encoded = json.dumps(packed, ensure_ascii=False)
+    return estimate_tokens(raw), estimate_tokens(encoded), len(packed["results"]), elapsed
+
+
+async def time_completion(content: str) -> float:
+    from app.services.llm_service import complete_chat
+
+    start = time.perf_counter()
+    await complete_chat(
+        [
+            {"role": "system", "content": "Reply with one word."},
+            {"role": "user", "content": f"Search results:\n{content}\n\nAre these relevant?"},
+        ],
+        max_tokens=1,
+    )
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=None, help="Document to chunk instead of synthetic text")
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=settings.context_token_budget)
+    parser.add_argument("--user-id", default=None)
+    parser.add_argument("--query", default=None)
+    parser.add_argument("--llm", action="store_true", help="Also time a completion over each variant")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_text(rng)
+    chunks = list(get_chunker("text/markdown").iter_chunks(text))
+    print(f"{len(chunks)} chunks ({settings.chunker} chunker), top_k={args.top_k}, budget={args.budget}")
+
+    raw_tokens, packed_tokens, passages, times = [], [], [], []
+    for _ in range(args.trials):
+        raw, packed, count, elapsed = compare(simulated_hits(rng, chunks, args.top_k), args.budget)
+        raw_tokens.append(raw)
+        packed_tokens.append(packed)
+        passages.append(count)
+        times.append(elapsed)
+    print(
+        f"  simulated     raw={sum(raw_tokens) / len(raw_tokens):7.0f} tokens "
+        f"packed={sum(packed_tokens) / len(packed_tokens):7.0f} tokens "
+        f"({1 - sum(packed_tokens) / sum(raw_tokens):.0%} fewer) "
+        f"passages={sum(passages) / len(passages):4.1f}/{args.top_k} "
+        f"pack={sum(times) / len(times) * 1000:.2f}ms"
+    )
+
+    if args.user_id and args.query:
+        from app.services.retrieval_service import search_documents
+
+        results = await search_documents(args.query, args.user_id, top_k=args.top_k)
+        raw, packed, count, elapsed = compare(results, args.budget)
+        print(
+            f"  search        raw={raw:7d} tokens packed={packed:7d} tokens "
+            f"passages={count}/{len(results)} pack={elapsed * 1000:.2f}ms"
+        )
+        if args.llm:
+            raw_content = json.dumps({"results": results})
+            packed_content = json.dumps(pack_results(results, args.budget), ensure_ascii=False)
+            for label, content in (("raw", raw_content), ("packed", packed_content)):
+                latencies = sorted([await time_completion(content) for _ in range(5)])
+                print(f"  llm {label:<9} p50={latencies[2] * 1000:7.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
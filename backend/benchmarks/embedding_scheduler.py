@@ -0,0 +1,124 @@
+"""Embedding micro-batching: provider requests and latency under concurrent load.
+
+Fires `--callers` concurrent `generate_embeddings` calls (a mix of single
+query texts and small chunk batches) at a stub provider, once per batching
+window, and reports provider requests, mean batch size, 429s and per-call
+latency. The "direct" row sends one provider request per call (the old
+behaviour, with the openai client's own retries), for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.embedding_scheduler --callers 500 --windows 0,2,5,10 --max-rps 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.stub_embeddings import STUB_PORT, configure_env, start_stub_server, stub_stats
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Direct:
+    """One provider request per call, as before the scheduler."""
+
+    def __init__(self):
+        from openai import AsyncOpenAI
+        from app.config import settings
+
+        self.client = AsyncOpenAI(
+            base_url=settings.embedding_base_url, api_key=settings.embedding_api_key
+        )
+        self.settings = settings
+        self.requests = 0
+        self.texts = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        response = await self.client.embeddings.create(
+            model=self.settings.embedding_model,
+            input=texts,
+            dimensions=self.settings.embedding_dimensions,
+        )
+        self.requests += 1
+        self.texts += len(texts)
+        return [item.embedding for item in response.data]
+
+    def stats(self) -> dict:
+        return {"avg_batch_size": self.texts / self.requests if self.requests else 0.0}
+
+
+async def run(scheduler, callers: int, seed: int) -> tuple[float, list[float], int]:
+    rng = random.Random(seed)
+    workloads = [
+        [f"caller {i} text {j} {rng.random()}" for j in range(rng.choice((1, 1, 1, 8, 32)))]
+        for i in range(callers)
+    ]
+    latencies: list[float] = []
+    failed = 0
+
+    async def call(texts: list[str]) -> None:
+        await asyncio.sleep(rng.random() * 0.2)  # Spread arrivals over 200 ms
+        nonlocal failed
+        start = time.perf_counter()
+        try:
+            await scheduler.embed(texts)
+        except Exception:
+            failed += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(texts) for texts in workloads))
+    return time.perf_counter() - start, latencies or [0.0], failed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=500)
+    parser.add_argument("--windows", default="0,2,5,10", help="Comma-separated window sizes (ms)")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--max-rps", type=float, default=0, help="Stub returns 429 above this rate")
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    args = parser.parse_args()
+
+    configure_env(args.port)
+    server = start_stub_server(args.port, args.latency_ms, args.max_rps)
+
+    from app.config import settings
+    from app.services.embedding_service import EmbeddingScheduler, generate_embeddings
+
+    await generate_embeddings(["warm-up"])  # Build the stub's vector pool outside the timings
+
+    print(f"{args.callers} callers, provider latency {args.latency_ms:.0f}ms, max rps {args.max_rps or '-'}")
+    print(f"{'window':>8} {'requests':>9} {'batch':>7} {'429s':>6} {'failed':>7} {'p50':>9} {'p95':>9} {'wall':>8}")
+    try:
+        for window in [None] + [float(w) for w in args.windows.split(",")]:
+            scheduler = Direct() if window is None else EmbeddingScheduler(
+                window_ms=window,
+                max_batch_size=settings.embedding_max_batch_size,
+                max_batch_tokens=settings.embedding_max_batch_tokens,
+                max_concurrent_requests=settings.embedding_max_concurrent_requests,
+                tokens_per_minute=settings.embedding_tokens_per_minute,
+                max_retries=settings.embedding_max_retries,
+            )
+            before = stub_stats(args.port)
+            wall, latencies, failed = await run(scheduler, args.callers, seed=0)
+            after = stub_stats(args.port)
+            stats = scheduler.stats()
+            label = "direct" if window is None else f"{window:.0f}ms"
+            print(
+                f"{label:>8} {after['requests'] - before['requests']:>9} "
+                f"{stats['avg_batch_size']:>7.1f} {after['rate_limited'] - before['rate_limited']:>6} {failed:>7} "
+                f"{percentile(latencies, 50) * 1000:>7.1f}ms {percentile(latencies, 95) * 1000:>7.1f}ms "
+                f"{wall:>7.2f}s"
+            )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
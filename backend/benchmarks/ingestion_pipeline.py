@@ -0,0 +1,92 @@
+"""Ingestion pipeline throughput and peak memory against a stub embedding server.
+
+Runs `embed_chunks_pipeline` over synthetic documents with a no-op store, so
+only chunking, embedding I/O and batch hand-off are measured. Compare
+`--concurrency 1` (the old one-batch-at-a-time behaviour) with higher values,
+and `--passes 2` to see re-ingestion served from the embedding cache.
+
+Usage (from backend/):
+    python -m benchmarks.ingestion_pipeline --docs 20 --doc-mb 5 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import random
+import resource
+import time
+
+from benchmarks.stub_embeddings import STUB_PORT, configure_env, start_stub_server, stub_stats
+
+WORDS = "latency vector chunk index embedding token stream batch query document".split()
+
+
+def synthetic_text(size_bytes: int, seed: int) -> str:
+    rng = random.Random(seed)
+    words = []
+    total = 0
+    while total < size_bytes:
+        word = rng.choice(WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--doc-mb", type=float, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--passes", type=int, default=1, help="Ingest the corpus this many times")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    configure_env(args.port)
+    server = start_stub_server(args.port, args.latency_ms)
+
+    from app.config import settings
+    from app.services.embedding_cache import embedding_cache
+    from app.services.ingestion_service import embed_chunks_pipeline, iter_chunks
+
+    async def discard(batch, embeddings):
+        pass
+
+    try:
+        baseline_rss = peak_rss_mb()
+        for n in range(args.passes):
+            requests_before = stub_stats(args.port)["requests"]
+            start = time.perf_counter()
+            total_chunks = 0
+            for i in range(args.docs):
+                text = synthetic_text(int(args.doc_mb * 1024 * 1024), seed=i)
+                total_chunks += await embed_chunks_pipeline(
+                    enumerate(iter_chunks(text, settings.chunk_size, settings.chunk_overlap)),
+                    on_batch=discard,
+                    batch_size=args.batch_size,
+                    concurrency=args.concurrency,
+                    use_cache=not args.no_cache,
+                )
+                del text
+            elapsed = time.perf_counter() - start
+
+            print(f"pass {n + 1}: concurrency={args.concurrency} batch_size={args.batch_size} latency={args.latency_ms}ms")
+            print(f"  docs:          {args.docs} x {args.doc_mb} MB ({total_chunks} chunks)")
+            print(f"  docs/sec:      {args.docs / elapsed:.2f}")
+            print(f"  chunks/sec:    {total_chunks / elapsed:.0f}")
+            print(f"  peak RSS:      {peak_rss_mb():.0f} MB (baseline {baseline_rss:.0f} MB)")
+            print(f"  provider reqs: {stub_stats(args.port)['requests'] - requests_before}")
+        if not args.no_cache:
+            print(f"embedding cache: {embedding_cache.stats()}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
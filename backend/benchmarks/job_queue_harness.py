@@ -0,0 +1,152 @@
+"""Local harness for the ingestion job queue (no database required).
+
+Drives IngestionWorkerPool against InMemoryJobStore with a fake handler and
+checks the queue's guarantees:
+
+  * fairness   — a small user's jobs are not starved behind a bulk upload
+  * retries    — transient failures are retried with backoff, then succeed
+  * give-up    — permanently failing jobs end up 'failed' after max attempts
+  * recovery   — jobs orphaned by a crashed worker are re-run on restart
+  * poison     — a job whose worker dies on every attempt ends up 'failed'
+
+Usage (from backend/):
+    python -m benchmarks.job_queue_harness
+"""
+
+import asyncio
+import logging
+import random
+import time
+
+from benchmarks.stub_embeddings import configure_env
+
+configure_env()
+
+from app.services.job_queue import IngestionWorkerPool, InMemoryJobStore  # noqa: E402
+
+
+def check(label: str, ok: bool, detail: str = "") -> bool:
+    print(f"[{'ok' if ok else 'FAIL'}] {label}{f' — {detail}' if detail else ''}")
+    return ok
+
+
+async def fairness_and_retries() -> bool:
+    store = InMemoryJobStore()
+    for i in range(200):
+        store.enqueue(f"bulk-{i}", "bulk-user")
+    for i in range(5):
+        store.enqueue(f"small-{i}", "small-user")
+    for i in range(3):
+        store.enqueue(f"flaky-{i}", "flaky-user")
+    store.enqueue("broken-0", "flaky-user")
+
+    finished: list[str] = []
+    flaky_attempts: dict[str, int] = {}
+
+    async def handler(document_id: str, user_id: str) -> dict:
+        await asyncio.sleep(random.uniform(0.001, 0.005))
+        if document_id.startswith("flaky"):
+            flaky_attempts[document_id] = flaky_attempts.get(document_id, 0) + 1
+            if flaky_attempts[document_id] < 2:
+                raise RuntimeError("transient provider error")
+        if document_id.startswith("broken"):
+            raise RuntimeError("permanent parse error")
+        finished.append(document_id)
+        return {"chunk_count": 1}
+
+    pool = IngestionWorkerPool(
+        store, handler, concurrency=8, worker_id="w1", lease_seconds=30,
+        heartbeat_seconds=5, max_attempts=3, backoff_seconds=0.01, poll_interval=0.01,
+    )
+    start = time.perf_counter()
+    await pool.start()
+    while any(j["status"] in ("pending", "processing") for j in store.jobs.values()):
+        await asyncio.sleep(0.01)
+    await pool.stop()
+    elapsed = time.perf_counter() - start
+
+    small_positions = [finished.index(f"small-{i}") for i in range(5)]
+    statuses = {j["id"]: j["status"] for j in store.jobs.values()}
+    ok = check("all jobs drained", len(finished) == 208, f"{len(finished)} completed in {elapsed:.2f}s")
+    ok &= check("fairness", max(small_positions) < 40, f"small user's jobs finished at positions {small_positions} of {len(finished)}")
+    ok &= check("retries", all(flaky_attempts[f"flaky-{i}"] == 2 for i in range(3)), f"flaky attempts {flaky_attempts}")
+    ok &= check("give-up", statuses["broken-0"] == "failed" and store.jobs["broken-0"]["attempts"] == 3)
+    return ok
+
+
+def crash(pool: IngestionWorkerPool) -> None:
+    """Kill a pool as a dead process would: its tasks die without completing."""
+    pool._stopping = True
+    pool._runner.cancel()
+    for task in list(pool._active.values()):
+        task.cancel()
+
+
+async def crash_recovery() -> bool:
+    store = InMemoryJobStore()
+    for i in range(20):
+        store.enqueue(f"doc-{i}", f"user-{i % 3}")
+
+    async def slow_handler(document_id: str, user_id: str) -> dict:
+        await asyncio.sleep(10)
+        return {"chunk_count": 1}
+
+    # Worker A claims jobs, then "crashes": its tasks die without completing
+    crashed = IngestionWorkerPool(
+        store, slow_handler, concurrency=5, worker_id="crashed", lease_seconds=0.2,
+        heartbeat_seconds=60, poll_interval=0.01,
+    )
+    await crashed.start()
+    await asyncio.sleep(0.05)
+    crash(crashed)
+    orphaned = sum(1 for j in store.jobs.values() if j["status"] == "processing")
+    await asyncio.sleep(0.25)  # Let the dead worker's leases expire
+
+    async def fast_handler(document_id: str, user_id: str) -> dict:
+        return {"chunk_count": 1}
+
+    restarted = IngestionWorkerPool(store, fast_handler, concurrency=5, worker_id="restarted", poll_interval=0.01)
+    await restarted.start()
+    while any(j["status"] != "completed" for j in store.jobs.values()):
+        await asyncio.sleep(0.01)
+    await restarted.stop()
+    return check("recovery", orphaned == 5, f"{orphaned} orphaned jobs re-run after restart, 20/20 completed")
+
+
+async def poison_job() -> bool:
+    store = InMemoryJobStore()
+    store.enqueue("poison-0", "user-0")
+
+    async def killing_handler(document_id: str, user_id: str) -> dict:
+        await asyncio.sleep(10)  # Crashed (OOM, SIGKILL) before finishing
+        return {"chunk_count": 1}
+
+    for attempt in range(3):
+        pool = IngestionWorkerPool(
+            store, killing_handler, concurrency=1, worker_id=f"w{attempt}", lease_seconds=0.05,
+            heartbeat_seconds=60, max_attempts=3, poll_interval=0.01,
+        )
+        await pool.start()
+        await asyncio.sleep(0.02)
+        crash(pool)
+        await asyncio.sleep(0.06)  # Lease expires
+
+    claimed = await store.claim("w-last", 1, 30, 3)
+    job = store.jobs["poison-0"]
+    return check(
+        "poison",
+        [j["status"] for j in claimed] == ["failed"] and job["status"] == "failed",
+        f"failed after {job['attempts']} attempts instead of being reclaimed",
+    )
+
+
+async def main() -> None:
+    logging.getLogger("app.services.job_queue").setLevel(logging.ERROR)
+    ok = await fairness_and_retries()
+    ok &= await crash_recovery()
+    ok &= await poison_job()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""Thread listing cost for a heavy user: full select vs keyset pages.
+
+Against the configured Supabase project (.env), seeds --threads scratch
+threads for --user-id, then times the old listing (every row, every column)
+and the keyset-paginated `list_threads` route for the first page and for a
+page --depth pages in. Payload size is the serialized JSON response body.
+Seeded threads are deleted afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.list_pagination --user-id <uuid> --threads 10000
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import Response
+from postgrest.types import ReturnMethod
+from pydantic import TypeAdapter
+
+from app.database.supabase_client import supabase
+from app.models.schemas import AuthenticatedUser, ThreadResponse
+from app.routers.threads import list_threads
+
+MARKER = "list-pagination-benchmark"
+THREADS = TypeAdapter(list[ThreadResponse])
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label: str, times: list[float], rows: int, size: int) -> None:
+    print(
+        f"{label:<16} p50={percentile(times, 50) * 1000:7.1f}ms "
+        f"p95={percentile(times, 95) * 1000:7.1f}ms "
+        f"rows={rows:>6} payload={size / 1024:9.1f}KB"
+    )
+
+
+async def seed(user_id: str, count: int) -> None:
+    for start in range(0, count, 1000):
+        end = min(count, start + 1000)
+        rows = [{"user_id": user_id, "title": f"{MARKER} {i}"} for i in range(start, end)]
+        await supabase.table("threads").insert(rows, returning=ReturnMethod.minimal).execute()
+
+
+async def full_listing(user_id: str) -> tuple[int, int]:
+    """The pre-pagination route: select * and serialize everything."""
+    result = (
+        await supabase.table("threads")
+        .select("*")
+        .eq("user_id", user_id)
+        .order("updated_at", desc=True)
+        .execute()
+    )
+    return len(result.data), len(THREADS.dump_json(THREADS.validate_python(result.data)))
+
+
+async def keyset_listing(user: AuthenticatedUser, limit: int, depth: int) -> tuple[float, int, int]:
+    """Follow X-Next-Cursor `depth` times, then fetch and serialize one page."""
+    cursor = None
+    for _ in range(depth):
+        response = Response()
+        await list_threads(response, limit=limit, cursor=cursor, user=user)
+        cursor = response.headers.get("X-Next-Cursor")
+    start = time.perf_counter()
+    rows = await list_threads(Response(), limit=limit, cursor=cursor, user=user)
+    size = len(THREADS.dump_json(THREADS.validate_python(rows)))
+    return time.perf_counter() - start, len(rows), size
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=20, help="Pages in for the deep-page row")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    user = AuthenticatedUser(id=args.user_id, email="bench@example.com")
+    await seed(args.user_id, args.threads)
+    try:
+        times = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            rows, size = await full_listing(args.user_id)
+            times.append(time.perf_counter() - start)
+        report("full select *", times, rows, size)
+
+        for label, depth in (("keyset page 1", 0), (f"keyset page {args.depth + 1}", args.depth)):
+            times = []
+            for _ in range(args.runs):
+                elapsed, rows, size = await keyset_listing(user, args.limit, depth)
+                times.append(elapsed)
+            report(label, times, rows, size)
+    finally:
+        await supabase.table("threads").delete().eq("user_id", args.user_id).like(
+            "title", f"{MARKER}%"
+        ).execute()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""In-process exact search (LocalVectorStore) latency and memory per tenant size.
+
+Offline: builds tenants of --sizes synthetic clustered chunks in "local"
+mode and times --queries vector and hybrid searches for the float32 and
+int8 matrices, reporting p50/p95, matrix bytes and the int8 store's
+recall@k against float32. With --user-id, also times the same vector search
+through match_chunks against the configured Supabase project (.env) for
+comparison with a database round trip. Requires numpy.
+
+Usage (from backend/):
+    python -m benchmarks.local_vector_store --sizes 1000,5000,20000
+    python -m benchmarks.local_vector_store --user-id <uuid>
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.config import settings
+from app.services.local_vector_store import LocalVectorStore, _numpy
+
+WORDS = "latency vector chunk index embedding token stream batch query document".split()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_rows(np, count: int, dims: int, seed: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(64, dims)).astype("float32")
+    vectors = centroids[rng.integers(0, 64, count)] + rng.normal(scale=0.6, size=(count, dims)).astype("float32")
+    return [
+        {
+            "id": f"chunk-{i}",
+            "document_id": f"doc-{i // 50}",
+            "chunk_index": i % 50,
+            "content": " ".join(WORDS[j] for j in rng.integers(0, len(WORDS), 40)),
+            "metadata": {},
+            "embedding": vectors[i],
+        }
+        for i in range(count)
+    ]
+
+
+async def timed(fn, queries) -> tuple[list[float], list[list[str]]]:
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        rows = await fn(q)
+        latencies.append(time.perf_counter() - start)
+        results.append([row["id"] for row in rows])
+    return latencies, results
+
+
+def report(label: str, latencies: list[float], extra: str = "") -> None:
+    print(
+        f"  {label:<16} p50={percentile(latencies, 50) * 1000:7.2f}ms "
+        f"p95={percentile(latencies, 95) * 1000:7.2f}ms {extra}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,5000,20000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--user-id", default=None, help="Also time match_chunks for this user")
+    args = parser.parse_args()
+
+    np = _numpy()
+    dims = settings.embedding_dimensions
+    rng = np.random.default_rng(1)
+    queries = [q for q in rng.normal(size=(args.queries, dims)).astype("float32")]
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"{size} chunks, {dims} dims")
+        rows = synthetic_rows(np, size, dims, size)
+        exact = None
+        for dtype in ("float32", "int8"):
+            store = LocalVectorStore("local", size, 1, dtype, "", 60, dims)
+            store.add("bench", rows)
+            latencies, results = await timed(lambda q: store.search("bench", q, args.k, -1), queries)
+            extra = f"matrix={store.stats()['bytes'] / 1024 / 1024:6.1f}MB"
+            if exact is None:
+                exact = results
+            else:
+                recall = sum(len(set(a) & set(b)) for a, b in zip(exact, results)) / (args.k * len(queries))
+                extra += f" recall@{args.k} vs float32={recall:.3f}"
+            report(f"{dtype} vector", latencies, extra)
+            latencies, _ = await timed(
+                lambda q: store.hybrid_search(
+                    "bench", "vector index latency", q, args.k, min_similarity=-1,
+                    full_text_weight=1.0, semantic_weight=1.0, rrf_k=60, candidate_count=50,
+                ),
+                queries,
+            )
+            report(f"{dtype} hybrid", latencies)
+
+    if args.user_id:
+        from app.database.supabase_client import supabase
+
+        async def rpc(q):
+            result = await supabase.rpc(
+                "match_chunks",
+                {
+                    "query_embedding": q.tolist(),
+                    "match_count": args.k,
+                    "filter_user_id": args.user_id,
+                    "min_similarity": -1,
+                    "exact_search_max_rows": settings.retrieval_exact_search_max_rows,
+                },
+            ).execute()
+            return result.data
+
+        print(f"match_chunks for {args.user_id}")
+        latencies, _ = await timed(rpc, queries)
+        report("database", latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
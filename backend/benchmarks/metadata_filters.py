@@ -0,0 +1,164 @@
+"""Filtered vs unfiltered match_chunks / hybrid_match_chunks latency on a large chunks table.
+
+Against the configured Supabase project (.env), seeds --rows synthetic
+chunks for --user-id, spread over documents of --chunks-per-document
+chunks each. Every document gets metadata like ingestion would extract
+(type, date, tags), merged into its chunks. It then runs --queries
+searches per filter, with the search depth retrieval would use for the
+current index:
+
+    none        no filter (the whole tenant)
+    document    filter_document_ids, one document
+    type        filter_metadata {"type": ...}, 1/8 of the documents
+    tag         filter_metadata {"tags": [...]}, ~1/4 of the documents
+    month       filter_date_from / filter_date_to, one month of 24
+    type+month  both
+
+and reports rows returned and p50/p95 latency per RPC. Filters narrowing
+the tenant to at most RETRIEVAL_EXACT_SEARCH_MAX_ROWS chunks take the exact
+path over the indexed candidate rows; wider ones go through the ANN index
+with the filter as a predicate. The synthetic documents are deleted
+afterwards. Seeding 1M 1536-dim rows over the REST API takes a while (tens
+of minutes); start with --rows 100000.
+
+Usage (from backend/):
+    python -m benchmarks.metadata_filters --user-id <uuid> --rows 1000000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date
+
+from postgrest.types import ReturnMethod
+
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.vector_index import index_status, search_depth
+from benchmarks.vector_index import Vectors, percentile
+
+MARKER = "metadata-filters-benchmark"
+TYPES = ["report", "invoice", "contract", "meeting notes", "article", "policy", "email", "manual"]
+TAGS = ["finance", "legal", "hiring", "roadmap", "security", "sales", "support", "infra"]
+
+
+def document_metadata(rng: random.Random, i: int) -> dict:
+    month = i % 24
+    return {
+        "title": f"{MARKER} {i}",
+        "type": TYPES[i % len(TYPES)],
+        "date": date(2023 + month // 12, month % 12 + 1, rng.randint(1, 28)).isoformat(),
+        "tags": rng.sample(TAGS, 2),
+    }
+
+
+async def seed(user_id: str, rows: int, per_document: int) -> list[dict]:
+    rng = random.Random(0)
+    vectors = Vectors()
+    documents = []
+    for i in range((rows + per_document - 1) // per_document):
+        documents.append(
+            {
+                "user_id": user_id,
+                "filename": f"{MARKER}-{i}.txt",
+                "storage_path": f"{user_id}/{MARKER}-{i}.txt",
+                "mime_type": "text/plain",
+                "file_size": 0,
+                "status": "completed",  # Never claimed by ingestion workers
+                "metadata": document_metadata(rng, i),
+            }
+        )
+    created = []
+    for i in range(0, len(documents), 500):
+        created.extend((await supabase.table("documents").insert(documents[i : i + 500]).execute()).data)
+
+    semaphore = asyncio.Semaphore(4)
+
+    async def insert(doc: dict, offset: int, count: int) -> None:
+        batch = [
+            {
+                "document_id": doc["id"],
+                "user_id": user_id,
+                "content": f"{MARKER} {doc['metadata']['type']} chunk {i}",
+                "chunk_index": i,
+                "embedding": vectors.next(),
+                "metadata": {"filename": doc["filename"], **doc["metadata"]},
+            }
+            for i in range(offset, offset + count)
+        ]
+        async with semaphore:
+            await supabase.table("chunks").insert(batch, returning=ReturnMethod.minimal).execute()
+
+    tasks = []
+    remaining = rows
+    for doc in created:
+        count = min(per_document, remaining)
+        remaining -= count
+        tasks.extend(insert(doc, offset, min(500, count - offset)) for offset in range(0, count, 500))
+    await asyncio.gather(*tasks)
+    return created
+
+
+async def measure(label: str, rpc: str, params: dict, queries: list[str]) -> None:
+    latencies, returned = [], []
+    for q in queries:
+        start = time.perf_counter()
+        result = await supabase.rpc(rpc, {**params, "query_embedding": q}).execute()
+        latencies.append(time.perf_counter() - start)
+        returned.append(len(result.data))
+    print(
+        f"  {label:<12} rows={sum(returned) / len(returned):5.1f} "
+        f"p50={percentile(latencies, 50) * 1000:7.1f}ms p95={percentile(latencies, 95) * 1000:7.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunks-per-document", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    documents = await seed(args.user_id, args.rows, args.chunks_per_document)
+    print(f"{args.rows} chunks in {len(documents)} documents (seeded in {time.perf_counter() - start:.0f}s)")
+    try:
+        vectors = Vectors(seed=1)
+        queries = [vectors.next() for _ in range(args.queries)]
+        status = await index_status()
+        base = {
+            "match_count": args.k,
+            "filter_user_id": args.user_id,
+            "min_similarity": -1,
+            "exact_search_max_rows": settings.retrieval_exact_search_max_rows,
+            **search_depth(status, [], settings.retrieval_recall_target, args.k),
+        }
+        filters = {
+            "none": {},
+            "document": {"filter_document_ids": [documents[len(documents) // 2]["id"]]},
+            "type": {"filter_metadata": {"type": "invoice"}},
+            "tag": {"filter_metadata": {"tags": ["security"]}},
+            "month": {"filter_date_from": "2024-03-01", "filter_date_to": "2024-03-31"},
+            "type+month": {
+                "filter_metadata": {"type": "invoice"},
+                "filter_date_from": "2024-01-01",
+                "filter_date_to": "2024-12-31",
+            },
+        }
+        print(f"index={status.get('method')} exact_search_max_rows={settings.retrieval_exact_search_max_rows}")
+        for rpc in ("match_chunks", "hybrid_match_chunks"):
+            print(rpc)
+            extra = {"query_text": "invoice chunk"} if rpc == "hybrid_match_chunks" else {}
+            for label, params in filters.items():
+                await measure(label, rpc, {**base, **extra, **params}, queries)
+    finally:
+        ids = [doc["id"] for doc in documents]
+        for i in range(0, len(ids), 100):
+            await supabase.table("documents").delete().in_("id", ids[i : i + 100]).execute()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Chat stream latency while documents are parsed: on the event loop vs the parser pool.
+
+Simulates --streams chat streams in-process, each emitting a token every
+--token-ms on the event loop, and records the gap between consecutive
+tokens. It then parses --docs synthetic HTML (and DOCX, with python-docx
+installed) documents of --doc-mb each, in three modes:
+
+    idle    no parsing (baseline)
+    inline  parse_document called on the event loop
+    pool    ParserPool, as ingestion does
+
+Any time the loop spends parsing shows up as a token gap above --token-ms.
+For the same measurement end to end, run benchmarks.chat_concurrency against
+a live API with --upload pointing at a PDF or DOCX file.
+
+Usage (from backend/):
+    python -m benchmarks.parse_isolation --streams 50 --docs 8 --doc-mb 5
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import time
+
+from app.services.parser_pool import ParserPool
+from app.services.parsers import DOCX_MIME, parse_document
+
+WORDS = "latency vector chunk index embedding token stream batch query document".split()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_html(size_bytes: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    parts, total = ["<html><body>"], 0
+    while total < size_bytes:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+        part = f"<h2>{rng.choice(WORDS)}</h2><p>{words}.</p>" if rng.random() < 0.1 else f"<p>{words}.</p>"
+        parts.append(part)
+        total += len(part)
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+
+def synthetic_docx(size_bytes: int, seed: int) -> bytes | None:
+    try:
+        import docx
+    except ImportError:
+        return None
+    rng = random.Random(seed)
+    document, total = docx.Document(), 0
+    while total < size_bytes:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+        document.add_paragraph(words)
+        total += len(words)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+async def stream(token_s: float, stop: asyncio.Event, gaps: list[float]) -> None:
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(token_s)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def run(mode: str, docs: list[tuple[str, bytes]], args, pool: ParserPool) -> None:
+    stop = asyncio.Event()
+    gaps: list[float] = []
+    streams = [asyncio.create_task(stream(args.token_ms / 1000, stop, gaps)) for _ in range(args.streams)]
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    if mode == "inline":
+        for mime_type, data in docs:
+            parse_document(mime_type, data)
+            await asyncio.sleep(0)
+    elif mode == "pool":
+        await asyncio.gather(*(pool.parse(mime_type, data) for mime_type, data in docs))
+    else:
+        await asyncio.sleep(1)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*streams)
+    print(
+        f"{mode:<7} parse={elapsed:6.2f}s  token gap "
+        f"p50={percentile(gaps, 50) * 1000:7.1f}ms "
+        f"p99={percentile(gaps, 99) * 1000:7.1f}ms "
+        f"max={max(gaps) * 1000:7.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--doc-mb", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    size = int(args.doc_mb * 1024 * 1024)
+    docs = []
+    for i in range(args.docs):
+        data = synthetic_docx(size // 4, i) if i % 2 else None
+        docs.append((DOCX_MIME, data) if data else ("text/html", synthetic_html(size, i)))
+    pool = ParserPool(max_workers=args.workers, timeout_seconds=600, memory_limit_mb=0)
+    await pool.parse("text/html", b"<p>warm-up</p>")  # Spawn workers outside the timed run
+
+    print(f"{args.streams} streams, token every {args.token_ms:g}ms; {args.docs} docs of ~{args.doc_mb:g} MB")
+    for mode in ("idle", "inline", "pool"):
+        await run(mode, docs, args, pool)
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Added latency of the rerank stage per query, CPU only.
+
+Scores synthetic ~800-character candidates for 50/100/200-candidate pools,
+first one query at a time, then with concurrent queries sharing a batch.
+
+Usage (from backend/):
+    python -m benchmarks.rerank_latency --queries 50
+    python -m benchmarks.rerank_latency --reranker cross-encoder  # needs sentence-transformers
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from benchmarks.stub_embeddings import configure_env
+
+configure_env()
+
+from app.services.reranker import CrossEncoderReranker, LexicalReranker, RerankService  # noqa: E402
+from app.config import settings  # noqa: E402
+
+VOCAB = [f"term{i}" for i in range(2000)] + ["E1234", "SKU-99812", "timeout", "latency", "index"]
+
+
+def passage(rng: random.Random) -> str:
+    text = " ".join(rng.choice(VOCAB) for _ in range(120))
+    return text[:800]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(service: RerankService, candidates: int, queries: int, concurrency: int) -> list[float]:
+    rng = random.Random(candidates)
+    latencies: list[float] = []
+
+    async def one(q: int) -> None:
+        results = [{"id": str(uuid.uuid4()), "content": passage(rng)} for _ in range(candidates)]
+        start = time.perf_counter()
+        await service.rerank(f"why does E1234 timeout query {q}", results, top_k=5)
+        latencies.append(time.perf_counter() - start)
+
+    for i in range(0, queries, concurrency):
+        await asyncio.gather(*(one(q) for q in range(i, min(i + concurrency, queries))))
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reranker", default="lexical", choices=["lexical", "cross-encoder"])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    reranker = (
+        CrossEncoderReranker(settings.reranker_model)
+        if args.reranker == "cross-encoder"
+        else LexicalReranker()
+    )
+    print(f"reranker={args.reranker} queries={args.queries}")
+    print(f"{'candidates':>10} {'mode':>12} {'p50':>9} {'p95':>9} {'batches':>8}")
+    for candidates in (50, 100, 200):
+        for concurrency in (1, args.concurrency):
+            # Fresh service per run so the score cache doesn't hide the cost
+            service = RerankService(reranker, batch_window_ms=settings.reranker_batch_window_ms, cache_size=100000)
+            latencies = await run(service, candidates, args.queries, concurrency)
+            mode = "sequential" if concurrency == 1 else f"{concurrency} at once"
+            print(
+                f"{candidates:>10} {mode:>12} {percentile(latencies, 50) * 1000:>7.2f}ms "
+                f"{percentile(latencies, 95) * 1000:>7.2f}ms {service.batches:>8}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Offline retrieval eval: recall@k and latency per search mode.
+
+Runs each query of a labelled eval set through `search_documents` against the
+configured Supabase project (.env) and reports recall@k and latency for the
+vector-only and hybrid paths side by side.
+
+Eval set: JSONL, one object per line:
+    {"query": "error E1234 on startup", "relevant": ["<document_id>:<chunk_index>", "<document_id>"]}
+A relevant entry without ":<chunk_index>" matches any chunk of that document.
+
+Usage (from backend/):
+    python -m benchmarks.retrieval_eval --user-id <uuid> --eval-set eval.jsonl --k 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from app.services.retrieval_service import search_documents
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def recall(results: list[dict], relevant: set[str]) -> float:
+    found = set()
+    for r in results:
+        for label in relevant:
+            doc, _, idx = label.partition(":")
+            if r["document_id"] == doc and (not idx or int(idx) == r["chunk_index"]):
+                found.add(label)
+    return len(found) / len(relevant) if relevant else 0.0
+
+
+async def evaluate(cases: list[dict], user_id: str, k: int, **search_kwargs) -> dict:
+    recalls, latencies = [], []
+    for case in cases:
+        start = time.perf_counter()
+        results = await search_documents(case["query"], user_id, top_k=k, **search_kwargs)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(recall(results, set(case["relevant"])))
+    return {
+        "recall": sum(recalls) / len(recalls),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--eval-set", type=Path, required=True)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [json.loads(line) for line in args.eval_set.read_text().splitlines() if line.strip()]
+    print(f"{len(cases)} queries, k={args.k}")
+    print(f"{'mode':<10} {'recall@k':>9} {'p50':>9} {'p95':>9}")
+    for mode in ("vector", "hybrid"):
+        r = await evaluate(cases, args.user_id, args.k, mode=mode)
+        print(f"{mode:<10} {r['recall']:>9.3f} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
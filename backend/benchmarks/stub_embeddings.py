@@ -0,0 +1,147 @@
+"""OpenAI-compatible stub embedding server for offline benchmarks.
+
+Returns deterministic pseudo-random unit vectors after a fixed simulated
+latency, and counts requests so benchmarks can report provider calls. With
+`max_rps` set, requests beyond that rate get a 429 with a retry-after header.
+
+Standalone:
+    python -m benchmarks.stub_embeddings --port 8765 --latency-ms 50 --max-rps 20
+"""
+
+import argparse
+import array
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+import httpx
+
+STUB_PORT = 8765
+
+
+def _vector(seed: int, dimensions: int) -> list[float]:
+    rng = random.Random(seed)
+    vec = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def build_app(latency_ms: float, max_rps: float = 0, pool_size: int = 256):
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    stats = {"requests": 0, "inputs": 0, "rate_limited": 0}
+    window: list[float] = []  # Accepted request times within the last second
+    # Pre-serialized vector pools per (dimensions, encoding), so the stub itself is never the bottleneck
+    pools: dict[tuple[int, str], list[str]] = {}
+
+    def pool(dimensions: int, encoding: str) -> list[str]:
+        key = (dimensions, encoding)
+        if key not in pools:
+            vectors = [_vector(i, dimensions) for i in range(pool_size)]
+            if encoding == "base64":
+                # Real providers return little-endian float32 when base64 is requested
+                pools[key] = [
+                    json.dumps(base64.b64encode(array.array("f", v).tobytes()).decode())
+                    for v in vectors
+                ]
+            else:
+                pools[key] = [json.dumps(v) for v in vectors]
+        return pools[key]
+
+    async def embeddings(request: Request):
+        if max_rps:
+            now = time.monotonic()
+            window[:] = [t for t in window if now - t < 1.0]
+            if len(window) >= max_rps:
+                stats["rate_limited"] += 1
+                return JSONResponse(
+                    {"error": {"message": "rate limited", "type": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"retry-after": f"{1.0 - (now - window[0]):.3f}"},
+                )
+            window.append(now)
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        vectors = pool(body.get("dimensions") or 1536, body.get("encoding_format") or "float")
+        stats["requests"] += 1
+        stats["inputs"] += len(inputs)
+        await asyncio.sleep(latency_ms / 1000)
+        data = ",".join(
+            '{"object":"embedding","index":%d,"embedding":%s}'
+            % (i, vectors[int(hashlib.md5(text.encode()).hexdigest(), 16) % pool_size])
+            for i, text in enumerate(inputs)
+        )
+        return Response(
+            '{"object":"list","model":%s,"data":[%s],"usage":{"prompt_tokens":0,"total_tokens":0}}'
+            % (json.dumps(body.get("model", "stub")), data),
+            media_type="application/json",
+        )
+
+    async def get_stats(request: Request):
+        return JSONResponse(stats)
+
+    return Starlette(
+        routes=[
+            Route("/v1/embeddings", embeddings, methods=["POST"]),
+            Route("/stats", get_stats),
+        ]
+    )
+
+
+def _serve(port: int, latency_ms: float, max_rps: float = 0) -> None:
+    import uvicorn
+
+    uvicorn.run(build_app(latency_ms, max_rps), host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_stub_server(
+    port: int = STUB_PORT, latency_ms: float = 50, max_rps: float = 0
+) -> multiprocessing.Process:
+    """Start the stub server in a child process and wait until it accepts requests."""
+    proc = multiprocessing.Process(target=_serve, args=(port, latency_ms, max_rps), daemon=True)
+    proc.start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=0.5)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("stub embedding server did not start")
+
+
+def stub_stats(port: int = STUB_PORT) -> dict:
+    return httpx.get(f"http://127.0.0.1:{port}/stats").json()
+
+
+def configure_env(port: int = STUB_PORT) -> None:
+    """Point the app's embedding client at the stub and fill required settings.
+
+    Must run before any `app.*` import, since settings and clients are built at import time.
+    """
+    os.environ["EMBEDDING_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ.setdefault("EMBEDDING_API_KEY", "stub")
+    os.environ.setdefault("LLM_API_KEY", "stub")
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "stub")
+    os.environ.setdefault("LANGSMITH_API_KEY", "stub")
+    os.environ.setdefault("EMBEDDING_CACHE_PERSISTENT", "false")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--max-rps", type=float, default=0)
+    args = parser.parse_args()
+    _serve(args.port, args.latency_ms, args.max_rps)
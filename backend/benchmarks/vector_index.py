@@ -0,0 +1,204 @@
+"""Vector index recall@k and latency at growing table sizes, per index method.
+
+Against the configured Supabase project (.env), grows the chunks table to
+each of --sizes rows with synthetic clustered embeddings: --small-rows rows
+for a small tenant (--user-id) and the rest for a large one
+(--bulk-user-id). At each size, for each of --methods, it rebuilds the
+embedding index with `rebuild_index` (IVFFlat lists sized from the row
+count) and runs --queries searches per tenant through match_chunks:
+
+    exact       every row of the tenant scanned (ground truth)
+    depth N     the ANN index at probes / ef_search = N
+    auto        the depth search_depth() picks for --recall-target, uncalibrated
+    small-exact the small tenant under RETRIEVAL_EXACT_SEARCH_MAX_ROWS (exact path)
+
+reporting recall@k against exact and p50/p95 latency. The small tenant's ANN
+rows show the post-filter problem: its rows are a sliver of every IVFFlat
+list and HNSW neighbourhood, so unless pgvector 0.8 iterative scans are
+available, few of its true neighbours survive the user filter.
+
+This rebuilds the shared idx_chunks_embedding (over DATABASE_URL, like
+manage_index): run it against a scratch project. The original index method is restored and the synthetic rows are
+deleted afterwards. Seeding 1M 1536-dim rows over the REST API takes a
+while (tens of minutes); start with --sizes 10000,100000.
+
+Usage (from backend/):
+    python -m benchmarks.vector_index --user-id <uuid> --bulk-user-id <uuid> \\
+        --sizes 10000,100000,1000000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from postgrest.types import ReturnMethod
+
+from app.config import settings
+from app.database.supabase_client import supabase
+from app.services.vector_index import (
+    CALIBRATION_DEPTHS,
+    EXACT,
+    index_status,
+    rebuild_index,
+    search_depth,
+)
+
+MARKER = "vector-index-benchmark"
+DIMS = 1536
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Vectors:
+    """Clustered embeddings: centroid + two scaled noise vectors from fixed pools.
+
+    Mixing pooled vectors keeps generation cheap in pure Python while giving
+    every row a distinct position inside its cluster.
+    """
+
+    def __init__(self, seed: int = 0, clusters: int = 256, pool: int = 1024):
+        self.rng = random.Random(seed)
+        gauss = self.rng.gauss
+        self.centroids = [[gauss(0, 1) for _ in range(DIMS)] for _ in range(clusters)]
+        self.noise = [[gauss(0, 0.6) for _ in range(DIMS)] for _ in range(pool)]
+
+    def next(self) -> str:
+        rng = self.rng
+        c = rng.choice(self.centroids)
+        a, b = rng.choice(self.noise), rng.choice(self.noise)
+        w = rng.random()
+        return "[" + ",".join(f"{x + w * y + (1 - w) * z:.4f}" for x, y, z in zip(c, a, b)) + "]"
+
+
+async def create_document(user_id: str) -> str:
+    result = await supabase.table("documents").insert(
+        {
+            "user_id": user_id,
+            "filename": f"{MARKER}.txt",
+            "storage_path": f"{user_id}/{MARKER}.txt",
+            "mime_type": "text/plain",
+            "file_size": 0,
+            "status": "completed",  # Never claimed by ingestion workers
+        }
+    ).execute()
+    return result.data[0]["id"]
+
+
+async def seed(vectors: Vectors, user_id: str, document_id: str, start: int, count: int) -> None:
+    semaphore = asyncio.Semaphore(4)
+
+    async def insert(offset: int, n: int) -> None:
+        rows = [
+            {
+                "document_id": document_id,
+                "user_id": user_id,
+                "content": f"{MARKER} {i}",
+                "chunk_index": i,
+                "embedding": vectors.next(),
+            }
+            for i in range(offset, offset + n)
+        ]
+        async with semaphore:
+            await supabase.table("chunks").insert(rows, returning=ReturnMethod.minimal).execute()
+
+    batch = 500
+    await asyncio.gather(
+        *(insert(start + i, min(batch, count - i)) for i in range(0, count, batch))
+    )
+
+
+async def match(user_id: str, embedding: str, k: int, **params) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    result = await supabase.rpc(
+        "match_chunks",
+        {
+            "query_embedding": embedding,
+            "match_count": k,
+            "filter_user_id": user_id,
+            "min_similarity": -1,
+            **params,
+        },
+    ).execute()
+    return [row["id"] for row in result.data], time.perf_counter() - start
+
+
+async def measure(label: str, user_id: str, queries: list[str], truth: list[set], k: int, **params) -> None:
+    recalls, latencies = [], []
+    for embedding, expected in zip(queries, truth):
+        ids, elapsed = await match(user_id, embedding, k, **params)
+        latencies.append(elapsed)
+        recalls.append(len(expected.intersection(ids)) / len(expected) if expected else 1.0)
+    print(
+        f"    {label:<14} recall@{k}={sum(recalls) / len(recalls):6.3f} "
+        f"p50={percentile(latencies, 50) * 1000:7.1f}ms p95={percentile(latencies, 95) * 1000:7.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", required=True, help="Small tenant")
+    parser.add_argument("--bulk-user-id", required=True, help="Large tenant filling the table")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--small-rows", type=int, default=500)
+    parser.add_argument("--methods", default="ivfflat,hnsw")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--recall-target", type=float, default=0.95)
+    args = parser.parse_args()
+
+    original = (await index_status()).get("method")
+    vectors = Vectors()
+    queries = [vectors.next() for _ in range(args.queries)]
+    tenants = {"small": args.user_id, "large": args.bulk_user_id}
+    documents = {name: await create_document(user_id) for name, user_id in tenants.items()}
+    try:
+        await seed(vectors, args.user_id, documents["small"], 0, args.small_rows)
+        bulk_rows = 0
+        for size in (int(s) for s in args.sizes.split(",")):
+            target = max(0, size - args.small_rows)
+            start = time.perf_counter()
+            await seed(vectors, args.bulk_user_id, documents["large"], bulk_rows, target - bulk_rows)
+            print(f"\n{size} rows (seeded in {time.perf_counter() - start:.0f}s)")
+            bulk_rows = target
+
+            # Exact neighbours per tenant don't depend on the index
+            truth = {}
+            for name, user_id in tenants.items():
+                truth[name] = [
+                    set((await match(user_id, q, args.k, exact_search_max_rows=EXACT))[0]) for q in queries
+                ]
+
+            for method in args.methods.split(","):
+                start = time.perf_counter()
+                status = await rebuild_index(method)
+                print(
+                    f"  {method}: built in {time.perf_counter() - start:.1f}s, "
+                    f"lists={status.get('lists')} m={status.get('m')} "
+                    f"size={status['index_bytes'] / 1024 / 1024:.0f}MB"
+                )
+                param = "probes" if method == "ivfflat" else "ef_search"
+                auto = search_depth(status, [], args.recall_target, args.k)
+                for name, user_id in tenants.items():
+                    print(f"  {name} tenant")
+                    await measure("exact", user_id, queries, truth[name], args.k, exact_search_max_rows=EXACT)
+                    for depth in CALIBRATION_DEPTHS[method]:
+                        if method == "ivfflat" and depth > (status.get("lists") or 0):
+                            break
+                        await measure(f"depth {depth}", user_id, queries, truth[name], args.k, **{param: depth})
+                    await measure(f"auto ({auto[param]})", user_id, queries, truth[name], args.k, **auto)
+                await measure(
+                    "small-exact", args.user_id, queries, truth["small"], args.k,
+                    exact_search_max_rows=settings.retrieval_exact_search_max_rows,
+                )
+    finally:
+        await supabase.table("documents").delete().in_("id", list(documents.values())).execute()
+        if original:
+            await rebuild_index(original)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
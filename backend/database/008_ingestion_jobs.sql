@@ -0,0 +1,159 @@
+-- Ingestion job queue: lease/heartbeat columns on documents + claim/complete/fail functions
+-- Run this in Supabase SQL Editor
+
+alter table public.documents
+    add column attempts integer not null default 0,
+    add column next_attempt_at timestamptz not null default now(),
+    add column locked_by text,
+    add column lease_expires_at timestamptz,
+    add column heartbeat_at timestamptz;
+
+-- Only queued/in-flight rows are ever scanned by workers
+create index idx_documents_job_queue on public.documents(next_attempt_at)
+    where status in ('pending', 'processing');
+
+-- Claim up to p_limit runnable jobs. Runnable = pending and due, or processing
+-- with an expired lease (worker died). Candidates are locked with SKIP LOCKED so
+-- concurrent workers never claim the same row, then ordered round-robin across
+-- users (favouring users with the fewest jobs in flight) for per-user fairness.
+create or replace function claim_ingestion_jobs(
+    p_worker_id text,
+    p_limit int default 1,
+    p_lease_seconds int default 300
+)
+returns setof public.documents
+language plpgsql
+as $$
+begin
+    return query
+    with candidates as (
+        select d.id, d.user_id, d.next_attempt_at
+        from public.documents d
+        where (d.status = 'pending' and d.next_attempt_at <= now())
+            or (d.status = 'processing' and d.lease_expires_at < now())
+        order by d.next_attempt_at
+        limit greatest(p_limit * 10, 50)
+        for update skip locked
+    ),
+    ranked as (
+        select
+            c.id,
+            c.next_attempt_at,
+            row_number() over (partition by c.user_id order by c.next_attempt_at) as user_rank,
+            (
+                select count(*)
+                from public.documents a
+                where a.user_id = c.user_id
+                    and a.status = 'processing'
+                    and a.lease_expires_at >= now()
+            ) as in_flight
+        from candidates c
+    ),
+    chosen as (
+        select r.id
+        from ranked r
+        order by r.user_rank, r.in_flight, r.next_attempt_at
+        limit p_limit
+    )
+    update public.documents d
+    set status = 'processing',
+        locked_by = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = now(),
+        attempts = d.attempts + 1,
+        error_message = null
+    from chosen
+    where d.id = chosen.id
+    returning d.*;
+end;
+$$;
+
+-- Extend a lease. Returns false if the worker no longer owns the job.
+create or replace function heartbeat_ingestion_job(
+    p_document_id uuid,
+    p_worker_id text,
+    p_lease_seconds int default 300
+)
+returns boolean
+language plpgsql
+as $$
+begin
+    update public.documents
+    set lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = now()
+    where id = p_document_id
+        and locked_by = p_worker_id
+        and status = 'processing';
+    return found;
+end;
+$$;
+
+create or replace function complete_ingestion_job(
+    p_document_id uuid,
+    p_worker_id text,
+    p_chunk_count int
+)
+returns void
+language plpgsql
+as $$
+begin
+    update public.documents
+    set status = 'completed',
+        chunk_count = p_chunk_count,
+        locked_by = null,
+        lease_expires_at = null
+    where id = p_document_id
+        and locked_by = p_worker_id;
+end;
+$$;
+
+-- Record a failed attempt: re-queue with exponential backoff, or mark failed
+-- once attempts are exhausted. Returns the resulting status.
+create or replace function fail_ingestion_job(
+    p_document_id uuid,
+    p_worker_id text,
+    p_error text,
+    p_max_attempts int default 3,
+    p_backoff_seconds float default 10
+)
+returns text
+language plpgsql
+as $$
+declare
+    new_status text;
+begin
+    update public.documents
+    set status = case when attempts < p_max_attempts then 'pending' else 'failed' end,
+        next_attempt_at = now() + make_interval(
+            secs => p_backoff_seconds * power(2, greatest(attempts - 1, 0))
+        ),
+        error_message = left(p_error, 500),
+        locked_by = null,
+        lease_expires_at = null
+    where id = p_document_id
+        and locked_by = p_worker_id
+    returning status into new_status;
+    return new_status;
+end;
+$$;
+
+-- Startup recovery: re-queue jobs left in 'processing' by a dead worker
+-- (expired lease, or no lease at all for rows from before the queue existed).
+create or replace function recover_ingestion_jobs()
+returns int
+language plpgsql
+as $$
+declare
+    recovered int;
+begin
+    update public.documents
+    set status = 'pending',
+        next_attempt_at = now(),
+        locked_by = null,
+        lease_expires_at = null
+    where status = 'processing'
+        and (lease_expires_at is null or lease_expires_at < now());
+    get diagnostics recovered = row_count;
+    return recovered;
+end;
+$$;
@@ -0,0 +1,14 @@
+-- Embedding cache: chunk embeddings keyed by (model, dimensions, content hash)
+-- Run this in Supabase SQL Editor
+
+create table public.embedding_cache (
+    model text not null,
+    dimensions integer not null,
+    content_hash text not null,  -- sha256 of NFC + whitespace-collapsed text
+    embedding vector not null,  -- unconstrained so any model/dimension pair fits
+    created_at timestamptz not null default now(),
+    primary key (model, dimensions, content_hash)
+);
+
+-- Backend-only table: RLS on with no policies, so only the service role can access it
+alter table public.embedding_cache enable row level security;
@@ -0,0 +1,64 @@
+-- Record manager: per-document and per-chunk content hashes for incremental re-ingestion
+-- Run this in Supabase SQL Editor
+
+alter table public.documents
+    add column content_hash text,  -- sha256 of the uploaded file bytes
+    add column ingest_stats jsonb;  -- {"reused", "embedded", "deleted"} from the last run
+
+alter table public.chunks
+    add column content_hash text;  -- sha256 of the normalized chunk text
+
+-- Re-upload lookup by filename
+create index idx_documents_user_filename on public.documents(user_id, filename);
+
+-- Apply a chunk diff in one round trip: renumber reused chunks whose position
+-- moved, then delete chunks that no longer exist in the new version.
+create or replace function apply_chunk_diff(
+    p_document_id uuid,
+    p_reindex_ids uuid[],
+    p_reindex_positions int[],
+    p_stale_ids uuid[]
+)
+returns int
+language plpgsql
+as $$
+declare
+    deleted int;
+begin
+    update public.chunks c
+    set chunk_index = r.position
+    from unnest(p_reindex_ids, p_reindex_positions) as r(id, position)
+    where c.id = r.id
+        and c.document_id = p_document_id;
+
+    delete from public.chunks
+    where document_id = p_document_id
+        and id = any(p_stale_ids);
+    get diagnostics deleted = row_count;
+    return deleted;
+end;
+$$;
+
+-- Completion now records ingest stats alongside the chunk count
+drop function if exists complete_ingestion_job(uuid, text, int);
+
+create or replace function complete_ingestion_job(
+    p_document_id uuid,
+    p_worker_id text,
+    p_chunk_count int,
+    p_stats jsonb default null
+)
+returns void
+language plpgsql
+as $$
+begin
+    update public.documents
+    set status = 'completed',
+        chunk_count = p_chunk_count,
+        ingest_stats = p_stats,
+        locked_by = null,
+        lease_expires_at = null
+    where id = p_document_id
+        and locked_by = p_worker_id;
+end;
+$$;
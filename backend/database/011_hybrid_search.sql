@@ -0,0 +1,78 @@
+-- Hybrid search: full-text index on chunks + keyword/vector fusion with Reciprocal Rank Fusion
+-- Run this in Supabase SQL Editor
+
+alter table public.chunks
+    add column fts tsvector generated always as (to_tsvector('english', content)) stored;
+
+create index idx_chunks_fts on public.chunks using gin (fts);
+
+-- Runs the keyword and vector candidate searches in one statement and fuses
+-- their rankings with RRF: score = sum(weight / (rrf_k + rank)). Keyword hits
+-- are kept regardless of min_similarity so exact identifiers still surface;
+-- the threshold only prunes the vector candidate list.
+create or replace function hybrid_match_chunks(
+    query_text text,
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter_user_id uuid default null,
+    min_similarity float default 0.3,
+    full_text_weight float default 1.0,
+    semantic_weight float default 1.0,
+    rrf_k int default 60,
+    candidate_count int default 50
+)
+returns table (
+    id uuid,
+    document_id uuid,
+    content text,
+    chunk_index int,
+    metadata jsonb,
+    similarity float,
+    score float
+)
+language sql
+stable
+as $$
+    with full_text as (
+        select
+            c.id,
+            row_number() over (
+                order by ts_rank_cd(c.fts, websearch_to_tsquery('english', query_text)) desc
+            ) as rank_ix
+        from public.chunks c
+        where c.user_id = filter_user_id
+            and c.fts @@ websearch_to_tsquery('english', query_text)
+        order by rank_ix
+        limit candidate_count
+    ),
+    semantic as (
+        select
+            c.id,
+            row_number() over (order by c.embedding <=> query_embedding) as rank_ix
+        from public.chunks c
+        where c.user_id = filter_user_id
+            and 1 - (c.embedding <=> query_embedding) >= min_similarity
+        order by rank_ix
+        limit candidate_count
+    ),
+    fused as (
+        select
+            coalesce(ft.id, s.id) as id,
+            coalesce(full_text_weight / (rrf_k + ft.rank_ix), 0.0)
+                + coalesce(semantic_weight / (rrf_k + s.rank_ix), 0.0) as score
+        from full_text ft
+        full outer join semantic s on ft.id = s.id
+    )
+    select
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        c.metadata,
+        1 - (c.embedding <=> query_embedding) as similarity,
+        f.score
+    from fused f
+    join public.chunks c on c.id = f.id
+    order by f.score desc
+    limit match_count;
+$$;
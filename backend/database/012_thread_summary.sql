@@ -0,0 +1,9 @@
+-- Rolling conversation summary: older turns are folded into threads.summary
+-- Run this in Supabase SQL Editor
+
+alter table public.threads
+    add column summary text,
+    add column summarized_until timestamptz;  -- created_at of the last message folded into summary
+
+-- Recent-history reads: newest messages of a thread first, with a limit
+create index idx_messages_thread_created on public.messages(thread_id, created_at desc);
@@ -0,0 +1,98 @@
+-- Chat turn RPCs: one round trip to start a turn, one to finish it
+-- Run this in Supabase SQL Editor
+
+-- Any new message bumps its thread to the top of the list (replaces the
+-- app-side "rewrite the title to touch updated_at" update).
+create or replace function public.touch_thread_on_message()
+returns trigger as $$
+begin
+    update public.threads set updated_at = now() where id = new.thread_id;
+    return new;
+end;
+$$ language plpgsql;
+
+create trigger touch_thread_on_message
+    after insert on public.messages
+    for each row execute function public.touch_thread_on_message();
+
+-- Verifies (or creates) the thread, inserts the user message and returns
+-- everything the chat handler needs before calling the LLM:
+--   {"thread_id", "summary", "summarized_until", "history": [{role, content, created_at}], "settings": {llm_base_url, llm_model}}
+-- History is the newest unsummarized messages (including the one just
+-- inserted), oldest first, capped at p_history_limit.
+-- Returns null if p_thread_id is given but not owned by p_user_id.
+create or replace function begin_chat_turn(
+    p_user_id uuid,
+    p_thread_id uuid,
+    p_message text,
+    p_title text,
+    p_history_limit int default 20
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_thread public.threads%rowtype;
+    v_history jsonb;
+    v_settings jsonb;
+begin
+    if p_thread_id is null then
+        insert into public.threads (user_id, title)
+        values (p_user_id, p_title)
+        returning * into v_thread;
+    else
+        select * into v_thread
+        from public.threads
+        where id = p_thread_id and user_id = p_user_id;
+        if not found then
+            return null;
+        end if;
+    end if;
+
+    insert into public.messages (thread_id, user_id, role, content)
+    values (v_thread.id, p_user_id, 'user', p_message);
+
+    select coalesce(
+        jsonb_agg(
+            jsonb_build_object('role', m.role, 'content', m.content, 'created_at', m.created_at)
+            order by m.created_at
+        ),
+        '[]'::jsonb
+    )
+    into v_history
+    from (
+        select role, content, created_at
+        from public.messages
+        where thread_id = v_thread.id
+            and (v_thread.summarized_until is null or created_at > v_thread.summarized_until)
+        order by created_at desc
+        limit p_history_limit
+    ) m;
+
+    select jsonb_build_object('llm_base_url', s.llm_base_url, 'llm_model', s.llm_model)
+    into v_settings
+    from public.user_settings s
+    where s.user_id = p_user_id;
+
+    return jsonb_build_object(
+        'thread_id', v_thread.id,
+        'summary', v_thread.summary,
+        'summarized_until', v_thread.summarized_until,
+        'history', v_history,
+        'settings', coalesce(v_settings, '{}'::jsonb)
+    );
+end;
+$$;
+
+-- Stores the assistant reply; touch_thread_on_message bumps updated_at.
+create or replace function finish_chat_turn(
+    p_user_id uuid,
+    p_thread_id uuid,
+    p_content text
+)
+returns void
+language sql
+as $$
+    insert into public.messages (thread_id, user_id, role, content)
+    values (p_thread_id, p_user_id, 'assistant', p_content);
+$$;
@@ -0,0 +1,4 @@
+-- Document list deltas: GET /api/documents?updated_since=...
+-- Run this in Supabase SQL Editor
+
+create index idx_documents_user_updated on public.documents(user_id, updated_at);
@@ -0,0 +1,12 @@
+-- Keyset pagination: composite indexes matching each listing's filter + sort + tiebreak
+-- Run this in Supabase SQL Editor
+
+-- GET /api/threads: user_id = ? order by updated_at desc, id desc
+create index idx_threads_user_updated_id on public.threads(user_id, updated_at desc, id desc);
+
+-- GET /api/threads/{id}/messages and chat history: thread_id = ? order by created_at desc, id desc
+create index idx_messages_thread_created_id on public.messages(thread_id, created_at desc, id desc);
+drop index if exists idx_messages_thread_created;  -- 012, superseded by the index above
+
+-- GET /api/documents: user_id = ? order by created_at desc, id desc
+create index idx_documents_user_created_id on public.documents(user_id, created_at desc, id desc);
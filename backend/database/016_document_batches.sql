@@ -0,0 +1,107 @@
+-- Batch uploads: POST /api/documents/batch registers every file in one call
+-- Run this in Supabase SQL Editor
+
+alter table public.documents
+    add column batch_id uuid;  -- Upload batch that last (re)queued this document
+
+create index idx_documents_user_batch on public.documents(user_id, batch_id)
+    where batch_id is not null;
+
+-- Registers a batch of already-stored files with the same record-manager
+-- rules as the single upload route: a filename the user already has is
+-- re-queued if its content changed (or it failed), left alone if unchanged,
+-- and inserted otherwise. All new rows go in with one insert.
+--   p_documents: [{id, filename, storage_path, mime_type, file_size, content_hash}]
+-- Returns {"created": [doc], "updated": [doc + old_storage_path, old_content_hash], "unchanged": [doc]}
+create or replace function create_document_batch(
+    p_user_id uuid,
+    p_batch_id uuid,
+    p_documents jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_result jsonb;
+begin
+    with incoming as (
+        select *
+        from jsonb_to_recordset(p_documents) as d(
+            id uuid,
+            filename text,
+            storage_path text,
+            mime_type text,
+            file_size bigint,
+            content_hash text
+        )
+    ),
+    latest as (
+        select distinct on (doc.filename)
+            doc.id, doc.filename, doc.storage_path, doc.content_hash, doc.status
+        from public.documents doc
+        join incoming i on i.filename = doc.filename
+        where doc.user_id = p_user_id
+        order by doc.filename, doc.created_at desc
+    ),
+    updated as (
+        update public.documents doc
+        set storage_path = i.storage_path,
+            mime_type = i.mime_type,
+            file_size = i.file_size,
+            content_hash = i.content_hash,
+            status = 'pending',
+            error_message = null,
+            attempts = 0,
+            next_attempt_at = now(),
+            locked_by = null,
+            lease_expires_at = null,
+            batch_id = p_batch_id
+        from latest l
+        join incoming i on i.filename = l.filename
+        where doc.id = l.id
+          and (l.content_hash is distinct from i.content_hash or l.status = 'failed')
+        returning doc.*, l.storage_path as old_storage_path, l.content_hash as old_content_hash
+    ),
+    inserted as (
+        insert into public.documents
+            (id, user_id, filename, storage_path, mime_type, file_size, content_hash, batch_id)
+        select i.id, p_user_id, i.filename, i.storage_path, i.mime_type, i.file_size, i.content_hash, p_batch_id
+        from incoming i
+        where not exists (select 1 from latest l where l.filename = i.filename)
+        returning *
+    ),
+    unchanged as (
+        select doc.*
+        from public.documents doc
+        join latest l on l.id = doc.id
+        join incoming i on i.filename = l.filename
+        where l.content_hash = i.content_hash and l.status <> 'failed'
+    )
+    select jsonb_build_object(
+        'created', coalesce((select jsonb_agg(to_jsonb(x)) from inserted x), '[]'::jsonb),
+        'updated', coalesce((select jsonb_agg(to_jsonb(x)) from updated x), '[]'::jsonb),
+        'unchanged', coalesce((select jsonb_agg(to_jsonb(x)) from unchanged x), '[]'::jsonb)
+    ) into v_result;
+
+    return v_result;
+end;
+$$;
+
+-- Aggregate progress of a batch without shipping its rows:
+--   {"total", "pending", "processing", "completed", "failed", "chunk_count"}
+create or replace function document_batch_progress(p_user_id uuid, p_batch_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'total', count(*),
+        'pending', count(*) filter (where status = 'pending'),
+        'processing', count(*) filter (where status = 'processing'),
+        'completed', count(*) filter (where status = 'completed'),
+        'failed', count(*) filter (where status = 'failed'),
+        'chunk_count', coalesce(sum(chunk_count), 0)
+    )
+    from public.documents
+    where user_id = p_user_id and batch_id = p_batch_id;
+$$;
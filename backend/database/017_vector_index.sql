@@ -0,0 +1,399 @@
+-- Vector index management: HNSW or row-count-sized IVFFlat, per-query search
+-- depth, exact search for small tenants, optional partitioning by user hash
+-- Run this in Supabase SQL Editor
+--
+-- Manage the index with `python -m app.manage_index` (status / rebuild /
+-- calibrate / partition) rather than by hand: rebuilding also clears the
+-- recall calibration that retrieval uses to pick a search depth.
+
+-- Recall@k measured per search depth against exact search, written by
+-- `manage_index calibrate`; retrieval picks the smallest depth meeting
+-- RETRIEVAL_RECALL_TARGET. Only the service role reads or writes it.
+create table public.vector_index_calibration (
+    method text not null,  -- 'ivfflat' or 'hnsw'
+    search_depth int not null,  -- ivfflat.probes or hnsw.ef_search
+    recall float not null,
+    p50_ms float,
+    measured_at timestamptz not null default now(),
+    primary key (method, search_depth)
+);
+
+alter table public.vector_index_calibration enable row level security;
+
+-- Embedding index in use, its build parameters and the table's size.
+--   {"method", "lists", "m", "ef_construction", "rows", "partitions",
+--    "rows_per_partition", "index_bytes", "indexdef", "vector_version"}
+create or replace function chunk_index_status()
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+    v_method text;
+    v_indexdef text;
+    v_options text[];
+    v_partitions int;
+    v_rows bigint;
+    v_bytes bigint;
+begin
+    select am.amname, pg_get_indexdef(i.indexrelid), ic.reloptions
+    into v_method, v_indexdef, v_options
+    from pg_index i
+    join pg_class ic on ic.oid = i.indexrelid
+    join pg_am am on am.oid = ic.relam
+    where i.indrelid = 'public.chunks'::regclass
+        and am.amname in ('ivfflat', 'hnsw')
+    limit 1;
+
+    select count(*) into v_partitions
+    from pg_inherits where inhparent = 'public.chunks'::regclass;
+
+    -- Planner estimates: exact counts would scan the table
+    select greatest(sum(c.reltuples), 0)::bigint into v_rows
+    from pg_class c
+    where c.oid = 'public.chunks'::regclass
+        or c.oid in (select inhrelid from pg_inherits where inhparent = 'public.chunks'::regclass);
+
+    select coalesce(sum(pg_relation_size(i.indexrelid)), 0) into v_bytes
+    from pg_index i
+    join pg_class ic on ic.oid = i.indexrelid
+    join pg_am am on am.oid = ic.relam
+    where am.amname in ('ivfflat', 'hnsw')
+        and (i.indrelid = 'public.chunks'::regclass
+            or i.indrelid in (select inhrelid from pg_inherits where inhparent = 'public.chunks'::regclass));
+
+    return jsonb_build_object(
+        'method', v_method,
+        'lists', (select split_part(o, '=', 2)::int from unnest(v_options) o where o like 'lists=%'),
+        'm', (select split_part(o, '=', 2)::int from unnest(v_options) o where o like 'm=%'),
+        'ef_construction', (select split_part(o, '=', 2)::int from unnest(v_options) o where o like 'ef_construction=%'),
+        'rows', v_rows,
+        'partitions', v_partitions,
+        'rows_per_partition', v_rows / greatest(v_partitions, 1),
+        'index_bytes', v_bytes,
+        'indexdef', v_indexdef,
+        'vector_version', (select extversion from pg_extension where extname = 'vector')
+    );
+end;
+$$;
+
+-- Replaces idx_chunks_embedding. IVFFlat lists default to pgvector's
+-- guidance for the rows each index (partition) holds: rows / 1000 up to 1M
+-- rows, sqrt(rows) beyond. Build it after loading data, not on an empty
+-- table: IVFFlat centroids come from the rows present at build time. Takes
+-- an exclusive lock on chunks while it runs (ingestion waits; reads of
+-- other tables don't).
+create or replace function rebuild_chunk_index(
+    p_method text,
+    p_lists int default null,
+    p_m int default 16,
+    p_ef_construction int default 64,
+    p_maintenance_work_mem text default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_rows bigint;
+    v_partitions int;
+    v_lists int;
+begin
+    if p_method not in ('ivfflat', 'hnsw') then
+        raise exception 'Unknown index method: % (expected ivfflat or hnsw)', p_method;
+    end if;
+
+    perform set_config('statement_timeout', '0', true);
+    if p_maintenance_work_mem is not null then
+        perform set_config('maintenance_work_mem', p_maintenance_work_mem, true);
+    end if;
+
+    select count(*) into v_rows from public.chunks where embedding is not null;
+    select greatest(count(*), 1) into v_partitions
+    from pg_inherits where inhparent = 'public.chunks'::regclass;
+
+    drop index if exists public.idx_chunks_embedding;
+    if p_method = 'ivfflat' then
+        v_lists := coalesce(
+            p_lists,
+            greatest(
+                10,
+                case
+                    when v_rows / v_partitions <= 1000000 then v_rows / v_partitions / 1000
+                    else sqrt(v_rows / v_partitions)::int
+                end
+            )
+        );
+        execute format(
+            'create index idx_chunks_embedding on public.chunks '
+            'using ivfflat (embedding vector_cosine_ops) with (lists = %s)',
+            v_lists
+        );
+    else
+        execute format(
+            'create index idx_chunks_embedding on public.chunks '
+            'using hnsw (embedding vector_cosine_ops) with (m = %s, ef_construction = %s)',
+            p_m, p_ef_construction
+        );
+    end if;
+
+    -- Measurements against the old index no longer apply
+    delete from public.vector_index_calibration where true;
+    analyze public.chunks;
+    return chunk_index_status();
+end;
+$$;
+
+-- Sets the index search depth for the rest of the transaction (one RPC).
+-- On pgvector 0.8+ also enables iterative index scans, so a filtered scan
+-- keeps walking the index until enough of this user's rows are found
+-- instead of returning whatever survived the filter from the first pass.
+create or replace function set_vector_search(p_probes int, p_ef_search int)
+returns void
+language plpgsql
+as $$
+begin
+    if p_probes is not null then
+        perform set_config('ivfflat.probes', p_probes::text, true);
+    end if;
+    if p_ef_search is not null then
+        perform set_config('hnsw.ef_search', p_ef_search::text, true);
+    end if;
+    if (select string_to_array(extversion, '.')::int[] >= array[0, 8]
+        from pg_extension where extname = 'vector') then
+        perform set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+        perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    end if;
+end;
+$$;
+
+-- Nearest chunks of one user by cosine distance. Users with at most
+-- exact_search_max_rows chunks are searched exactly: the materialized CTE
+-- keeps the planner off the ANN index, whose global clusters/graph would
+-- mostly return other tenants' rows. Larger users go through the index
+-- with the given probes / ef_search.
+create or replace function nearest_chunks(
+    query_embedding vector(1536),
+    filter_user_id uuid,
+    match_count int,
+    min_similarity float,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0
+)
+returns table (id uuid, distance float)
+language plpgsql
+as $$
+begin
+    if exact_search_max_rows > 0 and (
+        select count(*) from (
+            select 1 from public.chunks c
+            where c.user_id = filter_user_id
+            limit exact_search_max_rows + 1
+        ) s
+    ) <= exact_search_max_rows then
+        return query
+        with mine as materialized (
+            select c.id, c.embedding <=> query_embedding as distance
+            from public.chunks c
+            where c.user_id = filter_user_id
+        )
+        select m.id, m.distance
+        from mine m
+        where m.distance <= 1 - min_similarity
+        order by m.distance
+        limit match_count;
+        return;
+    end if;
+
+    perform set_vector_search(probes, ef_search);
+    -- Iterative scans return rows in roughly distance order; re-sort the page
+    return query
+    with candidates as materialized (
+        select c.id, c.embedding <=> query_embedding as distance
+        from public.chunks c
+        where c.user_id = filter_user_id
+            and c.embedding <=> query_embedding <= 1 - min_similarity
+        order by c.embedding <=> query_embedding
+        limit match_count
+    )
+    select cd.id, cd.distance
+    from candidates cd
+    order by cd.distance;
+end;
+$$;
+
+-- New search parameters; drop the old signatures so PostgREST doesn't see
+-- two overloads for the same named arguments
+drop function if exists match_chunks(vector, int, uuid, float);
+drop function if exists hybrid_match_chunks(text, vector, int, uuid, float, float, float, int, int);
+
+create or replace function match_chunks(
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter_user_id uuid default null,
+    min_similarity float default 0.7,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0
+)
+returns table (
+    id uuid,
+    document_id uuid,
+    content text,
+    chunk_index int,
+    metadata jsonb,
+    similarity float
+)
+language sql
+as $$
+    select
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        c.metadata,
+        1 - n.distance as similarity
+    from nearest_chunks(
+        query_embedding, filter_user_id, match_count, min_similarity,
+        probes, ef_search, exact_search_max_rows
+    ) n
+    join public.chunks c on c.id = n.id
+    order by n.distance;
+$$;
+
+create or replace function hybrid_match_chunks(
+    query_text text,
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter_user_id uuid default null,
+    min_similarity float default 0.3,
+    full_text_weight float default 1.0,
+    semantic_weight float default 1.0,
+    rrf_k int default 60,
+    candidate_count int default 50,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0
+)
+returns table (
+    id uuid,
+    document_id uuid,
+    content text,
+    chunk_index int,
+    metadata jsonb,
+    similarity float,
+    score float
+)
+language sql
+as $$
+    with full_text as (
+        select
+            c.id,
+            row_number() over (
+                order by ts_rank_cd(c.fts, websearch_to_tsquery('english', query_text)) desc
+            ) as rank_ix
+        from public.chunks c
+        where c.user_id = filter_user_id
+            and c.fts @@ websearch_to_tsquery('english', query_text)
+        order by rank_ix
+        limit candidate_count
+    ),
+    semantic as (
+        select
+            n.id,
+            row_number() over (order by n.distance) as rank_ix
+        from nearest_chunks(
+            query_embedding, filter_user_id, candidate_count, min_similarity,
+            probes, ef_search, exact_search_max_rows
+        ) n
+    ),
+    fused as (
+        select
+            coalesce(ft.id, s.id) as id,
+            coalesce(full_text_weight / (rrf_k + ft.rank_ix), 0.0)
+                + coalesce(semantic_weight / (rrf_k + s.rank_ix), 0.0) as score
+        from full_text ft
+        full outer join semantic s on ft.id = s.id
+    )
+    select
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        c.metadata,
+        1 - (c.embedding <=> query_embedding) as similarity,
+        f.score
+    from fused f
+    join public.chunks c on c.id = f.id
+    order by f.score desc
+    limit match_count;
+$$;
+
+-- Optional: turn chunks into a table hash-partitioned on user_id with
+-- p_partitions partitions. Each user's rows then live in one partition, so
+-- the planner prunes to it and every partition gets its own, smaller
+-- embedding index. Copies all rows and holds an exclusive lock throughout:
+-- run it in a maintenance window. The primary key becomes (id, user_id).
+create or replace function partition_chunks_by_user(p_partitions int)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_method text;
+    v_columns text;
+    i int;
+begin
+    if p_partitions < 2 then
+        raise exception 'partition_chunks_by_user needs at least 2 partitions';
+    end if;
+    if (select relkind from pg_class where oid = 'public.chunks'::regclass) = 'p' then
+        raise exception 'public.chunks is already partitioned';
+    end if;
+
+    perform set_config('statement_timeout', '0', true);
+    lock table public.chunks in access exclusive mode;
+    v_method := coalesce(chunk_index_status() ->> 'method', 'ivfflat');
+
+    alter table public.chunks rename to chunks_unpartitioned;
+
+    create table public.chunks (
+        like public.chunks_unpartitioned including defaults including generated,
+        primary key (id, user_id),
+        foreign key (document_id) references public.documents(id) on delete cascade,
+        foreign key (user_id) references auth.users(id) on delete cascade
+    ) partition by hash (user_id);
+
+    for i in 0 .. p_partitions - 1 loop
+        execute format(
+            'create table public.chunks_p%s partition of public.chunks '
+            'for values with (modulus %s, remainder %s)',
+            i, p_partitions, i
+        );
+    end loop;
+
+    -- Generated columns (fts) are recomputed, not copied
+    select string_agg(quote_ident(attname), ', ' order by attnum) into v_columns
+    from pg_attribute
+    where attrelid = 'public.chunks_unpartitioned'::regclass
+        and attnum > 0 and not attisdropped and attgenerated = '';
+    execute format(
+        'insert into public.chunks (%s) select %s from public.chunks_unpartitioned',
+        v_columns, v_columns
+    );
+    drop table public.chunks_unpartitioned;
+
+    create index idx_chunks_document_id on public.chunks(document_id);
+    create index idx_chunks_user_id on public.chunks(user_id);
+    create index idx_chunks_fts on public.chunks using gin (fts);
+
+    alter table public.chunks enable row level security;
+    create policy "Users can view their own chunks"
+        on public.chunks for select using (auth.uid() = user_id);
+    create policy "Users can create their own chunks"
+        on public.chunks for insert with check (auth.uid() = user_id);
+    create policy "Users can delete their own chunks"
+        on public.chunks for delete using (auth.uid() = user_id);
+
+    return rebuild_chunk_index(v_method);
+end;
+$$;
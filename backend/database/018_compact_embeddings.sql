@@ -0,0 +1,421 @@
+-- Compact embeddings: optional halfvec storage and a binary-quantized coarse
+-- search with exact rescoring (needs pgvector 0.7+)
+-- Run this in Supabase SQL Editor
+--
+-- Opt in with `python -m app.manage_index compact --to halfvec` (converts
+-- stored rows and rebuilds the index) plus EMBEDDING_STORAGE=halfvec so
+-- new chunks are written to embedding_half. For the binary coarse pass,
+-- rebuild with `--method binary` and set RETRIEVAL_RESCORE_FACTOR.
+
+-- Half-precision copy of `embedding`; a chunk has one or the other
+alter table public.chunks
+    add column embedding_half halfvec(1536);
+
+-- Status now reports the indexed column and quantization; method is
+-- 'binary' for an HNSW index over binary_quantize(column)
+create or replace function chunk_index_status()
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+    v_method text;
+    v_indexdef text;
+    v_options text[];
+    v_partitions int;
+    v_rows bigint;
+    v_bytes bigint;
+begin
+    select am.amname, pg_get_indexdef(i.indexrelid), ic.reloptions
+    into v_method, v_indexdef, v_options
+    from pg_index i
+    join pg_class ic on ic.oid = i.indexrelid
+    join pg_am am on am.oid = ic.relam
+    where i.indrelid = 'public.chunks'::regclass
+        and am.amname in ('ivfflat', 'hnsw')
+    limit 1;
+
+    select count(*) into v_partitions
+    from pg_inherits where inhparent = 'public.chunks'::regclass;
+
+    -- Planner estimates: exact counts would scan the table
+    select greatest(sum(c.reltuples), 0)::bigint into v_rows
+    from pg_class c
+    where c.oid = 'public.chunks'::regclass
+        or c.oid in (select inhrelid from pg_inherits where inhparent = 'public.chunks'::regclass);
+
+    select coalesce(sum(pg_relation_size(i.indexrelid)), 0) into v_bytes
+    from pg_index i
+    join pg_class ic on ic.oid = i.indexrelid
+    join pg_am am on am.oid = ic.relam
+    where am.amname in ('ivfflat', 'hnsw')
+        and (i.indrelid = 'public.chunks'::regclass
+            or i.indrelid in (select inhrelid from pg_inherits where inhparent = 'public.chunks'::regclass));
+
+    return jsonb_build_object(
+        'method', case when v_indexdef like '%binary_quantize%' then 'binary' else v_method end,
+        'column', case
+            when v_indexdef like '%embedding_half%' then 'embedding_half'
+            when v_indexdef is not null then 'embedding'
+        end,
+        'lists', (select split_part(o, '=', 2)::int from unnest(v_options) o where o like 'lists=%'),
+        'm', (select split_part(o, '=', 2)::int from unnest(v_options) o where o like 'm=%'),
+        'ef_construction', (select split_part(o, '=', 2)::int from unnest(v_options) o where o like 'ef_construction=%'),
+        'rows', v_rows,
+        'partitions', v_partitions,
+        'rows_per_partition', v_rows / greatest(v_partitions, 1),
+        'index_bytes', v_bytes,
+        'indexdef', v_indexdef,
+        'vector_version', (select extversion from pg_extension where extname = 'vector')
+    );
+end;
+$$;
+
+-- p_method 'binary' builds HNSW over binary_quantize(column) (1 bit per
+-- dimension, Hamming distance) for the coarse pass of a rescored search.
+-- p_column defaults to whichever column holds embeddings.
+drop function if exists rebuild_chunk_index(text, int, int, int, text);
+
+create or replace function rebuild_chunk_index(
+    p_method text,
+    p_lists int default null,
+    p_m int default 16,
+    p_ef_construction int default 64,
+    p_maintenance_work_mem text default null,
+    p_column text default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_column text;
+    v_ops text;
+    v_rows bigint;
+    v_partitions int;
+    v_lists int;
+begin
+    if p_method not in ('ivfflat', 'hnsw', 'binary') then
+        raise exception 'Unknown index method: % (expected ivfflat, hnsw or binary)', p_method;
+    end if;
+    v_column := coalesce(
+        p_column,
+        case when exists (select 1 from public.chunks where embedding_half is not null)
+            then 'embedding_half' else 'embedding' end
+    );
+    if v_column not in ('embedding', 'embedding_half') then
+        raise exception 'Unknown embedding column: %', v_column;
+    end if;
+    v_ops := case when v_column = 'embedding' then 'vector_cosine_ops' else 'halfvec_cosine_ops' end;
+
+    perform set_config('statement_timeout', '0', true);
+    if p_maintenance_work_mem is not null then
+        perform set_config('maintenance_work_mem', p_maintenance_work_mem, true);
+    end if;
+
+    execute format('select count(*) from public.chunks where %I is not null', v_column) into v_rows;
+    select greatest(count(*), 1) into v_partitions
+    from pg_inherits where inhparent = 'public.chunks'::regclass;
+
+    drop index if exists public.idx_chunks_embedding;
+    if p_method = 'ivfflat' then
+        v_lists := coalesce(
+            p_lists,
+            greatest(
+                10,
+                case
+                    when v_rows / v_partitions <= 1000000 then v_rows / v_partitions / 1000
+                    else sqrt(v_rows / v_partitions)::int
+                end
+            )
+        );
+        execute format(
+            'create index idx_chunks_embedding on public.chunks '
+            'using ivfflat (%I %s) with (lists = %s)',
+            v_column, v_ops, v_lists
+        );
+    elsif p_method = 'hnsw' then
+        execute format(
+            'create index idx_chunks_embedding on public.chunks '
+            'using hnsw (%I %s) with (m = %s, ef_construction = %s)',
+            v_column, v_ops, p_m, p_ef_construction
+        );
+    else
+        execute format(
+            'create index idx_chunks_embedding on public.chunks '
+            'using hnsw ((binary_quantize(%I)::bit(1536)) bit_hamming_ops) '
+            'with (m = %s, ef_construction = %s)',
+            v_column, p_m, p_ef_construction
+        );
+    end if;
+
+    -- Measurements against the old index no longer apply
+    delete from public.vector_index_calibration where true;
+    analyze public.chunks;
+    return chunk_index_status();
+end;
+$$;
+
+-- Moves up to p_batch chunks' embeddings to halfvec ('halfvec') or back to
+-- full precision ('vector'). Returns rows converted; call until it returns 0.
+create or replace function convert_chunk_embeddings(p_to text, p_batch int default 5000)
+returns int
+language plpgsql
+as $$
+declare
+    v_count int;
+begin
+    if p_to = 'halfvec' then
+        update public.chunks c
+        set embedding_half = c.embedding::halfvec(1536), embedding = null
+        where c.id in (select id from public.chunks where embedding is not null limit p_batch);
+    elsif p_to = 'vector' then
+        update public.chunks c
+        set embedding = c.embedding_half::vector(1536), embedding_half = null
+        where c.id in (select id from public.chunks where embedding_half is not null limit p_batch);
+    else
+        raise exception 'Unknown embedding storage: % (expected halfvec or vector)', p_to;
+    end if;
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
+
+-- Average stored bytes per chunk, per embedding column (optionally for one
+-- document), plus table and embedding index totals
+create or replace function chunk_storage_stats(p_document_id uuid default null)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'rows', count(*),
+        'embedding_rows', count(c.embedding),
+        'embedding_half_rows', count(c.embedding_half),
+        'embedding_bytes', avg(pg_column_size(c.embedding)),
+        'embedding_half_bytes', avg(pg_column_size(c.embedding_half)),
+        'row_bytes', avg(pg_column_size(c.*)),
+        'table_bytes', (
+            select sum(pg_total_relation_size(r.oid))
+            from pg_class r
+            where r.oid = 'public.chunks'::regclass
+                or r.oid in (select inhrelid from pg_inherits where inhparent = 'public.chunks'::regclass)
+        ),
+        'index_bytes', chunk_index_status() -> 'index_bytes'
+    )
+    from public.chunks c
+    where p_document_id is null or c.document_id = p_document_id;
+$$;
+
+-- Nearest chunks now search either embedding column. With rescore_factor
+-- > 0 the index pass orders by Hamming distance between binary-quantized
+-- vectors (the 'binary' index), keeps match_count * rescore_factor
+-- candidates and ranks those by exact cosine distance on the stored vectors.
+drop function if exists nearest_chunks(vector, uuid, int, float, int, int, int);
+
+create or replace function nearest_chunks(
+    query_embedding vector(1536),
+    filter_user_id uuid,
+    match_count int,
+    min_similarity float,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0,
+    embedding_column text default 'embedding',
+    rescore_factor int default 0
+)
+returns table (id uuid, distance float)
+language plpgsql
+as $$
+declare
+    v_type text;
+begin
+    if embedding_column not in ('embedding', 'embedding_half') then
+        raise exception 'Unknown embedding column: %', embedding_column;
+    end if;
+    v_type := case when embedding_column = 'embedding' then 'vector(1536)' else 'halfvec(1536)' end;
+
+    if exact_search_max_rows > 0 and (
+        select count(*) from (
+            select 1 from public.chunks c
+            where c.user_id = filter_user_id
+            limit exact_search_max_rows + 1
+        ) s
+    ) <= exact_search_max_rows then
+        return query execute format(
+            $q$
+            with mine as materialized (
+                select c.id, c.%1$I <=> $1::%2$s as distance
+                from public.chunks c
+                where c.user_id = $2 and c.%1$I is not null
+            )
+            select m.id, m.distance
+            from mine m
+            where m.distance <= 1 - $3
+            order by m.distance
+            limit $4
+            $q$,
+            embedding_column, v_type
+        ) using query_embedding, filter_user_id, min_similarity, match_count;
+        return;
+    end if;
+
+    perform set_vector_search(probes, ef_search);
+    if rescore_factor > 0 then
+        return query execute format(
+            $q$
+            with coarse as materialized (
+                select c.id, c.%1$I as embedding
+                from public.chunks c
+                where c.user_id = $2
+                order by binary_quantize(c.%1$I)::bit(1536) <~> binary_quantize($1::%2$s)::bit(1536)
+                limit $4 * $5
+            ),
+            rescored as (
+                select co.id, co.embedding <=> $1::%2$s as distance
+                from coarse co
+            )
+            select r.id, r.distance
+            from rescored r
+            where r.distance <= 1 - $3
+            order by r.distance
+            limit $4
+            $q$,
+            embedding_column, v_type
+        ) using query_embedding, filter_user_id, min_similarity, match_count, rescore_factor;
+        return;
+    end if;
+
+    -- Iterative scans return rows in roughly distance order; re-sort the page
+    return query execute format(
+        $q$
+        with candidates as materialized (
+            select c.id, c.%1$I <=> $1::%2$s as distance
+            from public.chunks c
+            where c.user_id = $2
+                and c.%1$I <=> $1::%2$s <= 1 - $3
+            order by c.%1$I <=> $1::%2$s
+            limit $4
+        )
+        select cd.id, cd.distance
+        from candidates cd
+        order by cd.distance
+        $q$,
+        embedding_column, v_type
+    ) using query_embedding, filter_user_id, min_similarity, match_count;
+end;
+$$;
+
+drop function if exists match_chunks(vector, int, uuid, float, int, int, int);
+drop function if exists hybrid_match_chunks(text, vector, int, uuid, float, float, float, int, int, int, int, int);
+
+create or replace function match_chunks(
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter_user_id uuid default null,
+    min_similarity float default 0.7,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0,
+    embedding_column text default 'embedding',
+    rescore_factor int default 0
+)
+returns table (
+    id uuid,
+    document_id uuid,
+    content text,
+    chunk_index int,
+    metadata jsonb,
+    similarity float
+)
+language sql
+as $$
+    select
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        c.metadata,
+        1 - n.distance as similarity
+    from nearest_chunks(
+        query_embedding, filter_user_id, match_count, min_similarity,
+        probes, ef_search, exact_search_max_rows, embedding_column, rescore_factor
+    ) n
+    join public.chunks c on c.id = n.id
+    order by n.distance;
+$$;
+
+create or replace function hybrid_match_chunks(
+    query_text text,
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter_user_id uuid default null,
+    min_similarity float default 0.3,
+    full_text_weight float default 1.0,
+    semantic_weight float default 1.0,
+    rrf_k int default 60,
+    candidate_count int default 50,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0,
+    embedding_column text default 'embedding',
+    rescore_factor int default 0
+)
+returns table (
+    id uuid,
+    document_id uuid,
+    content text,
+    chunk_index int,
+    metadata jsonb,
+    similarity float,
+    score float
+)
+language sql
+as $$
+    with full_text as (
+        select
+            c.id,
+            row_number() over (
+                order by ts_rank_cd(c.fts, websearch_to_tsquery('english', query_text)) desc
+            ) as rank_ix
+        from public.chunks c
+        where c.user_id = filter_user_id
+            and c.fts @@ websearch_to_tsquery('english', query_text)
+        order by rank_ix
+        limit candidate_count
+    ),
+    semantic as (
+        select
+            n.id,
+            n.distance,
+            row_number() over (order by n.distance) as rank_ix
+        from nearest_chunks(
+            query_embedding, filter_user_id, candidate_count, min_similarity,
+            probes, ef_search, exact_search_max_rows, embedding_column, rescore_factor
+        ) n
+    ),
+    fused as (
+        select
+            coalesce(ft.id, s.id) as id,
+            s.distance,
+            coalesce(full_text_weight / (rrf_k + ft.rank_ix), 0.0)
+                + coalesce(semantic_weight / (rrf_k + s.rank_ix), 0.0) as score
+        from full_text ft
+        full outer join semantic s on ft.id = s.id
+    )
+    select
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        c.metadata,
+        1 - coalesce(
+            f.distance,
+            c.embedding <=> query_embedding,
+            c.embedding_half <=> query_embedding::halfvec(1536)
+        ) as similarity,
+        f.score
+    from fused f
+    join public.chunks c on c.id = f.id
+    order by f.score desc
+    limit match_count;
+$$;
@@ -0,0 +1,373 @@
+-- Document metadata (title, type, date, tags) extracted at ingestion and
+-- metadata / document filters on match_chunks and hybrid_match_chunks
+-- Run this in Supabase SQL Editor
+--
+-- Ingestion stores the extracted fields on the document and merges them into
+-- every chunk's metadata ({"filename", "title", "type", "date", "tags"}), so
+-- filters are predicates on chunks alone: document_id (btree
+-- idx_chunks_document_id), metadata containment (GIN) and the document date
+-- (btree on metadata->>'date', ISO yyyy-mm-dd text).
+
+alter table public.documents
+    add column metadata jsonb not null default '{}';
+
+create index idx_chunks_metadata on public.chunks using gin (metadata jsonb_path_ops);
+create index idx_chunks_user_date on public.chunks(user_id, (metadata ->> 'date'));
+
+-- Store a document's extracted metadata and merge it into its chunks.
+-- Returns the number of chunks updated.
+create or replace function set_document_metadata(p_document_id uuid, p_metadata jsonb)
+returns int
+language plpgsql
+as $$
+declare
+    v_filename text;
+    v_count int;
+begin
+    update public.documents
+    set metadata = p_metadata
+    where id = p_document_id
+    returning filename into v_filename;
+
+    update public.chunks c
+    set metadata = jsonb_build_object('filename', v_filename) || p_metadata
+    where c.document_id = p_document_id
+        and c.metadata is distinct from jsonb_build_object('filename', v_filename) || p_metadata;
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
+
+-- Nearest chunks of one user among those matching the filters (all optional):
+--   filter_document_ids  chunks of these documents only
+--   filter_metadata      chunk metadata contains this object (jsonb @>),
+--                        e.g. {"type": "invoice"} or {"tags": ["q3"]}
+--   filter_date_from/to  document date within the range (inclusive)
+-- The exact-search shortcut now counts the filtered rows: a filter narrowing
+-- a large tenant to at most exact_search_max_rows chunks is answered by an
+-- exact scan over the indexed candidate set instead of the ANN index, whose
+-- post-filtered results would miss most matches.
+drop function if exists nearest_chunks(vector, uuid, int, float, int, int, int, text, int);
+
+create or replace function nearest_chunks(
+    query_embedding vector(1536),
+    filter_user_id uuid,
+    match_count int,
+    min_similarity float,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0,
+    embedding_column text default 'embedding',
+    rescore_factor int default 0,
+    filter_document_ids uuid[] default null,
+    filter_metadata jsonb default null,
+    filter_date_from date default null,
+    filter_date_to date default null
+)
+returns table (id uuid, distance float)
+language plpgsql
+as $$
+declare
+    v_type text;
+    v_filter text := '';
+    v_date_from text := to_char(filter_date_from, 'YYYY-MM-DD');
+    v_date_to text := to_char(filter_date_to, 'YYYY-MM-DD');
+    v_rows int;
+begin
+    if embedding_column not in ('embedding', 'embedding_half') then
+        raise exception 'Unknown embedding column: %', embedding_column;
+    end if;
+    v_type := case when embedding_column = 'embedding' then 'vector(1536)' else 'halfvec(1536)' end;
+
+    -- Parameters of every query below: $1 query, $2 user, $3 min similarity,
+    -- $4 match count, $5 rescore factor, $6-$9 filters, $10 exact row limit
+    if filter_document_ids is not null then
+        v_filter := v_filter || ' and c.document_id = any($6)';
+    end if;
+    if filter_metadata is not null then
+        v_filter := v_filter || ' and c.metadata @> $7';
+    end if;
+    if v_date_from is not null then
+        v_filter := v_filter || ' and c.metadata ->> ''date'' >= $8';
+    end if;
+    if v_date_to is not null then
+        v_filter := v_filter || ' and c.metadata ->> ''date'' <= $9';
+    end if;
+
+    if exact_search_max_rows > 0 then
+        execute format(
+            'select count(*) from (select 1 from public.chunks c where c.user_id = $2 %s limit $10) s',
+            v_filter
+        ) into v_rows
+        using query_embedding, filter_user_id, min_similarity, match_count, rescore_factor,
+            filter_document_ids, filter_metadata, v_date_from, v_date_to, exact_search_max_rows + 1;
+    end if;
+
+    if exact_search_max_rows > 0 and v_rows <= exact_search_max_rows then
+        return query execute format(
+            $q$
+            with mine as materialized (
+                select c.id, c.%1$I <=> $1::%2$s as distance
+                from public.chunks c
+                where c.user_id = $2 and c.%1$I is not null %3$s
+            )
+            select m.id, m.distance
+            from mine m
+            where m.distance <= 1 - $3
+            order by m.distance
+            limit $4
+            $q$,
+            embedding_column, v_type, v_filter
+        ) using query_embedding, filter_user_id, min_similarity, match_count, rescore_factor,
+            filter_document_ids, filter_metadata, v_date_from, v_date_to, exact_search_max_rows + 1;
+        return;
+    end if;
+
+    perform set_vector_search(probes, ef_search);
+    if rescore_factor > 0 then
+        return query execute format(
+            $q$
+            with coarse as materialized (
+                select c.id, c.%1$I as embedding
+                from public.chunks c
+                where c.user_id = $2 %3$s
+                order by binary_quantize(c.%1$I)::bit(1536) <~> binary_quantize($1::%2$s)::bit(1536)
+                limit $4 * $5
+            ),
+            rescored as (
+                select co.id, co.embedding <=> $1::%2$s as distance
+                from coarse co
+            )
+            select r.id, r.distance
+            from rescored r
+            where r.distance <= 1 - $3
+            order by r.distance
+            limit $4
+            $q$,
+            embedding_column, v_type, v_filter
+        ) using query_embedding, filter_user_id, min_similarity, match_count, rescore_factor,
+            filter_document_ids, filter_metadata, v_date_from, v_date_to, exact_search_max_rows + 1;
+        return;
+    end if;
+
+    -- Iterative scans return rows in roughly distance order; re-sort the page
+    return query execute format(
+        $q$
+        with candidates as materialized (
+            select c.id, c.%1$I <=> $1::%2$s as distance
+            from public.chunks c
+            where c.user_id = $2
+                and c.%1$I <=> $1::%2$s <= 1 - $3 %3$s
+            order by c.%1$I <=> $1::%2$s
+            limit $4
+        )
+        select cd.id, cd.distance
+        from candidates cd
+        order by cd.distance
+        $q$,
+        embedding_column, v_type, v_filter
+    ) using query_embedding, filter_user_id, min_similarity, match_count, rescore_factor,
+        filter_document_ids, filter_metadata, v_date_from, v_date_to, exact_search_max_rows + 1;
+end;
+$$;
+
+drop function if exists match_chunks(vector, int, uuid, float, int, int, int, text, int);
+drop function if exists hybrid_match_chunks(
+    text, vector, int, uuid, float, float, float, int, int, int, int, int, text, int
+);
+
+create or replace function match_chunks(
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter_user_id uuid default null,
+    min_similarity float default 0.7,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0,
+    embedding_column text default 'embedding',
+    rescore_factor int default 0,
+    filter_document_ids uuid[] default null,
+    filter_metadata jsonb default null,
+    filter_date_from date default null,
+    filter_date_to date default null
+)
+returns table (
+    id uuid,
+    document_id uuid,
+    content text,
+    chunk_index int,
+    metadata jsonb,
+    similarity float
+)
+language sql
+as $$
+    select
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        c.metadata,
+        1 - n.distance as similarity
+    from nearest_chunks(
+        query_embedding, filter_user_id, match_count, min_similarity,
+        probes, ef_search, exact_search_max_rows, embedding_column, rescore_factor,
+        filter_document_ids, filter_metadata, filter_date_from, filter_date_to
+    ) n
+    join public.chunks c on c.id = n.id
+    order by n.distance;
+$$;
+
+create or replace function hybrid_match_chunks(
+    query_text text,
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter_user_id uuid default null,
+    min_similarity float default 0.3,
+    full_text_weight float default 1.0,
+    semantic_weight float default 1.0,
+    rrf_k int default 60,
+    candidate_count int default 50,
+    probes int default null,
+    ef_search int default null,
+    exact_search_max_rows int default 0,
+    embedding_column text default 'embedding',
+    rescore_factor int default 0,
+    filter_document_ids uuid[] default null,
+    filter_metadata jsonb default null,
+    filter_date_from date default null,
+    filter_date_to date default null
+)
+returns table (
+    id uuid,
+    document_id uuid,
+    content text,
+    chunk_index int,
+    metadata jsonb,
+    similarity float,
+    score float
+)
+language sql
+as $$
+    with full_text as (
+        select
+            c.id,
+            row_number() over (
+                order by ts_rank_cd(c.fts, websearch_to_tsquery('english', query_text)) desc
+            ) as rank_ix
+        from public.chunks c
+        where c.user_id = filter_user_id
+            and c.fts @@ websearch_to_tsquery('english', query_text)
+            and (filter_document_ids is null or c.document_id = any(filter_document_ids))
+            and (filter_metadata is null or c.metadata @> filter_metadata)
+            and (filter_date_from is null
+                or c.metadata ->> 'date' >= to_char(filter_date_from, 'YYYY-MM-DD'))
+            and (filter_date_to is null
+                or c.metadata ->> 'date' <= to_char(filter_date_to, 'YYYY-MM-DD'))
+        order by rank_ix
+        limit candidate_count
+    ),
+    semantic as (
+        select
+            n.id,
+            n.distance,
+            row_number() over (order by n.distance) as rank_ix
+        from nearest_chunks(
+            query_embedding, filter_user_id, candidate_count, min_similarity,
+            probes, ef_search, exact_search_max_rows, embedding_column, rescore_factor,
+            filter_document_ids, filter_metadata, filter_date_from, filter_date_to
+        ) n
+    ),
+    fused as (
+        select
+            coalesce(ft.id, s.id) as id,
+            s.distance,
+            coalesce(full_text_weight / (rrf_k + ft.rank_ix), 0.0)
+                + coalesce(semantic_weight / (rrf_k + s.rank_ix), 0.0) as score
+        from full_text ft
+        full outer join semantic s on ft.id = s.id
+    )
+    select
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        c.metadata,
+        1 - coalesce(
+            f.distance,
+            c.embedding <=> query_embedding,
+            c.embedding_half <=> query_embedding::halfvec(1536)
+        ) as similarity,
+        f.score
+    from fused f
+    join public.chunks c on c.id = f.id
+    order by f.score desc
+    limit match_count;
+$$;
+
+-- partition_chunks_by_user (017) recreates the chunk indexes on the new
+-- partitioned table; include the metadata indexes
+create or replace function partition_chunks_by_user(p_partitions int)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_method text;
+    v_columns text;
+    i int;
+begin
+    if p_partitions < 2 then
+        raise exception 'partition_chunks_by_user needs at least 2 partitions';
+    end if;
+    if (select relkind from pg_class where oid = 'public.chunks'::regclass) = 'p' then
+        raise exception 'public.chunks is already partitioned';
+    end if;
+
+    perform set_config('statement_timeout', '0', true);
+    lock table public.chunks in access exclusive mode;
+    v_method := coalesce(chunk_index_status() ->> 'method', 'ivfflat');
+
+    alter table public.chunks rename to chunks_unpartitioned;
+
+    create table public.chunks (
+        like public.chunks_unpartitioned including defaults including generated,
+        primary key (id, user_id),
+        foreign key (document_id) references public.documents(id) on delete cascade,
+        foreign key (user_id) references auth.users(id) on delete cascade
+    ) partition by hash (user_id);
+
+    for i in 0 .. p_partitions - 1 loop
+        execute format(
+            'create table public.chunks_p%s partition of public.chunks '
+            'for values with (modulus %s, remainder %s)',
+            i, p_partitions, i
+        );
+    end loop;
+
+    -- Generated columns (fts) are recomputed, not copied
+    select string_agg(quote_ident(attname), ', ' order by attnum) into v_columns
+    from pg_attribute
+    where attrelid = 'public.chunks_unpartitioned'::regclass
+        and attnum > 0 and not attisdropped and attgenerated = '';
+    execute format(
+        'insert into public.chunks (%s) select %s from public.chunks_unpartitioned',
+        v_columns, v_columns
+    );
+    drop table public.chunks_unpartitioned;
+
+    create index idx_chunks_document_id on public.chunks(document_id);
+    create index idx_chunks_user_id on public.chunks(user_id);
+    create index idx_chunks_fts on public.chunks using gin (fts);
+    create index idx_chunks_metadata on public.chunks using gin (metadata jsonb_path_ops);
+    create index idx_chunks_user_date on public.chunks(user_id, (metadata ->> 'date'));
+
+    alter table public.chunks enable row level security;
+    create policy "Users can view their own chunks"
+        on public.chunks for select using (auth.uid() = user_id);
+    create policy "Users can create their own chunks"
+        on public.chunks for insert with check (auth.uid() = user_id);
+    create policy "Users can delete their own chunks"
+        on public.chunks for delete using (auth.uid() = user_id);
+
+    return rebuild_chunk_index(v_method);
+end;
+$$;
@@ -0,0 +1,83 @@
+-- Fair ingestion job claims: candidates are picked per user, so one user's
+-- bulk upload can't fill the candidate window and starve everyone else
+-- Run this in Supabase SQL Editor
+
+-- Runnable jobs of one user, oldest first (the per-user lateral scan below)
+create index idx_documents_job_queue_user on public.documents(user_id, next_attempt_at)
+    where status in ('pending', 'processing');
+
+-- Claim up to p_limit runnable jobs. Runnable = pending and due, or processing
+-- with an expired lease (worker died). Every user with runnable jobs
+-- contributes at most p_limit candidates (their oldest), locked with SKIP
+-- LOCKED so concurrent workers never claim the same row; candidates are then
+-- ordered round-robin across users (favouring users with the fewest jobs in
+-- flight) for per-user fairness.
+create or replace function claim_ingestion_jobs(
+    p_worker_id text,
+    p_limit int default 1,
+    p_lease_seconds int default 300
+)
+returns setof public.documents
+language plpgsql
+as $$
+begin
+    return query
+    with waiting_users as (
+        -- Users waiting longest first, bounded so a claim never locks more
+        -- than greatest(p_limit * 10, 50) users' worth of candidates
+        select d.user_id
+        from public.documents d
+        where (d.status = 'pending' and d.next_attempt_at <= now())
+            or (d.status = 'processing' and d.lease_expires_at < now())
+        group by d.user_id
+        order by min(d.next_attempt_at)
+        limit greatest(p_limit * 10, 50)
+    ),
+    candidates as (
+        select c.id, c.user_id, c.next_attempt_at
+        from waiting_users u
+        cross join lateral (
+            select d.id, d.user_id, d.next_attempt_at
+            from public.documents d
+            where d.user_id = u.user_id
+                and (
+                    (d.status = 'pending' and d.next_attempt_at <= now())
+                    or (d.status = 'processing' and d.lease_expires_at < now())
+                )
+            order by d.next_attempt_at
+            limit p_limit
+            for update skip locked
+        ) c
+    ),
+    ranked as (
+        select
+            c.id,
+            c.next_attempt_at,
+            row_number() over (partition by c.user_id order by c.next_attempt_at) as user_rank,
+            (
+                select count(*)
+                from public.documents a
+                where a.user_id = c.user_id
+                    and a.status = 'processing'
+                    and a.lease_expires_at >= now()
+            ) as in_flight
+        from candidates c
+    ),
+    chosen as (
+        select r.id
+        from ranked r
+        order by r.user_rank, r.in_flight, r.next_attempt_at
+        limit p_limit
+    )
+    update public.documents d
+    set status = 'processing',
+        locked_by = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = now(),
+        attempts = d.attempts + 1,
+        error_message = null
+    from chosen
+    where d.id = chosen.id
+    returning d.*;
+end;
+$$;
@@ -0,0 +1,13 @@
+-- Private Realtime channels for backend-only broadcasts (DOCUMENT_EVENTS_CHANNEL,
+-- CACHE_INVALIDATION_CHANNEL)
+-- Run this in Supabase SQL Editor
+--
+-- The backend joins these channels as private channels with the service role,
+-- which bypasses RLS. Private channel access is authorized by RLS on
+-- realtime.messages: with it enabled and no policy for anon/authenticated,
+-- browsers holding the anon key or a user JWT can't join, read or send.
+-- Also turn off "Allow public access" under Realtime settings in the
+-- dashboard so a client can't join a public channel of the same name.
+-- Broadcast payloads are additionally HMAC-signed (app/services/broadcast.py).
+
+alter table realtime.messages enable row level security;
@@ -0,0 +1,94 @@
+-- Re-uploads no longer re-queue a document that is being ingested
+-- Run this in Supabase SQL Editor
+--
+-- Resetting a 'processing' row to 'pending' let a second worker claim it
+-- while the first kept inserting chunks until its heartbeat failed, leaving
+-- duplicate chunks. The upload routes now reject such re-uploads (the single
+-- upload with 409, batches list the file as skipped); create_document_batch
+-- leaves processing rows untouched and returns them as "busy".
+--   p_documents: [{id, filename, storage_path, mime_type, file_size, content_hash}]
+-- Returns {"created", "updated" (+ old_storage_path, old_content_hash), "unchanged", "busy"}
+
+create or replace function create_document_batch(
+    p_user_id uuid,
+    p_batch_id uuid,
+    p_documents jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_result jsonb;
+begin
+    with incoming as (
+        select *
+        from jsonb_to_recordset(p_documents) as d(
+            id uuid,
+            filename text,
+            storage_path text,
+            mime_type text,
+            file_size bigint,
+            content_hash text
+        )
+    ),
+    latest as (
+        select distinct on (doc.filename)
+            doc.id, doc.filename, doc.storage_path, doc.content_hash, doc.status
+        from public.documents doc
+        join incoming i on i.filename = doc.filename
+        where doc.user_id = p_user_id
+        order by doc.filename, doc.created_at desc
+    ),
+    updated as (
+        update public.documents doc
+        set storage_path = i.storage_path,
+            mime_type = i.mime_type,
+            file_size = i.file_size,
+            content_hash = i.content_hash,
+            status = 'pending',
+            error_message = null,
+            attempts = 0,
+            next_attempt_at = now(),
+            locked_by = null,
+            lease_expires_at = null,
+            batch_id = p_batch_id
+        from latest l
+        join incoming i on i.filename = l.filename
+        where doc.id = l.id
+          and (l.content_hash is distinct from i.content_hash or l.status = 'failed')
+          and doc.status <> 'processing'  -- Re-checked on the locked row
+        returning doc.*, l.storage_path as old_storage_path, l.content_hash as old_content_hash
+    ),
+    inserted as (
+        insert into public.documents
+            (id, user_id, filename, storage_path, mime_type, file_size, content_hash, batch_id)
+        select i.id, p_user_id, i.filename, i.storage_path, i.mime_type, i.file_size, i.content_hash, p_batch_id
+        from incoming i
+        where not exists (select 1 from latest l where l.filename = i.filename)
+        returning *
+    ),
+    unchanged as (
+        select doc.*
+        from public.documents doc
+        join latest l on l.id = doc.id
+        join incoming i on i.filename = l.filename
+        where l.content_hash = i.content_hash and l.status <> 'failed'
+    ),
+    busy as (
+        select doc.*
+        from public.documents doc
+        join latest l on l.id = doc.id
+        join incoming i on i.filename = l.filename
+        where (l.content_hash is distinct from i.content_hash or l.status = 'failed')
+          and not exists (select 1 from updated u where u.id = l.id)
+    )
+    select jsonb_build_object(
+        'created', coalesce((select jsonb_agg(to_jsonb(x)) from inserted x), '[]'::jsonb),
+        'updated', coalesce((select jsonb_agg(to_jsonb(x)) from updated x), '[]'::jsonb),
+        'unchanged', coalesce((select jsonb_agg(to_jsonb(x)) from unchanged x), '[]'::jsonb),
+        'busy', coalesce((select jsonb_agg(to_jsonb(x)) from busy x), '[]'::jsonb)
+    ) into v_result;
+
+    return v_result;
+end;
+$$;
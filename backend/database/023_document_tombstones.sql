@@ -0,0 +1,59 @@
+-- Document tombstones: deletions for clients catching up after an event
+-- stream reconnect (GET /api/documents/deleted?since=...)
+-- Run this in Supabase SQL Editor
+--
+-- A trigger records every deleted document, whichever path deleted it, so
+-- the updated_since delta (which can't see removed rows) has a companion.
+-- Tombstones are kept for 30 days; a client further behind than that is told
+-- its list is incomplete and reloads it.
+
+create table public.document_tombstones (
+    document_id uuid primary key,
+    user_id uuid not null,  -- No foreign key: rows outlive the user's cascade delete
+    deleted_at timestamptz not null default now()
+);
+
+create index idx_document_tombstones_user on public.document_tombstones(user_id, deleted_at);
+
+-- Backend-only table: RLS on with no policies, so only the service role can access it
+alter table public.document_tombstones enable row level security;
+
+create or replace function record_document_tombstone()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.document_tombstones (document_id, user_id)
+    values (old.id, old.user_id)
+    on conflict (document_id) do update set deleted_at = now();
+    -- Prune this user's expired tombstones as we go
+    delete from public.document_tombstones
+    where user_id = old.user_id and deleted_at < now() - interval '30 days';
+    return old;
+end;
+$$;
+
+create trigger documents_tombstone
+    after delete on public.documents
+    for each row execute function record_document_tombstone();
+
+-- Ids of the user's documents deleted after p_since. "complete" is false when
+-- p_since is older than the tombstone retention, so some deletions may be
+-- missing and the client should reload its whole list instead.
+-- Returns {"document_ids": [uuid], "complete": bool}
+create or replace function deleted_documents_since(p_user_id uuid, p_since timestamptz)
+returns jsonb
+language sql
+stable
+as $$
+    select case
+        when p_since < now() - interval '30 days'
+            then jsonb_build_object('document_ids', '[]'::jsonb, 'complete', false)
+        else jsonb_build_object(
+            'document_ids', coalesce(jsonb_agg(t.document_id), '[]'::jsonb),
+            'complete', true
+        )
+    end
+    from public.document_tombstones t
+    where t.user_id = p_user_id and t.deleted_at > p_since;
+$$;
@@ -0,0 +1,134 @@
+-- Poison ingestion jobs: a document whose worker dies on every attempt (OOM,
+-- hard kill) is marked failed once attempts are exhausted instead of being
+-- reclaimed forever
+-- Run this in Supabase SQL Editor
+--
+-- Such a job never reaches fail_ingestion_job, so the attempts limit is now
+-- also applied where expired leases are picked up: claim_ingestion_jobs and
+-- recover_ingestion_jobs take p_max_attempts (INGESTION_MAX_ATTEMPTS).
+
+-- Signatures change; drop the old ones so PostgREST calls stay unambiguous
+drop function if exists claim_ingestion_jobs(text, int, int);
+drop function if exists recover_ingestion_jobs();
+
+-- Claim up to p_limit runnable jobs, as in 020_fair_job_claim.sql. Expired
+-- leases that already used p_max_attempts attempts are marked failed instead
+-- and returned too (status 'failed'), so the worker can report them.
+create or replace function claim_ingestion_jobs(
+    p_worker_id text,
+    p_limit int default 1,
+    p_lease_seconds int default 300,
+    p_max_attempts int default 3
+)
+returns setof public.documents
+language plpgsql
+as $$
+begin
+    return query
+    update public.documents d
+    set status = 'failed',
+        error_message = format(
+            'Gave up after %s attempts: the worker stopped (crash, kill or out of memory) while processing it',
+            d.attempts
+        ),
+        locked_by = null,
+        lease_expires_at = null
+    where d.id in (
+        select x.id
+        from public.documents x
+        where x.status = 'processing'
+            and x.lease_expires_at < now()
+            and x.attempts >= p_max_attempts
+        for update skip locked
+    )
+    returning d.*;
+
+    return query
+    with waiting_users as (
+        -- Users waiting longest first, bounded so a claim never locks more
+        -- than greatest(p_limit * 10, 50) users' worth of candidates
+        select d.user_id
+        from public.documents d
+        where (d.status = 'pending' and d.next_attempt_at <= now())
+            or (d.status = 'processing' and d.lease_expires_at < now() and d.attempts < p_max_attempts)
+        group by d.user_id
+        order by min(d.next_attempt_at)
+        limit greatest(p_limit * 10, 50)
+    ),
+    candidates as (
+        select c.id, c.user_id, c.next_attempt_at
+        from waiting_users u
+        cross join lateral (
+            select d.id, d.user_id, d.next_attempt_at
+            from public.documents d
+            where d.user_id = u.user_id
+                and (
+                    (d.status = 'pending' and d.next_attempt_at <= now())
+                    or (d.status = 'processing' and d.lease_expires_at < now() and d.attempts < p_max_attempts)
+                )
+            order by d.next_attempt_at
+            limit p_limit
+            for update skip locked
+        ) c
+    ),
+    ranked as (
+        select
+            c.id,
+            c.next_attempt_at,
+            row_number() over (partition by c.user_id order by c.next_attempt_at) as user_rank,
+            (
+                select count(*)
+                from public.documents a
+                where a.user_id = c.user_id
+                    and a.status = 'processing'
+                    and a.lease_expires_at >= now()
+            ) as in_flight
+        from candidates c
+    ),
+    chosen as (
+        select r.id
+        from ranked r
+        order by r.user_rank, r.in_flight, r.next_attempt_at
+        limit p_limit
+    )
+    update public.documents d
+    set status = 'processing',
+        locked_by = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = now(),
+        attempts = d.attempts + 1,
+        error_message = null
+    from chosen
+    where d.id = chosen.id
+    returning d.*;
+end;
+$$;
+
+-- Startup recovery: re-queue jobs left in 'processing' by a dead worker
+-- (expired lease, or no lease at all for rows from before the queue
+-- existed), or mark them failed once p_max_attempts attempts are used.
+create or replace function recover_ingestion_jobs(p_max_attempts int default 3)
+returns int
+language plpgsql
+as $$
+declare
+    recovered int;
+begin
+    update public.documents
+    set status = case when attempts < p_max_attempts then 'pending' else 'failed' end,
+        error_message = case
+            when attempts < p_max_attempts then error_message
+            else format(
+                'Gave up after %s attempts: the worker stopped (crash, kill or out of memory) while processing it',
+                attempts
+            )
+        end,
+        next_attempt_at = now(),
+        locked_by = null,
+        lease_expires_at = null
+    where status = 'processing'
+        and (lease_expires_at is null or lease_expires_at < now());
+    get diagnostics recovered = row_count;
+    return recovered;
+end;
+$$;
@@ -0,0 +1,17 @@
+-- Maintenance functions run only over a direct database connection
+-- Run this in Supabase SQL Editor
+--
+-- rebuild_chunk_index (017/018), convert_chunk_embeddings (018) and
+-- partition_chunks_by_user (017/019) rebuild indexes and rewrite the chunks
+-- table. Over PostgREST they hit the role's statement timeout (set_config
+-- inside the function doesn't lift the one already applied to the running
+-- statement) and the gateway's request timeout, and any role with EXECUTE
+-- could start them. `python -m app.manage_index` now calls them over
+-- DATABASE_URL (app/database/postgres.py) as the postgres user.
+
+revoke execute on function rebuild_chunk_index(text, int, int, int, text, text)
+    from public, anon, authenticated, service_role;
+revoke execute on function convert_chunk_embeddings(text, int)
+    from public, anon, authenticated, service_role;
+revoke execute on function partition_chunks_by_user(int)
+    from public, anon, authenticated, service_role;
@@ -1,5 +1,6 @@
 import { useEffect, useRef } from "react";
 import { ScrollArea } from "@/components/ui/scroll-area";
+import { Button } from "@/components/ui/button";
 import { MessageBubble } from "@/components/chat/message-bubble";
 import { StreamingMessage } from "@/components/chat/streaming-message";
 import type { Message } from "@/types";
@@ -7,18 +8,29 @@ import type { Message } from "@/types";
 interface MessageListProps {
   messages: Message[];
   streamingContent: string;
+  hasOlder?: boolean;
+  onLoadOlder?: () => void;
 }
 
-export function MessageList({ messages, streamingContent }: MessageListProps) {
+export function MessageList({ messages, streamingContent, hasOlder, onLoadOlder }: MessageListProps) {
   const bottomRef = useRef<HTMLDivElement>(null);
+  const lastMessageId = messages[messages.length - 1]?.id;
 
+  // Follow new messages, but stay put when older ones are prepended
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: "smooth" });
-  }, [messages, streamingContent]);
+  }, [lastMessageId, streamingContent]);
 
   return (
     <ScrollArea className="flex-1 p-4">
       <div className="mx-auto max-w-3xl space-y-4">
+        {hasOlder && (
+          <div className="flex justify-center">
+            <Button variant="ghost" size="sm" onClick={onLoadOlder}>
+              Load earlier messages
+            </Button>
+          </div>
+        )}
         {messages.map((message) => (
           <MessageBubble key={message.id} message={message} />
         ))}
@@ -61,12 +61,21 @@ export function DocumentList({ documents, onDelete }: DocumentListProps) {
         <div key={doc.id} className="flex items-center gap-3 p-3">
           <FileText className="h-5 w-5 shrink-0 text-muted-foreground" />
           <div className="min-w-0 flex-1">
-            <p className="truncate text-sm font-medium">{doc.filename}</p>
+            <p className="truncate text-sm font-medium" title={doc.metadata?.title}>
+              {doc.filename}
+            </p>
             <div className="flex items-center gap-2 text-xs text-muted-foreground">
               <span>{formatFileSize(doc.file_size)}</span>
               {doc.status === "completed" && (
                 <span>{doc.chunk_count} chunks</span>
               )}
+              {doc.metadata?.type && <span>{doc.metadata.type}</span>}
+              {doc.metadata?.date && <span>{doc.metadata.date}</span>}
+              {doc.status === "processing" && doc.chunks_total ? (
+                <span>
+                  {doc.chunks_done ?? 0} / {doc.chunks_total} chunks
+                </span>
+              ) : null}
               {doc.status === "failed" && doc.error_message && (
                 <span className="text-destructive" title={doc.error_message}>
                   {doc.error_message.slice(0, 50)}
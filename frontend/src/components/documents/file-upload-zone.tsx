@@ -2,7 +2,7 @@ import { useState, useRef, useCallback } from "react";
 import { Upload } from "lucide-react";
 
 interface FileUploadZoneProps {
-  onUpload: (file: File) => Promise<void>;
+  onUpload: (files: File[]) => Promise<void>;
   disabled?: boolean;
 }
 
@@ -12,12 +12,12 @@ export function FileUploadZone({ onUpload, disabled }: FileUploadZoneProps) {
   const [error, setError] = useState<string | null>(null);
   const inputRef = useRef<HTMLInputElement>(null);
 
-  const handleFile = useCallback(
-    async (file: File) => {
+  const handleFiles = useCallback(
+    async (files: File[]) => {
       setError(null);
       setIsUploading(true);
       try {
-        await onUpload(file);
+        await onUpload(files);
       } catch (err) {
         setError(err instanceof Error ? err.message : "Upload failed");
       } finally {
@@ -31,19 +31,19 @@ export function FileUploadZone({ onUpload, disabled }: FileUploadZoneProps) {
     (e: React.DragEvent) => {
       e.preventDefault();
       setIsDragOver(false);
-      const file = e.dataTransfer.files[0];
-      if (file) handleFile(file);
+      const files = Array.from(e.dataTransfer.files);
+      if (files.length) handleFiles(files);
     },
-    [handleFile]
+    [handleFiles]
   );
 
   const handleChange = useCallback(
     (e: React.ChangeEvent<HTMLInputElement>) => {
-      const file = e.target.files?.[0];
-      if (file) handleFile(file);
+      const files = Array.from(e.target.files ?? []);
+      if (files.length) handleFiles(files);
       if (inputRef.current) inputRef.current.value = "";
     },
-    [handleFile]
+    [handleFiles]
   );
 
   return (
@@ -65,16 +65,17 @@ export function FileUploadZone({ onUpload, disabled }: FileUploadZoneProps) {
       <p className="text-sm text-muted-foreground">
         {isUploading
           ? "Uploading..."
-          : "Drag & drop a file here, or click to browse"}
+          : "Drag & drop files or a .zip here, or click to browse"}
       </p>
       <p className="mt-1 text-xs text-muted-foreground/70">
-        Supported: .txt, .md, .html (max 50MB)
+        Supported: .txt, .md, .html, .pdf, .docx (max 50MB each), .zip
       </p>
       {error && <p className="mt-2 text-sm text-destructive">{error}</p>}
       <input
         ref={inputRef}
         type="file"
-        accept=".txt,.md,.html,.htm"
+        accept=".txt,.md,.html,.htm,.pdf,.docx,.zip"
+        multiple
         onChange={handleChange}
         className="hidden"
       />
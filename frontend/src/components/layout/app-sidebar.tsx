@@ -20,7 +20,8 @@ import { Separator } from "@/components/ui/separator";
 
 export function AppSidebar() {
   const { user, signOut } = useAuth();
-  const { threads, createThread, deleteThread } = useThreadsContext();
+  const { threads, createThread, deleteThread, hasMoreThreads, loadMoreThreads } =
+    useThreadsContext();
   const navigate = useNavigate();
   const location = useLocation();
   const { threadId: activeThreadId } = useParams();
@@ -104,6 +105,16 @@ export function AppSidebar() {
                   </SidebarMenuButton>
                 </SidebarMenuItem>
               ))}
+              {hasMoreThreads && (
+                <SidebarMenuItem>
+                  <SidebarMenuButton
+                    onClick={loadMoreThreads}
+                    className="justify-center text-muted-foreground"
+                  >
+                    <span>Load more</span>
+                  </SidebarMenuButton>
+                </SidebarMenuItem>
+              )}
             </SidebarMenu>
           </SidebarGroupContent>
         </SidebarGroup>
@@ -1,5 +1,5 @@
 import { useState, useCallback, useEffect } from "react";
-import { apiGet, apiStream } from "@/lib/api";
+import { apiGetPage, apiStream } from "@/lib/api";
 import { readSSEStream } from "@/lib/sse";
 import type { Message } from "@/types";
 
@@ -7,16 +7,34 @@ export function useChat(threadId: string | undefined) {
   const [messages, setMessages] = useState<Message[]>([]);
   const [streamingContent, setStreamingContent] = useState("");
   const [isStreaming, setIsStreaming] = useState(false);
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
 
-  // Load messages when thread changes
+  // Load the latest messages when thread changes
   useEffect(() => {
     setMessages([]);
     setStreamingContent("");
+    setOlderCursor(null);
     if (threadId) {
-      apiGet<Message[]>(`/api/threads/${threadId}/messages`).then(setMessages).catch(console.error);
+      apiGetPage<Message>(`/api/threads/${threadId}/messages`)
+        .then((page) => {
+          setMessages(page.items);
+          setOlderCursor(page.nextCursor);
+        })
+        .catch(console.error);
     }
   }, [threadId]);
 
+  const loadOlderMessages = useCallback(async () => {
+    if (!threadId || !olderCursor) return;
+    try {
+      const page = await apiGetPage<Message>(`/api/threads/${threadId}/messages`, olderCursor);
+      setMessages((prev) => [...page.items, ...prev]);
+      setOlderCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Failed to load older messages:", error);
+    }
+  }, [threadId, olderCursor]);
+
   const sendMessage = useCallback(
     async (content: string): Promise<string | undefined> => {
       const userMessage: Message = {
@@ -73,5 +91,13 @@ export function useChat(threadId: string | undefined) {
     [threadId]
   );
 
-  return { messages, streamingContent, isStreaming, sendMessage, setMessages };
+  return {
+    messages,
+    streamingContent,
+    isStreaming,
+    sendMessage,
+    setMessages,
+    hasOlderMessages: olderCursor !== null,
+    loadOlderMessages,
+  };
 }
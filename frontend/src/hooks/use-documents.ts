@@ -1,16 +1,64 @@
-import { useState, useEffect, useCallback } from "react";
-import { apiGet, apiDelete, apiUpload } from "@/lib/api";
-import { supabase } from "@/lib/supabase";
-import type { Document } from "@/types";
+import { useState, useEffect, useCallback, useRef } from "react";
+import { apiGet, apiGetPage, apiDelete, apiUpload, apiUploadMany, apiEventStream } from "@/lib/api";
+import type { Page } from "@/lib/api";
+import { readSSEEvents } from "@/lib/sse";
+import type { BatchUploadResult, Document } from "@/types";
+
+const RECONNECT_DELAY_MS = 2000;
+// Delta pages fetched on reconnect before a full reload is cheaper
+const CATCH_UP_PAGE_SIZE = 500;
+const CATCH_UP_MAX_PAGES = 4;
+
+interface DocumentEvent {
+  document_id: string;
+  status: Document["status"] | "deleted";
+  chunks_done?: number;
+  chunks_total?: number;
+  chunk_count?: number;
+  error_message?: string;
+}
+
+interface DeletedDocuments {
+  document_ids: string[];
+  complete: boolean;
+}
+
+/** Documents changed and deleted after `since`, or null if the list should be reloaded instead. */
+async function fetchChangesSince(since: string): Promise<{ changed: Document[]; deleted: string[] } | null> {
+  const encoded = encodeURIComponent(since);
+  const tombstones = await apiGet<DeletedDocuments>(`/api/documents/deleted?since=${encoded}`);
+  if (!tombstones.complete) return null;
+  const changed: Document[] = [];
+  let cursor: string | null = null;
+  for (let page = 0; page < CATCH_UP_MAX_PAGES; page++) {
+    const result: Page<Document> = await apiGetPage<Document>(
+      `/api/documents?updated_since=${encoded}&limit=${CATCH_UP_PAGE_SIZE}`,
+      cursor
+    );
+    changed.push(...result.items);
+    cursor = result.nextCursor;
+    if (!cursor) return { changed, deleted: tombstones.document_ids };
+  }
+  return null;
+}
+
+function mergeDocuments(prev: Document[], changed: Document[]): Document[] {
+  const byId = new Map(changed.map((d) => [d.id, d]));
+  const merged = prev.map((d) => byId.get(d.id) ?? d);
+  const known = new Set(prev.map((d) => d.id));
+  return [...changed.filter((d) => !known.has(d.id)), ...merged];
+}
 
 export function useDocuments() {
   const [documents, setDocuments] = useState<Document[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   const fetchDocuments = useCallback(async () => {
     try {
-      const docs = await apiGet<Document[]>("/api/documents");
-      setDocuments(docs);
+      const page = await apiGetPage<Document>("/api/documents");
+      setDocuments(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error("Failed to fetch documents:", error);
     } finally {
@@ -18,43 +66,109 @@ export function useDocuments() {
     }
   }, []);
 
+  const loadMoreDocuments = useCallback(async () => {
+    if (!nextCursor) return;
+    try {
+      const page = await apiGetPage<Document>("/api/documents", nextCursor);
+      setDocuments((prev) => [...prev, ...page.items.filter((d) => !prev.some((p) => p.id === d.id))]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Failed to fetch documents:", error);
+    }
+  }, [nextCursor]);
+
   // Initial fetch
   useEffect(() => {
     fetchDocuments();
   }, [fetchDocuments]);
 
-  // Supabase Realtime subscription for status updates
+  // Known ids, and the server time of the newest change we have seen (for
+  // catching up after a reconnect)
+  const knownIds = useRef<Set<string>>(new Set());
+  const latestUpdate = useRef<string | null>(null);
   useEffect(() => {
-    const channel = supabase
-      .channel("documents-changes")
-      .on(
-        "postgres_changes",
-        { event: "UPDATE", schema: "public", table: "documents" },
-        (payload) => {
-          setDocuments((prev) =>
-            prev.map((doc) =>
-              doc.id === payload.new.id ? { ...doc, ...payload.new } as Document : doc
-            )
-          );
-        }
-      )
-      .subscribe();
+    knownIds.current = new Set(documents.map((d) => d.id));
+    for (const doc of documents) {
+      if (!latestUpdate.current || doc.updated_at > latestUpdate.current) {
+        latestUpdate.current = doc.updated_at;
+      }
+    }
+  }, [documents]);
 
-    return () => {
-      supabase.removeChannel(channel);
+  // Status and progress pushed by the API's document event stream
+  useEffect(() => {
+    const controller = new AbortController();
+
+    const applyEvent = (event: DocumentEvent) => {
+      const { document_id, status, ...fields } = event;
+      // Uploads from another tab or device are not in the list yet
+      if (status === "pending" && !knownIds.current.has(document_id)) {
+        fetchDocuments();
+        return;
+      }
+      setDocuments((prev) =>
+        status === "deleted"
+          ? prev.filter((d) => d.id !== document_id)
+          : prev.map((d) => (d.id === document_id ? { ...d, status, ...fields } : d))
+      );
     };
-  }, []);
+
+    const run = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const res = await apiEventStream("/api/documents/events", controller.signal);
+          // Anything that changed or was deleted while we were disconnected
+          if (latestUpdate.current) {
+            const delta = await fetchChangesSince(latestUpdate.current);
+            if (delta === null) {
+              await fetchDocuments();
+            } else if (delta.changed.length || delta.deleted.length) {
+              const deleted = new Set(delta.deleted);
+              setDocuments((prev) => mergeDocuments(prev.filter((d) => !deleted.has(d.id)), delta.changed));
+            }
+          }
+          await readSSEEvents(res, (event, data) => {
+            if (event === "document") applyEvent(data);
+          });
+        } catch (error) {
+          if (controller.signal.aborted) return;
+          console.error("Document event stream error:", error);
+        }
+        await new Promise((resolve) => setTimeout(resolve, RECONNECT_DELAY_MS));
+      }
+    };
+    run();
+
+    return () => controller.abort();
+  }, [fetchDocuments]);
 
   const uploadDocument = useCallback(async (file: File) => {
     const doc = await apiUpload<Document>("/api/documents", file);
-    setDocuments((prev) => [doc, ...prev]);
+    // Re-uploading a filename updates the existing document rather than adding one
+    setDocuments((prev) => [doc, ...prev.filter((d) => d.id !== doc.id)]);
     return doc;
   }, []);
 
+  // Many files or .zip archives in one request; progress arrives on the event stream
+  const uploadDocuments = useCallback(async (files: File[]) => {
+    const result = await apiUploadMany<BatchUploadResult>("/api/documents/batch", files);
+    setDocuments((prev) => mergeDocuments(prev, result.documents));
+    return result;
+  }, []);
+
   const deleteDocument = useCallback(async (documentId: string) => {
     await apiDelete(`/api/documents/${documentId}`);
     setDocuments((prev) => prev.filter((d) => d.id !== documentId));
   }, []);
 
-  return { documents, loading, uploadDocument, deleteDocument, refetchDocuments: fetchDocuments };
+  return {
+    documents,
+    loading,
+    uploadDocument,
+    uploadDocuments,
+    deleteDocument,
+    refetchDocuments: fetchDocuments,
+    hasMoreDocuments: nextCursor !== null,
+    loadMoreDocuments,
+  };
 }
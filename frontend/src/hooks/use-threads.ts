@@ -1,15 +1,17 @@
 import { useState, useEffect, useCallback } from "react";
-import { apiGet, apiPost, apiDelete } from "@/lib/api";
+import { apiGetPage, apiPost, apiDelete } from "@/lib/api";
 import type { Thread } from "@/types";
 
 export function useThreads() {
   const [threads, setThreads] = useState<Thread[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   const fetchThreads = useCallback(async () => {
     try {
-      const data = await apiGet<Thread[]>("/api/threads");
-      setThreads(data);
+      const page = await apiGetPage<Thread>("/api/threads");
+      setThreads(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error("Failed to fetch threads:", error);
     } finally {
@@ -17,6 +19,17 @@ export function useThreads() {
     }
   }, []);
 
+  const loadMoreThreads = useCallback(async () => {
+    if (!nextCursor) return;
+    try {
+      const page = await apiGetPage<Thread>("/api/threads", nextCursor);
+      setThreads((prev) => [...prev, ...page.items.filter((t) => !prev.some((p) => p.id === t.id))]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Failed to fetch threads:", error);
+    }
+  }, [nextCursor]);
+
   useEffect(() => {
     fetchThreads();
   }, [fetchThreads]);
@@ -32,5 +45,13 @@ export function useThreads() {
     setThreads((prev) => prev.filter((t) => t.id !== threadId));
   };
 
-  return { threads, loading, createThread, deleteThread, refetchThreads: fetchThreads };
+  return {
+    threads,
+    loading,
+    createThread,
+    deleteThread,
+    refetchThreads: fetchThreads,
+    hasMoreThreads: nextCursor !== null,
+    loadMoreThreads,
+  };
 }
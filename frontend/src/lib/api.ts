@@ -18,6 +18,22 @@ export async function apiGet<T>(path: string): Promise<T> {
   return res.json();
 }
 
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+/** GET a keyset-paginated listing; the next page's cursor comes back in X-Next-Cursor. */
+export async function apiGetPage<T>(path: string, cursor?: string | null): Promise<Page<T>> {
+  const headers = await getAuthHeaders();
+  const url = cursor
+    ? `${API_URL}${path}${path.includes("?") ? "&" : "?"}cursor=${encodeURIComponent(cursor)}`
+    : `${API_URL}${path}`;
+  const res = await fetch(url, { headers });
+  if (!res.ok) throw new Error(`API error: ${res.status}`);
+  return { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
 export async function apiPost<T>(path: string, body?: unknown): Promise<T> {
   const headers = await getAuthHeaders();
   const res = await fetch(`${API_URL}${path}`, {
@@ -47,11 +63,20 @@ export async function apiDelete(path: string): Promise<void> {
 }
 
 export async function apiUpload<T>(path: string, file: File): Promise<T> {
-  const { data: { session } } = await supabase.auth.getSession();
-  if (!session) throw new Error("Not authenticated");
-
   const formData = new FormData();
   formData.append("file", file);
+  return postForm<T>(path, formData);
+}
+
+export async function apiUploadMany<T>(path: string, files: File[]): Promise<T> {
+  const formData = new FormData();
+  for (const file of files) formData.append("files", file);
+  return postForm<T>(path, formData);
+}
+
+async function postForm<T>(path: string, formData: FormData): Promise<T> {
+  const { data: { session } } = await supabase.auth.getSession();
+  if (!session) throw new Error("Not authenticated");
 
   const res = await fetch(`${API_URL}${path}`, {
     method: "POST",
@@ -78,3 +103,10 @@ export async function apiStream(path: string, body: unknown): Promise<Response>
   if (!res.ok) throw new Error(`API error: ${res.status}`);
   return res;
 }
+
+export async function apiEventStream(path: string, signal: AbortSignal): Promise<Response> {
+  const headers = await getAuthHeaders();
+  const res = await fetch(`${API_URL}${path}`, { headers, signal });
+  if (!res.ok) throw new Error(`API error: ${res.status}`);
+  return res;
+}
@@ -3,9 +3,15 @@ interface SSECallbacks {
   onDone: (data: { thread_id: string }) => void;
   onThreadId: (threadId: string) => void;
   onError: (error: string) => void;
+  onToolStart?: (data: { id: string; name: string }) => void;
+  onToolResult?: (data: { id: string; name: string; status: string; elapsed_ms: number }) => void;
 }
 
-export async function readSSEStream(response: Response, callbacks: SSECallbacks) {
+/** Read a server-sent event stream, calling `onEvent` with each event name and parsed JSON data. */
+export async function readSSEEvents(
+  response: Response,
+  onEvent: (event: string, data: any) => void,
+) {
   const reader = response.body?.getReader();
   if (!reader) throw new Error("No response body");
 
@@ -27,21 +33,7 @@ export async function readSSEStream(response: Response, callbacks: SSECallbacks)
       } else if (line.startsWith("data: ")) {
         const rawData = line.slice(6);
         try {
-          const data = JSON.parse(rawData);
-          switch (currentEvent) {
-            case "text_delta":
-              callbacks.onToken(data.token);
-              break;
-            case "done":
-              callbacks.onDone(data);
-              break;
-            case "thread_id":
-              callbacks.onThreadId(data.thread_id);
-              break;
-            case "error":
-              callbacks.onError(data.error);
-              break;
-          }
+          onEvent(currentEvent, JSON.parse(rawData));
         } catch {
           // skip unparseable lines
         }
@@ -50,3 +42,28 @@ export async function readSSEStream(response: Response, callbacks: SSECallbacks)
     }
   }
 }
+
+export async function readSSEStream(response: Response, callbacks: SSECallbacks) {
+  await readSSEEvents(response, (event, data) => {
+    switch (event) {
+      case "text_delta":
+        callbacks.onToken(data.token);
+        break;
+      case "done":
+        callbacks.onDone(data);
+        break;
+      case "thread_id":
+        callbacks.onThreadId(data.thread_id);
+        break;
+      case "error":
+        callbacks.onError(data.error);
+        break;
+      case "tool_start":
+        callbacks.onToolStart?.(data);
+        break;
+      case "tool_result":
+        callbacks.onToolResult?.(data);
+        break;
+    }
+  });
+}
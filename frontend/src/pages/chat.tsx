@@ -8,7 +8,8 @@ import { EmptyState } from "@/components/chat/empty-state";
 export function ChatPage() {
   const { threadId } = useParams();
   const navigate = useNavigate();
-  const { messages, streamingContent, isStreaming, sendMessage } = useChat(threadId);
+  const { messages, streamingContent, isStreaming, sendMessage, hasOlderMessages, loadOlderMessages } =
+    useChat(threadId);
   const { refetchThreads } = useThreadsContext();
 
   const handleSendMessage = async (content: string) => {
@@ -31,7 +32,12 @@ export function ChatPage() {
 
   return (
     <div className="flex h-full flex-col">
-      <MessageList messages={messages} streamingContent={streamingContent} />
+      <MessageList
+        messages={messages}
+        streamingContent={streamingContent}
+        hasOlder={hasOlderMessages}
+        onLoadOlder={loadOlderMessages}
+      />
       <MessageComposer onSend={handleSendMessage} disabled={isStreaming} />
     </div>
   );
@@ -1,12 +1,29 @@
 import { useDocuments } from "@/hooks/use-documents";
 import { FileUploadZone } from "@/components/documents/file-upload-zone";
 import { DocumentList } from "@/components/documents/document-list";
+import { Button } from "@/components/ui/button";
 
 export function DocumentsPage() {
-  const { documents, loading, uploadDocument, deleteDocument } = useDocuments();
+  const {
+    documents,
+    loading,
+    uploadDocument,
+    uploadDocuments,
+    deleteDocument,
+    hasMoreDocuments,
+    loadMoreDocuments,
+  } = useDocuments();
 
-  const handleUpload = async (file: File) => {
-    await uploadDocument(file);
+  const handleUpload = async (files: File[]) => {
+    if (files.length === 1 && !files[0].name.toLowerCase().endsWith(".zip")) {
+      await uploadDocument(files[0]);
+      return;
+    }
+    const { skipped } = await uploadDocuments(files);
+    if (skipped.length) {
+      const details = skipped.map((s) => `${s.filename} (${s.reason})`).join(", ");
+      throw new Error(`Skipped ${skipped.length} file(s): ${details}`);
+    }
   };
 
   return (
@@ -23,7 +40,14 @@ export function DocumentsPage() {
           Loading documents...
         </div>
       ) : (
-        <DocumentList documents={documents} onDelete={deleteDocument} />
+        <>
+          <DocumentList documents={documents} onDelete={deleteDocument} />
+          {hasMoreDocuments && (
+            <Button variant="ghost" onClick={loadMoreDocuments}>
+              Load more
+            </Button>
+          )}
+        </>
       )}
     </div>
   );
@@ -12,6 +12,13 @@ export interface Message {
   created_at: string;
 }
 
+export interface DocumentMetadata {
+  title?: string;
+  type?: string;
+  date?: string;
+  tags?: string[];
+}
+
 export interface Document {
   id: string;
   filename: string;
@@ -20,6 +27,17 @@ export interface Document {
   status: "pending" | "processing" | "completed" | "failed";
   error_message: string | null;
   chunk_count: number;
+  // Extracted at ingestion; chat searches can filter on these
+  metadata?: DocumentMetadata | null;
   created_at: string;
   updated_at: string;
+  // Live ingestion progress from the document event stream
+  chunks_done?: number;
+  chunks_total?: number;
+}
+
+export interface BatchUploadResult {
+  batch_id: string;
+  documents: Document[];
+  skipped: { filename: string; reason: string }[];
 }